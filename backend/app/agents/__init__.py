@@ -1,10 +1,17 @@
-from app.agents.parser import ParserAgent
-from app.agents.scraper import ScraperAgent
-from app.agents.filter import FilterSortAgent
-from app.agents.developer_intel import DeveloperIntelligenceAgent
-from app.agents.comparison import ComparisonAgent
-from app.agents.recommendation import RecommendationAgent
-from app.agents.context import SearchContext, AgentType
+from importlib import import_module
+
+# Agents are resolved lazily so importing the package does not pull in
+# every agent module (and whatever they depend on) up front
+_EXPORTS = {
+    "ParserAgent": "app.agents.parser",
+    "ScraperAgent": "app.agents.scraper",
+    "FilterSortAgent": "app.agents.filter",
+    "DeveloperIntelligenceAgent": "app.agents.developer_intel",
+    "ComparisonAgent": "app.agents.comparison",
+    "RecommendationAgent": "app.agents.recommendation",
+    "SearchContext": "app.agents.context",
+    "AgentType": "app.agents.context",
+}
 
 __all__ = [
     "ParserAgent",
@@ -16,3 +23,10 @@ __all__ = [
     "SearchContext",
     "AgentType"
 ]
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
@@ -1,22 +1,27 @@
-from typing import List, Dict, Any
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
+from typing import List, Dict, Any, Optional
 import json
 import re
 from app.config import settings
+from app.utils.market_stats import market_stats, price_per_sqft
+from app.utils.developer_reputation import developer_reputation
+from app.utils.text_index import requirement_index, document_text
 from .context import SearchContext, AgentType
+from .scoring import WeightProfile, DEFAULT_PROFILE
+from .llm import get_llm, chat_prompt
 
 class ComparisonAgent:
     """
     Compares and analyzes properties based on multiple factors
     """
     
+    TOP_N = 5  # Recommendations shown up front; the rest are paged from the snapshot
+    
     def __init__(self):
-        self.llm = ChatOpenAI(
-            model=settings.llm_model,
-            temperature=0.3,
-            api_key=settings.openai_api_key
-        )
+        self.temperature = 0.3
+    
+    @property
+    def llm(self):
+        return get_llm(self.temperature)
     
     async def compare_and_score(self, context: SearchContext) -> SearchContext:
         """
@@ -33,12 +38,13 @@ class ComparisonAgent:
                 return context
             
             # Score each property
-            scored_properties = self._score_properties(context.properties)
+            scored_properties = self._score_properties(context.properties, context.additional_requirements)
             
             # Sort by score (descending)
             scored_properties.sort(key=lambda x: x.get("total_score", 0), reverse=True)
             
-            context.recommendations = scored_properties[:5]  # Top 5
+            context.ranked_properties = scored_properties
+            context.recommendations = scored_properties[:self.TOP_N]
             
             context.add_workflow_step(
                 AgentType.COMPARISON,
@@ -46,7 +52,8 @@ class ComparisonAgent:
                 {
                     "properties_compared": len(context.properties),
                     "recommendations_generated": len(context.recommendations),
-                    "scoring_factors": ["price", "location", "amenities", "rera_status"]
+                    "scoring_factors": ["price", "location", "amenities", "rera_status", "developer_reputation"]
+                        + (["requirement_relevance"] if context.additional_requirements else [])
                 }
             )
             
@@ -60,56 +67,89 @@ class ComparisonAgent:
         
         return context
     
-    def _score_properties(self, properties: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def score_batch(
+        self,
+        properties: List[Dict[str, Any]],
+        profile: WeightProfile = DEFAULT_PROFILE
+    ) -> List[Dict[str, Any]]:
+        """
+        Score a candidate list outside the chat pipeline, in input order
+        Prices without enough market data are normalized within the batch
+        """
+        
+        return self._score_properties(properties, profile=profile)
+    
+    def _score_properties(
+        self,
+        properties: List[Dict[str, Any]],
+        requirements: Optional[str] = None,
+        profile: WeightProfile = DEFAULT_PROFILE
+    ) -> List[Dict[str, Any]]:
         """
-        Score properties based on multiple factors
+        Score properties based on multiple factors, weighted by profile
+        With additional requirements, profile.relevance of the 100 points go to BM25 relevance
         """
         
         scored = []
+        relevance = self._requirement_relevance(properties, requirements) if requirements else None
+        developer_scores: Dict[Optional[str], float] = {}
         
         # Find min/max for normalization
         prices = [p.get("price", 0) for p in properties if p.get("price")]
-        areas = [p.get("area", 0) for p in properties if p.get("area")]
         
         min_price = min(prices) if prices else 0
         max_price = max(prices) if prices else 1
-        min_area = min(areas) if areas else 0
-        max_area = max(areas) if areas else 1
         
         for prop in properties:
             scores = {}
             
-            # Price score (lower is better, 0-30 points)
+            # Price score (lower is better)
+            # Placed within the local market when there is enough data,
+            # otherwise within the current result set
             price = prop.get("price", max_price)
-            price_score = 30 * (1 - (price - min_price) / (max_price - min_price or 1))
+            market_rank = None
+            unit_price = price_per_sqft(price, prop.get("area"), prop.get("price_per_sqft"))
+            if unit_price:
+                market_rank = market_stats.price_rank(unit_price, prop.get("division"), prop.get("location"))
+            
+            if market_rank is not None:
+                price_score = profile.price * (1 - market_rank)
+            else:
+                price_score = profile.price * (1 - (price - min_price) / (max_price - min_price or 1))
             scores["price_score"] = round(price_score, 2)
             
-            # Area score (optimal size, 0-25 points)
+            # Area score (closeness to the profile's optimal size)
             area = prop.get("area", 0)
-            # Assuming optimal size is around 1200 sqft (30x40)
-            optimal_area = 1200
             if area > 0:
-                area_diff = abs(area - optimal_area)
-                area_score = 25 * (1 - (area_diff / (optimal_area + area_diff)))
+                area_diff = abs(area - profile.optimal_area)
+                area_score = profile.area * (1 - (area_diff / (profile.optimal_area + area_diff)))
             else:
                 area_score = 0
             scores["area_score"] = round(area_score, 2)
             
-            # RERA score (0-20 points)
-            rera_score = 20 if prop.get("rera_registered") else 10
+            # RERA score (half the points when unregistered)
+            rera_score = profile.rera if prop.get("rera_registered") else profile.rera_unregistered
             scores["rera_score"] = rera_score
             
-            # Amenities score (0-15 points)
-            amenities = prop.get("amenities", [])
-            amenities_score = min(15, len(amenities) * 3)
+            # Amenities score (capped at profile.amenity_cap amenities)
+            amenities = prop.get("amenities") or []
+            amenities_score = min(profile.amenities, len(amenities) * profile.points_per_amenity)
             scores["amenities_score"] = amenities_score
             
-            # Developer reputation (0-10 points - placeholder)
-            dev_score = 8
-            scores["developer_score"] = dev_score
+            # Developer reputation (from the preloaded map, once per developer in the batch)
+            developer = prop.get("developer")
+            if developer not in developer_scores:
+                developer_scores[developer] = developer_reputation.score(developer, profile.developer)
+            scores["developer_score"] = round(developer_scores[developer], 2)
             
             total_score = sum(scores.values())
             
+            # Requirement relevance (other factors scaled down to make room)
+            if relevance is not None:
+                relevance_score = profile.relevance * relevance.get(self._project_key(prop), 0.0)
+                scores["relevance_score"] = round(relevance_score, 2)
+                total_score = total_score * profile.factor_scale + relevance_score
+            
             scored.append({
                 **prop,
                 "scores": scores,
@@ -117,3 +157,26 @@ class ComparisonAgent:
             })
         
         return scored
+    
+    @staticmethod
+    def _project_key(prop: Dict[str, Any]) -> str:
+        return prop.get("project_name") or prop.get("name") or ""
+    
+    def _requirement_relevance(self, properties: List[Dict[str, Any]], requirements: str) -> Dict[str, float]:
+        """
+        BM25 relevance of each candidate's project to the requirements, scaled to 0-1
+        Projects missing from the index are indexed from the candidate's own amenities
+        """
+        
+        keys = set()
+        for prop in properties:
+            key = self._project_key(prop)
+            keys.add(key)
+            if key not in requirement_index:
+                requirement_index.add(key, document_text(prop.get("amenities"), prop.get("description")))
+        
+        raw = requirement_index.score(requirements, keys)
+        best = max(raw.values(), default=0.0)
+        if best <= 0:
+            return {}
+        return {key: value / best for key, value in raw.items()}
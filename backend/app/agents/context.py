@@ -9,6 +9,19 @@ class AgentType(str, Enum):
     FILTER = "filter"
     COMPARISON = "comparison"
     RECOMMENDATION = "recommendation"
+    ORCHESTRATOR = "orchestrator"
+
+# Parsed search criteria, in the order they are extracted
+CRITERIA_FIELDS = (
+    "location",
+    "division",
+    "min_size",
+    "max_size",
+    "min_price",
+    "max_price",
+    "property_type",
+    "additional_requirements",
+)
 
 @dataclass
 class SearchContext:
@@ -39,6 +52,10 @@ class SearchContext:
     # Properties with pricing
     properties: List[Dict[str, Any]] = field(default_factory=list)
     
+    # Full scored list, best first
+    ranked_properties: List[Dict[str, Any]] = field(default_factory=list)
+    result_id: Optional[str] = None
+    
     # Final recommendations
     recommendations: List[Dict[str, Any]] = field(default_factory=list)
     reasoning: str = ""
@@ -46,6 +63,8 @@ class SearchContext:
     # Workflow tracking
     workflow_steps: List[Dict[str, Any]] = field(default_factory=list)
     errors: List[str] = field(default_factory=list)
+    completed_stages: List[str] = field(default_factory=list)  # run without errors, or reused from a refinement
+    stage_timings: Dict[str, float] = field(default_factory=dict)  # seconds per stage run
     started_at: datetime = field(default_factory=datetime.utcnow)
     
     def add_workflow_step(self, agent_type: AgentType, status: str, details: Dict[str, Any], error: Optional[str] = None):
@@ -60,6 +79,10 @@ class SearchContext:
         if error:
             self.errors.append(f"{agent_type.value}: {error}")
     
+    def criteria(self) -> Dict[str, Any]:
+        """Search criteria as a flat dict, used to diff refinements"""
+        return {name: getattr(self, name) for name in CRITERIA_FIELDS}
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert context to dictionary"""
         return {
@@ -74,5 +97,6 @@ class SearchContext:
             "properties_count": len(self.properties),
             "recommendations_count": len(self.recommendations),
             "workflow_steps": self.workflow_steps,
+            "stage_timings": self.stage_timings,
             "errors": self.errors
         }
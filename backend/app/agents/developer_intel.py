@@ -1,10 +1,48 @@
 from typing import List, Dict, Any, Optional
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
+import asyncio
 import json
 import re
 from app.config import settings
+from app.utils.brochure_store import brochure_store
+from app.utils.cassette import through_cassette
+from app.utils.plot_index import plot_indexes
+from app.utils.text_index import requirement_index, brochure_text, BROCHURE
 from .context import SearchContext, AgentType
+from .llm import get_llm, chat_prompt
+
+# Mock developer information, standing in for developer website crawls
+MOCK_BROCHURES = {
+    "Kanakapura Layout - Phase 1": {
+        "developer": "Sri Developers",
+        "prices_per_plot": [
+            {"size_sqft": 1200, "price": 3600000},  # 30x40
+            {"size_sqft": 1200, "price": 3500000},
+        ],
+        "amenities": ["Water Supply", "Electricity", "Road Access"],
+        "rera_registered": True,
+        "rera_number": "REG/BLR/001"
+    },
+    "Kanakapura Green Acres": {
+        "developer": "Green Earth Projects",
+        "prices_per_plot": [
+            {"size_sqft": 1200, "price": 3200000},
+            {"size_sqft": 1200, "price": 3100000},
+        ],
+        "amenities": ["Water Supply", "Electricity", "Green Space", "Security Gate"],
+        "rera_registered": True,
+        "rera_number": "REG/BLR/002"
+    },
+    "Kanakpura Residency": {
+        "developer": "Kanakpura Builders",
+        "prices_per_plot": [
+            {"size_sqft": 1200, "price": 3800000},
+            {"size_sqft": 1200, "price": 3700000},
+        ],
+        "amenities": ["Water Supply", "Electricity", "Gated Community", "Park"],
+        "rera_registered": True,
+        "rera_number": "REG/BLR/003"
+    }
+}
 
 class DeveloperIntelligenceAgent:
     """
@@ -12,11 +50,11 @@ class DeveloperIntelligenceAgent:
     """
     
     def __init__(self):
-        self.llm = ChatOpenAI(
-            model=settings.llm_model,
-            temperature=0,
-            api_key=settings.openai_api_key
-        )
+        self.temperature = 0
+    
+    @property
+    def llm(self):
+        return get_llm(self.temperature)
     
     async def gather_developer_info(self, context: SearchContext) -> SearchContext:
         """
@@ -31,10 +69,16 @@ class DeveloperIntelligenceAgent:
             properties_list = []
             
             for project in top_projects:
-                dev_info = await self._fetch_developer_brochure(project)
+                dev_info = await through_cassette(
+                    "brochure",
+                    project["project_name"],
+                    lambda: self._fetch_developer_brochure(project),
+                    request={"project_name": project["project_name"]}
+                )
                 
                 if dev_info:
                     context.developer_brochures[project["project_name"]] = dev_info
+                    requirement_index.set_source(project["project_name"], BROCHURE, brochure_text(dev_info))
                     
                     # Create property records with pricing info
                     properties = self._create_property_records(project, dev_info, context)
@@ -62,47 +106,76 @@ class DeveloperIntelligenceAgent:
         
         return context
     
+    async def rebuild_properties(self, context: SearchContext) -> SearchContext:
+        """
+        Re-apply size and price criteria to brochures already in the context
+        Used for session refinements, where nothing needs fetching again
+        """
+        
+        try:
+            properties_list = []
+            
+            for project in context.filtered_approvals[:10]:
+                dev_info = context.developer_brochures.get(project["project_name"])
+                if dev_info:
+                    properties_list.extend(self._create_property_records(project, dev_info, context))
+            
+            context.properties = properties_list
+            
+            context.add_workflow_step(
+                AgentType.SCRAPER,
+                "success",
+                {
+                    "properties_found": len(properties_list),
+                    "brochures_reused": len(context.developer_brochures)
+                }
+            )
+            
+        except Exception as e:
+            context.add_workflow_step(
+                AgentType.SCRAPER,
+                "failed",
+                {"brochures_count": len(context.developer_brochures)},
+                str(e)
+            )
+        
+        return context
+    
     async def _fetch_developer_brochure(self, project: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
-        Fetch developer brochure and pricing information (Mock for now)
-        In production, would integrate with actual developer website scrapers
+        Fetch developer brochure and pricing information
+        Served from the brochure store; crawled again when missing or stale
         """
         
-        # Mock developer information
-        mock_brochures = {
-            "Kanakapura Layout - Phase 1": {
-                "developer": "Sri Developers",
-                "prices_per_plot": [
-                    {"size_sqft": 1200, "price": 3600000},  # 30x40
-                    {"size_sqft": 1200, "price": 3500000},
-                ],
-                "amenities": ["Water Supply", "Electricity", "Road Access"],
-                "rera_registered": True,
-                "rera_number": "REG/BLR/001"
-            },
-            "Kanakapura Green Acres": {
-                "developer": "Green Earth Projects",
-                "prices_per_plot": [
-                    {"size_sqft": 1200, "price": 3200000},
-                    {"size_sqft": 1200, "price": 3100000},
-                ],
-                "amenities": ["Water Supply", "Electricity", "Green Space", "Security Gate"],
-                "rera_registered": True,
-                "rera_number": "REG/BLR/002"
-            },
-            "Kanakpura Residency": {
-                "developer": "Kanakpura Builders",
-                "prices_per_plot": [
-                    {"size_sqft": 1200, "price": 3800000},
-                    {"size_sqft": 1200, "price": 3700000},
-                ],
-                "amenities": ["Water Supply", "Electricity", "Gated Community", "Park"],
-                "rera_registered": True,
-                "rera_number": "REG/BLR/003"
-            }
-        }
+        project_name = project["project_name"]
+        entry = brochure_store.cached(project_name)
+        if entry is None:
+            try:
+                entry = await asyncio.to_thread(brochure_store.get, project_name)
+            except Exception as e:
+                print(f"Error reading brochure store: {e}")
+        
+        if entry is not None and not brochure_store.is_stale(entry):
+            return entry.content
         
-        return mock_brochures.get(project["project_name"])
+        fetched = await self._crawl_brochure(project)
+        if fetched is None:
+            return entry.content if entry else None
+        
+        try:
+            entry = await asyncio.to_thread(brochure_store.put, project_name, fetched)
+        except Exception as e:
+            print(f"Error saving brochure: {e}")
+            return fetched
+        return entry.content
+    
+    async def _crawl_brochure(self, project: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Crawl a project's brochure (Mock for now)
+        In production, would integrate with actual developer website scrapers
+        """
+        
+        return MOCK_BROCHURES.get(project["project_name"])
     
     def _create_property_records(
         self, 
@@ -114,22 +187,17 @@ class DeveloperIntelligenceAgent:
         
         properties = []
         
-        for price_info in dev_info.get("prices_per_plot", []):
+        # Only the plots matching the size and price criteria, found by bisection
+        plot_index = plot_indexes.get(project["project_name"], dev_info.get("prices_per_plot", []))
+        matching_plots = plot_index.query(context.min_size, context.max_size, context.min_price, context.max_price)
+        
+        for price_info in matching_plots:
             size_sqft = price_info.get("size_sqft", 0)
             price = price_info.get("price", 0)
             
-            # Check if matches user criteria
-            if context.min_size and size_sqft < context.min_size:
-                continue
-            if context.max_size and size_sqft > context.max_size:
-                continue
-            if context.min_price and price < context.min_price:
-                continue
-            if context.max_price and price > context.max_price:
-                continue
-            
             property_record = {
                 "name": f"{project['project_name']} - {size_sqft} sqft",
+                "project_name": project["project_name"],
                 "location": project.get("location"),
                 "division": project.get("division"),
                 "area": size_sqft,
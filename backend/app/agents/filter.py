@@ -1,4 +1,5 @@
 from typing import List, Dict, Any
+from app.utils.entity_resolution import collapse_duplicates
 from .context import SearchContext, AgentType
 
 class FilterSortAgent:
@@ -11,6 +12,7 @@ class FilterSortAgent:
     async def filter_and_sort(self, context: SearchContext) -> SearchContext:
         """
         Filter layout approvals and sort by approval date (descending)
+        Duplicates of a project are collapsed so it is only fetched and scored once
         """
         
         try:
@@ -25,6 +27,9 @@ class FilterSortAgent:
                 reverse=True
             )
             
+            # Same project under variant names or from several authorities
+            filtered, duplicates = collapse_duplicates(filtered)
+            
             context.filtered_approvals = filtered
             
             context.add_workflow_step(
@@ -33,6 +38,7 @@ class FilterSortAgent:
                 {
                     "initial_count": len(context.layout_approvals),
                     "filtered_count": len(filtered),
+                    "duplicates_merged": duplicates,
                     "min_area_filter": f"{self.MIN_AREA_ACRES} acres",
                     "sort_by": "approval_date (descending)"
                 }
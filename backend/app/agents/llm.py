@@ -0,0 +1,42 @@
+from functools import lru_cache
+from typing import Any, Dict
+from app.config import settings
+from app.utils.cassette import call_key, through_cassette
+
+# langchain is imported on first use rather than at import time, so the
+# API process and short-lived workers start without loading the LLM stack
+
+@lru_cache(maxsize=None)
+def get_llm(temperature: float):
+    """Shared ChatOpenAI client for a temperature, created on first use"""
+    from langchain_openai import ChatOpenAI
+    
+    return ChatOpenAI(
+        model=settings.llm_model,
+        temperature=temperature,
+        api_key=settings.openai_api_key
+    )
+
+def chat_prompt(template: str):
+    """Build a ChatPromptTemplate without importing langchain up front"""
+    from langchain.prompts import ChatPromptTemplate
+    
+    return ChatPromptTemplate.from_template(template)
+
+async def complete(template: str, variables: Dict[str, Any], temperature: float) -> str:
+    """
+    Run a prompt template through the LLM and return the text
+    Goes through the active cassette, so replays need neither langchain nor the API
+    """
+    
+    async def call():
+        chain = chat_prompt(template) | get_llm(temperature)
+        response = await chain.ainvoke(variables)
+        return response.content
+    
+    return await through_cassette(
+        "llm",
+        call_key(template, variables, temperature),
+        call,
+        request={"template": template, "variables": variables, "temperature": temperature}
+    )
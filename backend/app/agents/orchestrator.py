@@ -4,21 +4,42 @@ from sqlalchemy.orm import Session
 from app.agents import (
     ParserAgent, ScraperAgent, FilterSortAgent,
     DeveloperIntelligenceAgent, ComparisonAgent, RecommendationAgent,
-    SearchContext
+    SearchContext, AgentType
 )
+from app.agents.parser import LocationMatcher
 from app.models.property import SearchHistory, AgentInteraction
 from app.schemas import SearchCriteria, ChatResponse
+from app.utils.analytics import record_search, search_dimensions
+from app.utils.cassette import recording, save_recording, use_cassette
+from app.utils.ranking_cache import ranking_snapshots, encode_cursor
+from app.utils.session_contexts import session_contexts
 import json
+import time
 
 class AgentOrchestrator:
     """
     Orchestrates the entire agentic workflow
     """
     
+    # Pipeline stages after parsing, in order
+    STAGES = ("scrape", "filter", "developer_intel", "properties", "comparison", "recommendation")
+    
+    # First stage whose output depends on each criterion
+    CRITERIA_STAGES = {
+        "location": "scrape",
+        "division": "scrape",
+        "property_type": "scrape",
+        "min_size": "properties",
+        "max_size": "properties",
+        "min_price": "properties",
+        "max_price": "properties",
+        "additional_requirements": "comparison",
+    }
+    
     def __init__(self, db: Optional[Session] = None):
         self.db = db
         self.parser = ParserAgent()
-        self.scraper = ScraperAgent()
+        self.scraper = ScraperAgent(db)
         self.filter_sort = FilterSortAgent()
         self.developer_intel = DeveloperIntelligenceAgent()
         self.comparison = ComparisonAgent()
@@ -31,39 +52,86 @@ class AgentOrchestrator:
         session_id: Optional[str] = None
     ) -> ChatResponse:
         """
-        Process user query through the entire agent workflow
+        Process user query through the agent workflow
+        
+        Follow-ups in a session that still has its last context only re-run
+        the stages affected by the criteria that changed.
         """
         
+        cassette = recording(query=user_query, user_id=user_id, session_id=session_id)
+        if cassette is None:
+            return await self._process_query(user_query, user_id, session_id)
+        
+        # Capture this query's LLM, scraper and brochure I/O for offline replay
+        with use_cassette(cassette):
+            response = await self._process_query(user_query, user_id, session_id)
+        await save_recording(
+            cassette,
+            stage_timings=(response.workflow_trace or {}).get("stage_timings", {}),
+            result=[[p.name, p.price] for p in response.properties or []]
+        )
+        return response
+    
+    async def _process_query(
+        self,
+        user_query: str,
+        user_id: str,
+        session_id: Optional[str]
+    ) -> ChatResponse:
         # Initialize search context
         context = SearchContext(original_query=user_query)
+        previous = session_contexts.get(session_id) if session_id else None
+        started = time.perf_counter()
         
         try:
-            # Step 1: Parse user input
-            context = await self.parser.parse(context)
-            
-            # Step 2: Scrape planning authority data
-            context = await self.scraper.scrape(context)
-            
-            # Step 3: Filter and sort
-            context = await self.filter_sort.filter_and_sort(context)
+            # Step 1: Parse user input (refining the previous criteria if any)
+            context = await self.parser.parse(
+                context,
+                previous.criteria() if previous else None
+            )
+            context.stage_timings["parse"] = time.perf_counter() - started
             
-            # Step 4: Gather developer information and pricing
-            context = await self.developer_intel.gather_developer_info(context)
+            first_stage = self.STAGES[0]
+            if previous:
+                if context.errors:
+                    # Parsing failed; keep the previous criteria rather than searching for nothing
+                    for name, value in previous.criteria().items():
+                        setattr(context, name, value)
+                first_stage = self._carry_over(previous, context)
             
-            # Step 5: Compare and score properties
-            context = await self.comparison.compare_and_score(context)
+            # Steps 2-6: scrape, filter, developer intel, comparison, recommendation
+            stages = self.STAGES[self.STAGES.index(first_stage):]
+            if first_stage != "properties":
+                # gather_developer_info already builds the property records
+                stages = tuple(stage for stage in stages if stage != "properties")
             
-            # Step 6: Generate recommendations
-            context = await self.recommendation.generate_recommendations(context)
+            for stage in stages:
+                stage_started = time.perf_counter()
+                errors = len(context.errors)
+                context = await self._run_stage(stage, context)
+                context.stage_timings[stage] = time.perf_counter() - stage_started
+                if len(context.errors) == errors:
+                    context.completed_stages.append(stage)
+                    if stage == "developer_intel":
+                        context.completed_stages.append("properties")
             
         except Exception as e:
             context.add_workflow_step(
-                "orchestrator",
+                AgentType.ORCHESTRATOR,
                 "failed",
                 {"query": user_query},
                 str(e)
             )
         
+        context.stage_timings["total"] = time.perf_counter() - started
+        
+        if session_id:
+            session_contexts.put(session_id, context)
+        
+        # Keep the full ranking so "show more" can page without a rerun
+        if context.ranked_properties:
+            context.result_id = ranking_snapshots.put(context.ranked_properties, context.started_at)
+        
         # Save to database if session available
         if self.db:
             await self._save_search_history(context, user_id, session_id)
@@ -73,6 +141,69 @@ class AgentOrchestrator:
         
         return response
     
+    async def _run_stage(self, stage: str, context: SearchContext) -> SearchContext:
+        if stage == "scrape":
+            return await self.scraper.scrape(context)
+        if stage == "filter":
+            return await self.filter_sort.filter_and_sort(context)
+        if stage == "developer_intel":
+            return await self.developer_intel.gather_developer_info(context)
+        if stage == "properties":
+            return await self.developer_intel.rebuild_properties(context)
+        if stage == "comparison":
+            return await self.comparison.compare_and_score(context)
+        if stage == "recommendation":
+            return await self.recommendation.generate_recommendations(context)
+        raise ValueError(f"Unknown stage: {stage}")
+    
+    def _carry_over(self, previous: SearchContext, context: SearchContext) -> str:
+        """
+        Reuse the previous context's outputs that the criteria diff leaves valid
+        Returns the first stage that has to run again
+        """
+        
+        old, new = previous.criteria(), context.criteria()
+        changed = [name for name in old if old[name] != new[name]]
+        
+        if changed:
+            first_stage = min(
+                (self.CRITERIA_STAGES[name] for name in changed),
+                key=self.STAGES.index
+            )
+        else:
+            # Same criteria again: re-rank and re-explain only
+            first_stage = "comparison"
+        
+        # Outputs are reused only up to the first stage that failed last time,
+        # so a transient scrape or brochure error is retried, not carried forward
+        for stage in self.STAGES[:self.STAGES.index(first_stage)]:
+            if stage not in previous.completed_stages:
+                first_stage = stage
+                break
+        
+        reused = self.STAGES.index(first_stage)
+        context.completed_stages.extend(self.STAGES[:reused])
+        if reused > self.STAGES.index("scrape"):
+            context.layout_approvals = previous.layout_approvals
+        if reused > self.STAGES.index("filter"):
+            context.filtered_approvals = previous.filtered_approvals
+        if reused > self.STAGES.index("developer_intel"):
+            context.developer_brochures = previous.developer_brochures
+        if reused > self.STAGES.index("properties"):
+            context.properties = previous.properties
+        
+        context.add_workflow_step(
+            AgentType.ORCHESTRATOR,
+            "info",
+            {
+                "refinement": True,
+                "changed_criteria": changed,
+                "rerun_from": first_stage
+            }
+        )
+        
+        return first_stage
+    
     async def _save_search_history(
         self,
         context: SearchContext,
@@ -82,6 +213,8 @@ class AgentOrchestrator:
         """Save search history and agent interactions to database"""
         
         try:
+            workflow_status = "completed" if not context.errors else "completed_with_errors"
+            
             # Create search history record
             search_history = SearchHistory(
                 user_id=user_id,
@@ -94,12 +227,13 @@ class AgentOrchestrator:
                     "property_type": context.property_type
                 },
                 results_count=len(context.recommendations),
-                workflow_status="completed" if not context.errors else "completed_with_errors",
+                workflow_status=workflow_status,
                 workflow_trace=context.to_dict()
             )
             
             self.db.add(search_history)
             self.db.flush()
+            created_at = search_history.created_at
             
             # Save agent interactions
             for step in context.workflow_steps:
@@ -116,6 +250,20 @@ class AgentOrchestrator:
             
             self.db.commit()
             
+            # Counted once history is saved; buffered and flushed to the rollups in the background
+            record_search(
+                created_at,
+                search_dimensions(
+                    context.division,
+                    LocationMatcher.canonical_name(context.location) if context.location else None,
+                    context.min_price,
+                    context.max_price,
+                    workflow_status
+                ),
+                len(context.recommendations),
+                context.stage_timings
+            )
+            
         except Exception as e:
             self.db.rollback()
             print(f"Error saving search history: {e}")
@@ -161,20 +309,33 @@ class AgentOrchestrator:
                 division=context.division
             ),
             properties=[
-                {
-                    "id": i,
-                    "name": rec.get("name"),
-                    "location": rec.get("location"),
-                    "area": rec.get("area"),
-                    "price": rec.get("price"),
-                    "price_per_sqft": rec.get("price_per_sqft"),
-                    "property_type": "plot",
-                    "status": "available",
-                    "created_at": context.started_at,
-                    "updated_at": context.started_at
-                }
+                self.format_property(rec, i, context.started_at)
                 for i, rec in enumerate(context.recommendations, 1)
             ],
             reasoning=context.reasoning,
-            workflow_trace=context.to_dict()
+            workflow_trace=context.to_dict(),
+            result_id=context.result_id,
+            next_cursor=(
+                encode_cursor(context.result_id, len(context.recommendations))
+                if context.result_id and len(context.ranked_properties) > len(context.recommendations)
+                else None
+            )
         )
+    
+    @staticmethod
+    def format_property(rec: dict, position: int, timestamp: datetime) -> dict:
+        """Format a scored property for the response; id is its rank position"""
+        
+        return {
+            "id": position,
+            "name": rec.get("name"),
+            "location": rec.get("location"),
+            "area": rec.get("area"),
+            "price": rec.get("price"),
+            "price_per_sqft": rec.get("price_per_sqft"),
+            "property_type": "plot",
+            "division": rec.get("division") or "",
+            "status": "available",
+            "created_at": timestamp,
+            "updated_at": timestamp
+        }
@@ -1,9 +1,10 @@
 import re
+import json
 from typing import Optional, Dict, Any
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
 from app.config import settings
+from app.utils.locality_index import LocalityIndex, LocalityMatch
 from .context import SearchContext, AgentType
+from .llm import get_llm, complete
 
 class ParserAgent:
     """
@@ -11,21 +12,31 @@ class ParserAgent:
     """
     
     def __init__(self):
-        self.llm = ChatOpenAI(
-            model=settings.llm_model,
-            temperature=0,
-            api_key=settings.openai_api_key
-        )
+        self.temperature = 0
     
-    async def parse(self, context: SearchContext) -> SearchContext:
-        """Parse user's natural language query"""
+    @property
+    def llm(self):
+        return get_llm(self.temperature)
+    
+    async def parse(self, context: SearchContext, previous_criteria: Optional[Dict[str, Any]] = None) -> SearchContext:
+        """
+        Parse user's natural language query
+        previous_criteria (from the same session) lets follow-ups like "cheaper" refine the last search
+        """
         
         try:
-            prompt = ChatPromptTemplate.from_template("""
+            prompt = """
             Extract structured property search criteria from the user's query.
             
             User Query: {query}
             
+            Criteria of the user's previous search in this conversation (null if none):
+            {previous_criteria}
+            
+            If the query refines the previous search (for example "cheaper", "bigger plots",
+            "only RERA ones"), return the previous criteria with the refinement applied.
+            Otherwise extract the criteria from the query alone.
+            
             Extract and provide the following in JSON format:
             {{
                 "location": "specific location name if mentioned",
@@ -39,14 +50,13 @@ class ParserAgent:
             }}
             
             Only return valid JSON, no other text.
-            """)
-            
-            chain = prompt | self.llm
-            response = await chain.ainvoke({"query": context.original_query})
+            """
             
             # Parse the LLM response
-            import json
-            json_str = response.content
+            json_str = await complete(prompt, {
+                "query": context.original_query,
+                "previous_criteria": json.dumps(previous_criteria) if previous_criteria else "null"
+            }, self.temperature)
             
             # Extract JSON from response
             json_match = re.search(r'\{.*\}', json_str, re.DOTALL)
@@ -55,7 +65,8 @@ class ParserAgent:
                 
                 # Update context with parsed values
                 context.location = criteria.get("location")
-                context.division = criteria.get("division")
+                # Resolve the division locally when the LLM could not
+                context.division = criteria.get("division") or LocationMatcher.get_division(context.location)
                 context.min_size = criteria.get("min_size")
                 context.max_size = criteria.get("max_size")
                 context.min_price = criteria.get("min_price")
@@ -122,10 +133,47 @@ class LocationMatcher:
         "west": "West",
     }
     
+    _index: Optional[LocalityIndex] = None
+    
+    @classmethod
+    def index(cls) -> LocalityIndex:
+        """Fuzzy gazetteer, loaded on first use; LOCATION_MAP divisions take precedence"""
+        if cls._index is None:
+            index = LocalityIndex()
+            index.load_csv()
+            for name, division in cls.LOCATION_MAP.items():
+                # Division keys ("south", ...) name a division, not a locality
+                if name != division.lower():
+                    index.set_division(name, division)
+            cls._index = index
+        return cls._index
+    
+    @classmethod
+    def resolve(cls, location: str) -> Optional[LocalityMatch]:
+        """Best gazetteer match for a possibly misspelt location"""
+        if not location:
+            return None
+        return cls.index().best(location)
+    
     @classmethod
     def get_division(cls, location: str) -> Optional[str]:
         """Get division from location name"""
         if not location:
             return None
         location_lower = location.lower().strip()
-        return cls.LOCATION_MAP.get(location_lower)
+        if location_lower in cls.LOCATION_MAP:
+            return cls.LOCATION_MAP[location_lower]
+        match = cls.resolve(location)
+        if match:
+            return match.division
+        # "South Bangalore" names a division rather than a locality
+        for token in location_lower.split():
+            if cls.LOCATION_MAP.get(token, "").lower() == token:
+                return cls.LOCATION_MAP[token]
+        return None
+    
+    @classmethod
+    def canonical_name(cls, location: str) -> Optional[str]:
+        """Canonical spelling of a location, or the input when nothing matches"""
+        match = cls.resolve(location)
+        return match.name if match else location
@@ -1,10 +1,9 @@
 from typing import List, Dict, Any
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
 import json
 import re
 from app.config import settings
 from .context import SearchContext, AgentType
+from .llm import get_llm, complete
 
 class RecommendationAgent:
     """
@@ -12,11 +11,11 @@ class RecommendationAgent:
     """
     
     def __init__(self):
-        self.llm = ChatOpenAI(
-            model=settings.llm_model,
-            temperature=0.5,
-            api_key=settings.openai_api_key
-        )
+        self.temperature = 0.5
+    
+    @property
+    def llm(self):
+        return get_llm(self.temperature)
     
     async def generate_recommendations(self, context: SearchContext) -> SearchContext:
         """
@@ -69,7 +68,7 @@ class RecommendationAgent:
                 for r in context.recommendations[:5]
             ])
             
-            prompt = ChatPromptTemplate.from_template("""
+            prompt = """
             Based on the following property recommendations, provide a concise recommendation summary.
             
             User Criteria:
@@ -82,10 +81,9 @@ class RecommendationAgent:
             {recommendations}
             
             Provide a brief (2-3 sentences) recommendation summary explaining why these properties are suitable.
-            """)
+            """
             
-            chain = prompt | self.llm
-            response = await chain.ainvoke({
+            return await complete(prompt, {
                 "location": context.location or "Not specified",
                 "min_size": context.min_size or 0,
                 "max_size": context.max_size or "No limit",
@@ -93,9 +91,7 @@ class RecommendationAgent:
                 "max_price": context.max_price or float('inf'),
                 "additional_requirements": context.additional_requirements or "None",
                 "recommendations": recommendations_text
-            })
-            
-            return response.content
+            }, self.temperature)
             
         except Exception as e:
             return f"Based on your criteria, we found {len(context.recommendations)} matching properties. Please review the details above for more information."
@@ -0,0 +1,88 @@
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+@dataclass(frozen=True)
+class WeightProfile:
+    """
+    Points per scoring factor; the factor weights add up to 100
+
+    Derived constants are computed once when the profile is defined,
+    so scoring a batch only multiplies and adds.
+    """
+
+    name: str
+    price: float
+    area: float
+    rera: float
+    amenities: float
+    developer: float
+    optimal_area: float = 1200  # sqft (30x40)
+    amenity_cap: int = 5  # amenities that earn points
+    relevance: float = 10  # points taken from the others when requirements are given
+    description: str = ""
+
+    # Precompiled
+    rera_unregistered: float = field(init=False)
+    points_per_amenity: float = field(init=False)
+    factor_scale: float = field(init=False)
+
+    def __post_init__(self):
+        total = self.price + self.area + self.rera + self.amenities + self.developer
+        if abs(total - 100) > 1e-6:
+            raise ValueError(f"Weights of profile {self.name!r} add up to {total}, not 100")
+        object.__setattr__(self, "rera_unregistered", self.rera / 2)
+        object.__setattr__(self, "points_per_amenity", self.amenities / self.amenity_cap)
+        object.__setattr__(self, "factor_scale", (100 - self.relevance) / 100)
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "description": self.description,
+            "weights": {
+                "price": self.price,
+                "area": self.area,
+                "rera": self.rera,
+                "amenities": self.amenities,
+                "developer": self.developer,
+            },
+            "optimal_area": self.optimal_area,
+            "relevance": self.relevance,
+        }
+
+DEFAULT_PROFILE = WeightProfile(
+    name="default",
+    price=30, area=25, rera=20, amenities=15, developer=10,
+    description="Balanced weights used by the chat pipeline"
+)
+
+PROFILES: Dict[str, WeightProfile] = {
+    profile.name: profile
+    for profile in (
+        DEFAULT_PROFILE,
+        WeightProfile(
+            name="investor",
+            price=40, area=10, rera=25, amenities=5, developer=20,
+            description="Price relative to the market, clear title and a reliable developer"
+        ),
+        WeightProfile(
+            name="family",
+            price=20, area=25, rera=20, amenities=25, developer=10,
+            optimal_area=2400,
+            description="Larger plots (60x40) with schools, hospitals and parks nearby"
+        ),
+        WeightProfile(
+            name="budget",
+            price=50, area=20, rera=15, amenities=10, developer=5,
+            optimal_area=600,
+            description="Lowest price first, smaller plots (20x30)"
+        ),
+    )
+}
+
+def get_profile(name: str) -> WeightProfile:
+    if name not in PROFILES:
+        raise KeyError(f"Unknown weight profile: {name}")
+    return PROFILES[name]
+
+def profile_names() -> List[str]:
+    return sorted(PROFILES)
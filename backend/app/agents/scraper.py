@@ -1,35 +1,50 @@
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
-import asyncio
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime
+from sqlalchemy.orm import Session
+from app.models.property import LayoutApproval
+from app.utils.cassette import call_key, through_cassette
+from app.scrapers.authorities import Authority, authority_registry, normalize_division
 from .context import SearchContext, AgentType
+from .parser import LocationMatcher
 
 class ScraperAgent:
     """
     Scrapes planning authority websites for approved layouts
     """
     
-    def __init__(self):
-        # In production, integrate with actual scrapers
-        pass
+    def __init__(self, db: Optional[Session] = None):
+        # Approvals are kept fresh in the local store by the crawl scheduler;
+        # authorities are only scraped live when the store has nothing for the query
+        self.db = db
     
     async def scrape(self, context: SearchContext) -> SearchContext:
         """
-        Scrape planning authority data
-        Currently returns mock data - will be replaced with actual scrapers
+        Load planning authority data for the search
+        Only the authorities covering the division/locality are consulted,
+        from the local approval store or, failing that, scraped in parallel
         """
         
         try:
-            # Mock data for demonstration
-            mock_approvals = await self._get_mock_approvals(context)
-            context.layout_approvals = mock_approvals
+            location = LocationMatcher.canonical_name(context.location) if context.location else None
+            shards = authority_registry.route(context.division, location)
+            
+            approvals, source = await through_cassette(
+                "approvals",
+                call_key(context.location, context.division, context.property_type),
+                lambda: self._load_approvals(context, shards, location),
+                request={"location": context.location, "division": context.division, "property_type": context.property_type}
+            )
+            
+            context.layout_approvals = approvals
             
             context.add_workflow_step(
                 AgentType.SCRAPER,
                 "success",
                 {
                     "division": context.division,
-                    "approvals_found": len(mock_approvals),
-                    "source": "Kanakapura Planning Authority (Mock)"
+                    "approvals_found": len(approvals),
+                    "authorities": [a.code for a in shards],
+                    "source": source
                 }
             )
             
@@ -43,51 +58,98 @@ class ScraperAgent:
         
         return context
     
-    async def _get_mock_approvals(self, context: SearchContext) -> List[Dict[str, Any]]:
+    async def _load_approvals(self, context: SearchContext, shards: List[Authority], location: Optional[str]) -> Tuple[List[Dict[str, Any]], str]:
+        approvals = self._get_stored_approvals(context, shards, location)
+        if approvals:
+            return approvals, "Local approval store"
+        
+        approvals, answered = await authority_registry.search_many(shards, context.division, location)
+        return approvals, ", ".join(answered) or "No authority data"
+    
+    def _get_stored_approvals(self, context: SearchContext, shards: List[Authority], location: Optional[str]) -> List[Dict[str, Any]]:
         """
-        Mock data for testing
-        In production, this would be replaced with actual web scraping
+        Read active approvals of the routed authorities from the local store
+        maintained by the crawl scheduler
         """
         
-        mock_data = [
-            {
-                "project_name": "Kanakapura Layout - Phase 1",
-                "approval_number": "KPA/2022/001",
-                "approval_date": datetime(2022, 3, 15),
-                "approved_area": 8.5,
-                "location": "Kanakapura",
-                "division": "South",
-                "authority": "Kanakapura Planning Authority",
-                "developer_contact": "Sri Developers"
-            },
-            {
-                "project_name": "Kanakapura Green Acres",
-                "approval_number": "KPA/2021/045",
-                "approval_date": datetime(2021, 11, 20),
-                "approved_area": 6.2,
-                "location": "Kanakapura",
-                "division": "South",
-                "authority": "Kanakapura Planning Authority",
-                "developer_contact": "Green Earth Projects"
-            },
-            {
-                "project_name": "Kanakpura Residency",
-                "approval_number": "KPA/2023/012",
-                "approval_date": datetime(2023, 2, 10),
-                "approved_area": 10.0,
-                "location": "Kanakapura",
-                "division": "South",
-                "authority": "Kanakapura Planning Authority",
-                "developer_contact": "Kanakpura Builders"
-            },
-        ]
+        if self.db is None or not shards:
+            return []
+        
+        # Authority and division are stored normalized, so both are index lookups
+        query = self.db.query(LayoutApproval).filter(
+            LayoutApproval.authority.in_(authority_registry.stored_names(shards)),
+            LayoutApproval.is_active.is_(True)
+        )
         
-        # Filter by division if specified
         if context.division:
-            mock_data = [m for m in mock_data if m["division"].lower() == context.division.lower()]
+            query = query.filter(LayoutApproval.division == normalize_division(context.division))
         
-        # Filter by location if specified
-        if context.location:
-            mock_data = [m for m in mock_data if context.location.lower() in m["location"].lower()]
+        if location:
+            query = query.filter(LayoutApproval.location.ilike(f"%{location}%"))
         
-        return mock_data
+        return [
+            {
+                "id": a.id,
+                "canonical_id": a.canonical_id,
+                "project_name": a.project_name,
+                "approval_number": a.approval_number,
+                "approval_date": a.approval_date,
+                "approved_area": a.approved_area,
+                "location": a.location,
+                "division": a.division,
+                "authority": a.authority,
+                "last_scraped": a.last_scraped
+            }
+            for a in query.all()
+        ]
+
+async def _get_mock_kanakapura_approvals(division: Optional[str], location: Optional[str]) -> List[Dict[str, Any]]:
+    """
+    Mock Kanakapura Planning Authority listing for testing
+    In production, this would be replaced with actual web scraping
+    """
+    
+    mock_data = [
+        {
+            "project_name": "Kanakapura Layout - Phase 1",
+            "approval_number": "KPA/2022/001",
+            "approval_date": datetime(2022, 3, 15),
+            "approved_area": 8.5,
+            "location": "Kanakapura",
+            "division": "South",
+            "authority": "Kanakapura Planning Authority",
+            "developer_contact": "Sri Developers"
+        },
+        {
+            "project_name": "Kanakapura Green Acres",
+            "approval_number": "KPA/2021/045",
+            "approval_date": datetime(2021, 11, 20),
+            "approved_area": 6.2,
+            "location": "Kanakapura",
+            "division": "South",
+            "authority": "Kanakapura Planning Authority",
+            "developer_contact": "Green Earth Projects"
+        },
+        {
+            "project_name": "Kanakpura Residency",
+            "approval_number": "KPA/2023/012",
+            "approval_date": datetime(2023, 2, 10),
+            "approved_area": 10.0,
+            "location": "Kanakapura",
+            "division": "South",
+            "authority": "Kanakapura Planning Authority",
+            "developer_contact": "Kanakpura Builders"
+        },
+    ]
+    
+    # Filter by division if specified
+    if division:
+        mock_data = [m for m in mock_data if m["division"].lower() == division.lower()]
+    
+    # Filter by location if specified (already canonical via the locality gazetteer)
+    if location:
+        mock_data = [m for m in mock_data if location.lower() in m["location"].lower()]
+    
+    return mock_data
+
+authority_registry.register_search("KPA", _get_mock_kanakapura_approvals)
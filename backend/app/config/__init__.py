@@ -1,4 +1,4 @@
 from .settings import settings
-from .database import engine, SessionLocal, Base, get_db
+from .database import engine, SessionLocal, Base, get_db, init_db
 
-__all__ = ["settings", "engine", "SessionLocal", "Base", "get_db"]
+__all__ = ["settings", "engine", "SessionLocal", "Base", "get_db", "init_db"]
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.pool import QueuePool
 from .settings import settings
@@ -26,3 +26,41 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def init_db():
+    """Create any missing tables; run at startup or from a deploy step, never at import"""
+    import app.models  # noqa: F401 - registers models on Base.metadata
+    
+    Base.metadata.create_all(bind=engine)
+    upgrade_tables()
+
+def upgrade_tables():
+    """
+    Add columns and indexes introduced since a table was created
+    
+    create_all never alters existing tables. Only nullable columns are
+    added (new rows fill them in); anything else needs a real migration.
+    """
+    
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable:
+                    raise RuntimeError(f"{table.name}.{column.name} is NOT NULL and must be added by a migration")
+                
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+                for foreign_key in column.foreign_keys:
+                    ddl += f" REFERENCES {foreign_key.column.table.name} ({foreign_key.column.name})"
+                connection.exec_driver_sql(ddl)
+            
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
@@ -1,11 +1,21 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.config import settings, engine, Base
-from app.routes.chat import router as chat_router
-from app.models import Property, Developer, LayoutApproval, SearchHistory, AgentInteraction
-
-# Create tables
-Base.metadata.create_all(bind=engine)
+from app.config import settings, init_db
+from app.routes.chat import router as chat_router, manager as connection_manager
+from app.routes.market import router as market_router
+from app.routes.export import router as export_router
+from app.routes.analytics import router as analytics_router
+from app.routes.score import router as score_router
+from app.routes.admin import router as admin_router
+from app.routes.saved_searches import router as saved_searches_router
+from app.utils.warmup import warmup
+from app.scrapers.scheduler import crawl_scheduler
+from app.scrapers.parsing import html_parser
+from app.utils.retention import retention_job
+from app.utils.index_refresh import index_refresher
+from app.utils.analytics import rollup_buffer
+from app.utils.request_profiler import ProfilingMiddleware
+from app.utils.serialization import FastJSONResponse
 
 def create_app():
     """Create and configure FastAPI application"""
@@ -13,7 +23,9 @@ def create_app():
     app = FastAPI(
         title="AI Property Consultant API",
         description="AI Agentic workflow for property search in Bangalore",
-        version="0.1.0"
+        version="0.1.0",
+        # orjson / pydantic-core encoding for every JSON response
+        default_response_class=FastJSONResponse
     )
     
     # Configure CORS
@@ -25,8 +37,83 @@ def create_app():
         allow_headers=["*"],
     )
     
+    # Opt-in per-request profiling (profile header or sample rate)
+    app.add_middleware(ProfilingMiddleware)
+    
     # Include routers
     app.include_router(chat_router)
+    app.include_router(market_router)
+    app.include_router(export_router)
+    app.include_router(analytics_router)
+    app.include_router(score_router)
+    app.include_router(admin_router)
+    app.include_router(saved_searches_router)
+    
+    @app.on_event("startup")
+    async def create_schema():
+        if settings.auto_create_schema:
+            init_db()
+    
+    # Connections, in-memory indexes and common queries are warmed in the
+    # background; /ready reports when the replica can take traffic
+    @app.on_event("startup")
+    async def start_warmup():
+        warmup.start()
+    
+    # Indexes pick up rows written by other workers and bulk imports
+    @app.on_event("startup")
+    async def start_index_refresher():
+        index_refresher.start()
+    
+    @app.on_event("shutdown")
+    async def stop_index_refresher():
+        await index_refresher.stop()
+    
+    @app.on_event("startup")
+    async def start_session_broker():
+        await connection_manager.start()
+    
+    @app.on_event("shutdown")
+    async def stop_session_broker():
+        await connection_manager.stop()
+    
+    # Scraped HTML is parsed in worker processes, off the event loop
+    @app.on_event("startup")
+    async def start_html_parser():
+        html_parser.start()
+    
+    @app.on_event("shutdown")
+    async def stop_html_parser():
+        html_parser.stop()
+    
+    # Background crawl keeps the local approval store fresh
+    @app.on_event("startup")
+    async def start_crawl_scheduler():
+        if settings.crawl_scheduler_enabled:
+            crawl_scheduler.start()
+    
+    @app.on_event("shutdown")
+    async def stop_crawl_scheduler():
+        await crawl_scheduler.stop()
+    
+    # Search analytics are aggregated in memory and flushed periodically
+    @app.on_event("startup")
+    async def start_rollup_flush():
+        rollup_buffer.start()
+    
+    @app.on_event("shutdown")
+    async def stop_rollup_flush():
+        await rollup_buffer.stop()
+    
+    # Archive and purge old search history
+    @app.on_event("startup")
+    async def start_retention_job():
+        if settings.retention_enabled:
+            retention_job.start()
+    
+    @app.on_event("shutdown")
+    async def stop_retention_job():
+        await retention_job.stop()
     
     # Health check endpoint
     @app.get("/health")
@@ -37,6 +124,12 @@ def create_app():
             "version": "0.1.0"
         }
     
+    # Readiness probe for load balancers; /health only says the process is up
+    @app.get("/ready")
+    async def readiness_check():
+        status = warmup.status()
+        return FastJSONResponse(status_code=200 if status["ready"] else 503, content=status)
+    
     @app.get("/")
     async def root():
         return {
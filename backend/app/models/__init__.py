@@ -1,11 +1,16 @@
-from .property import Property, Developer, LayoutApproval, SearchHistory, AgentInteraction, PropertyType, PropertyStatus
+from .property import Property, Developer, LayoutApproval, Brochure, SearchHistory, AgentInteraction, SearchRollup, StageLatencyRollup, SavedSearch, SavedSearchNotification, PropertyType, PropertyStatus
 
 __all__ = [
     "Property",
     "Developer", 
     "LayoutApproval",
+    "Brochure",
     "SearchHistory",
     "AgentInteraction",
+    "SearchRollup",
+    "StageLatencyRollup",
+    "SavedSearch",
+    "SavedSearchNotification",
     "PropertyType",
     "PropertyStatus"
 ]
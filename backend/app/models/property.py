@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, DateTime, Text, Boolean, ForeignKey, JSON, Enum
+from sqlalchemy import Column, String, Integer, Float, DateTime, Text, Boolean, ForeignKey, JSON, Enum, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -46,7 +46,7 @@ class Property(Base):
     
     # Metadata
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     last_scraped = Column(DateTime, nullable=True)
     
     # Relationships
@@ -75,7 +75,7 @@ class Developer(Base):
     total_projects = Column(Integer, default=0)
     
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relationships
     properties = relationship("Property", back_populates="developer")
@@ -85,6 +85,10 @@ class Developer(Base):
 
 class LayoutApproval(Base):
     __tablename__ = "layout_approvals"
+    __table_args__ = (
+        # Searches are routed to authority shards, then narrowed by division
+        Index("ix_layout_approvals_authority_division", "authority", "division"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     project_name = Column(String(255), nullable=False)
@@ -109,8 +113,11 @@ class LayoutApproval(Base):
     # Status
     is_active = Column(Boolean, default=True)
     
+    # Set on duplicates of a project already stored under another name or source
+    canonical_id = Column(Integer, ForeignKey("layout_approvals.id"), nullable=True, index=True)
+    
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     last_scraped = Column(DateTime, nullable=True)
     
     # Relationships
@@ -119,6 +126,28 @@ class LayoutApproval(Base):
     def __repr__(self):
         return f"<LayoutApproval {self.project_name}>"
 
+class Brochure(Base):
+    __tablename__ = "brochures"
+    __table_args__ = (
+        UniqueConstraint("project_name", "developer_name", name="uq_brochure_project_developer"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    project_name = Column(String(255), nullable=False, index=True)
+    developer_name = Column(String(255), nullable=False)
+    
+    # Brochure as fetched: prices_per_plot, amenities, RERA details
+    content = Column(JSON, nullable=False)
+    content_hash = Column(String(64), nullable=False)
+    version = Column(Integer, nullable=False, default=1)  # bumped when the content hash changes
+    
+    fetched_at = Column(DateTime, nullable=False)  # last crawl, changed or not
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f"<Brochure {self.project_name} v{self.version}>"
+
 class SearchHistory(Base):
     __tablename__ = "search_history"
     
@@ -137,7 +166,7 @@ class SearchHistory(Base):
     workflow_status = Column(String(50), default="pending")  # pending, processing, completed, failed
     workflow_trace = Column(JSON, nullable=True)  # Trace of agent steps
     
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __repr__(self):
@@ -147,7 +176,7 @@ class AgentInteraction(Base):
     __tablename__ = "agent_interactions"
     
     id = Column(Integer, primary_key=True, index=True)
-    search_history_id = Column(Integer, ForeignKey("search_history.id"))
+    search_history_id = Column(Integer, ForeignKey("search_history.id"), index=True)
     
     # Agent details
     agent_name = Column(String(100), nullable=False)
@@ -162,7 +191,88 @@ class AgentInteraction(Base):
     error_message = Column(Text, nullable=True)
     execution_time = Column(Float, nullable=True)  # in seconds
     
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     
     def __repr__(self):
         return f"<AgentInteraction {self.agent_name}>"
+
+class SearchRollup(Base):
+    __tablename__ = "search_rollups"
+    __table_args__ = (
+        UniqueConstraint("granularity", "bucket_start", "dimension", "value", name="uq_search_rollup_key"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    granularity = Column(String(10), nullable=False)  # hour, day
+    bucket_start = Column(DateTime, nullable=False, index=True)
+    dimension = Column(String(50), nullable=False)  # division, locality, price_band, status
+    value = Column(String(255), nullable=False)
+    
+    searches = Column(Integer, nullable=False, default=0)
+    results = Column(Integer, nullable=False, default=0)  # recommendations returned
+    
+    def __repr__(self):
+        return f"<SearchRollup {self.granularity} {self.bucket_start} {self.dimension}={self.value}>"
+
+class StageLatencyRollup(Base):
+    __tablename__ = "stage_latency_rollups"
+    __table_args__ = (
+        UniqueConstraint("granularity", "bucket_start", "stage", name="uq_stage_latency_rollup_key"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    granularity = Column(String(10), nullable=False)
+    bucket_start = Column(DateTime, nullable=False, index=True)
+    stage = Column(String(50), nullable=False)  # parse, scrape, ..., total
+    
+    count = Column(Integer, nullable=False, default=0)
+    total_seconds = Column(Float, nullable=False, default=0.0)
+    max_seconds = Column(Float, nullable=False, default=0.0)
+    sketch = Column(JSON, nullable=False)  # QuantileSketch of seconds
+    
+    def __repr__(self):
+        return f"<StageLatencyRollup {self.granularity} {self.bucket_start} {self.stage}>"
+
+class SavedSearch(Base):
+    __tablename__ = "saved_searches"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String(255), nullable=False, index=True)
+    name = Column(String(255), nullable=False)
+    
+    # Criteria; None means "any"
+    division = Column(String(100), nullable=True)
+    locality = Column(String(255), nullable=True)  # canonical gazetteer name
+    min_price = Column(Float, nullable=True)  # in rupees
+    max_price = Column(Float, nullable=True)
+    min_size = Column(Float, nullable=True)  # in sq ft
+    max_size = Column(Float, nullable=True)
+    property_type = Column(String(50), nullable=True)
+    
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f"<SavedSearch {self.id} - {self.user_id}>"
+
+class SavedSearchNotification(Base):
+    __tablename__ = "saved_search_notifications"
+    __table_args__ = (
+        UniqueConstraint("saved_search_id", "record_type", "record_id", name="uq_saved_search_notification"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    saved_search_id = Column(Integer, ForeignKey("saved_searches.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(String(255), nullable=False, index=True)
+    
+    # The new record that matched
+    record_type = Column(String(20), nullable=False)  # approval, property
+    record_id = Column(Integer, nullable=False)
+    summary = Column(JSON, nullable=False)  # name, location, division, price, area
+    
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    read_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<SavedSearchNotification {self.saved_search_id} {self.record_type}:{self.record_id}>"
@@ -1,3 +1,9 @@
 from app.routes.chat import router as chat_router
+from app.routes.market import router as market_router
+from app.routes.export import router as export_router
+from app.routes.analytics import router as analytics_router
+from app.routes.score import router as score_router
+from app.routes.admin import router as admin_router
+from app.routes.saved_searches import router as saved_searches_router
 
-__all__ = ["chat_router"]
+__all__ = ["chat_router", "market_router", "export_router", "analytics_router", "score_router", "admin_router", "saved_searches_router"]
@@ -0,0 +1,49 @@
+import hmac
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse
+from app.config import settings
+from app.utils.request_profiler import request_profiler
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    # Fails closed: without a configured token the admin routes are disabled
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+@router.get("/profiles")
+async def list_profiles() -> List[Dict[str, Any]]:
+    """
+    Captured request profiles, newest first
+    """
+    
+    return request_profiler.list()
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(profile_id: str):
+    """
+    Download a profile (pstats format, e.g. for snakeviz)
+    """
+    
+    path = request_profiler.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+
+@router.get("/profiles/{profile_id}/summary")
+async def profile_summary(
+    profile_id: str,
+    sort: str = Query(default="cumulative", pattern="^(cumulative|tottime|ncalls)$"),
+    limit: int = Query(default=40, ge=1, le=500)
+):
+    """
+    Top functions of a profile as text
+    """
+    
+    summary = request_profiler.summary(profile_id, sort, limit)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(summary)
@@ -0,0 +1,56 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from app.config import get_db
+from app.schemas import SearchAnalyticsResponse, StageLatencyResponse
+from app.utils.analytics import default_since, stage_latency, top_values
+
+router = APIRouter(prefix="/api/analytics", tags=["analytics"])
+
+GRANULARITY = "^(hour|day)$"
+
+@router.get("/searches")
+async def get_search_analytics(
+    dimension: str = Query(default="locality", pattern="^(division|locality|price_band|status)$"),
+    granularity: str = Query(default="day", pattern=GRANULARITY),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(default=20, ge=1, le=500),
+    by_bucket: bool = False,
+    db: Session = Depends(get_db)
+) -> SearchAnalyticsResponse:
+    """
+    Search counts by division, locality, price band or status, read from the rollups
+    """
+    
+    since = since or default_since(granularity)
+    entries = top_values(db, dimension, granularity, since, until, limit, by_bucket)
+    
+    return SearchAnalyticsResponse(
+        dimension=dimension,
+        granularity=granularity,
+        since=since,
+        until=until,
+        entries=entries
+    )
+
+@router.get("/stage-latency")
+async def get_stage_latency(
+    granularity: str = Query(default="hour", pattern=GRANULARITY),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+) -> StageLatencyResponse:
+    """
+    Pipeline time per stage (p50/p95/p99 in seconds), read from the rollups
+    """
+    
+    since = since or default_since(granularity)
+    
+    return StageLatencyResponse(
+        granularity=granularity,
+        since=since,
+        until=until,
+        stages=stage_latency(db, granularity, since, until)
+    )
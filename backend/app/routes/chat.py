@@ -1,35 +1,148 @@
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from typing import Awaitable, Callable, Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from sqlalchemy.orm import Session
-from app.config import get_db
-from app.schemas import ChatRequest, ChatResponse, LocationResponse, MapDivision
+from app.config import get_db, settings
+from app.schemas import ChatRequest, ChatResponse, LocationResponse, MapDivision, ResultPageResponse
 from app.agents.orchestrator import AgentOrchestrator
+from app.utils.admission import admission, client_key, AdmissionRejected, Priority
+from app.utils.ranking_cache import ranking_snapshots, InvalidCursor
+from app.utils.serialization import FastJSONResponse, dumps_text, envelope
+from app.utils.session_broker import SessionBroker, create_session_broker
 import uuid
 import asyncio
 
 router = APIRouter(prefix="/api", tags=["chat"])
 
-# Store for websocket connections
+class ClientConnection:
+    """
+    A local WebSocket with its own bounded send queue
+    
+    A writer task drains the queue, so one slow client never blocks
+    delivery to the others. A failed send calls on_failure, which
+    disconnects the client.
+    """
+    
+    def __init__(self, websocket: WebSocket, max_queue: int, on_failure: Callable[["ClientConnection"], Awaitable[None]]):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.on_failure = on_failure
+        self.writer = asyncio.create_task(self._drain())
+    
+    async def _drain(self):
+        while True:
+            message = await self.queue.get()
+            if message is None:
+                break
+            try:
+                await self.websocket.send_text(message)
+            except Exception as e:
+                print(f"WebSocket send failed: {e!r}")
+                await self.on_failure(self)
+                return
+    
+    async def close(self, code: int = 1000, flush_timeout: float = 0):
+        if flush_timeout:
+            # Let already queued messages go out before closing
+            try:
+                self.queue.put_nowait(None)
+                await asyncio.wait_for(asyncio.shield(self.writer), timeout=flush_timeout)
+            except Exception:
+                pass
+        if self.writer is not asyncio.current_task():
+            self.writer.cancel()
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+# Store for websocket connections held by this worker; delivery to
+# sessions on other workers goes through the session broker
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections = {}
+    def __init__(self, broker: SessionBroker):
+        self.broker = broker
+        self.active_connections: Dict[str, ClientConnection] = {}
+    
+    async def start(self):
+        await self.broker.start(self._deliver)
     
-    async def connect(self, session_id: str, websocket: WebSocket):
+    async def stop(self):
+        for session_id in list(self.active_connections):
+            await self.disconnect(session_id)
+        await self.broker.stop()
+    
+    async def connect(self, session_id: str, websocket: WebSocket) -> ClientConnection:
         await websocket.accept()
-        self.active_connections[session_id] = websocket
+        
+        # A reconnect replaces the session's previous socket, which is closed
+        # rather than left behind with a live writer task
+        previous = self.active_connections.pop(session_id, None)
+        if previous is not None:
+            await previous.close(1000)
+        
+        connection = ClientConnection(websocket, settings.ws_send_queue_size, self._send_failed)
+        self.active_connections[session_id] = connection
+        if previous is None:
+            await self.broker.subscribe(session_id)
+        return connection
     
-    async def disconnect(self, session_id: str):
-        if session_id in self.active_connections:
-            del self.active_connections[session_id]
+    async def disconnect(self, session_id: str, code: int = 1000, connection: Optional[ClientConnection] = None):
+        """
+        Close a session's socket; given a connection, only that one is closed,
+        so a replaced socket going away leaves its successor in place
+        """
+        
+        current = self.active_connections.get(session_id)
+        if connection is not None and connection is not current:
+            await connection.close(code)
+            return
+        
+        connection = self.active_connections.pop(session_id, None)
+        if connection is not None:
+            await self.broker.unsubscribe(session_id)
+            # Slow (1013) and failed (1011) clients are dropped without waiting on them
+            await connection.close(code, flush_timeout=settings.ws_send_timeout if code == 1000 else 0)
+    
+    async def _send_failed(self, connection: ClientConnection):
+        for session_id, current in list(self.active_connections.items()):
+            if current is connection:
+                await self.disconnect(session_id, code=1011, connection=connection)
+                return
+        await connection.close(1011)
     
     async def send_personal(self, session_id: str, message: str):
-        if session_id in self.active_connections:
-            await self.active_connections[session_id].send_text(message)
+        """
+        Send to a session; local sessions are written directly and wait
+        for queue space, remote ones are published through the broker
+        """
+        
+        connection = self.active_connections.get(session_id)
+        if connection is None:
+            await self.broker.publish(session_id, message)
+            return
+        
+        try:
+            await asyncio.wait_for(connection.queue.put(message), timeout=settings.ws_send_timeout)
+        except asyncio.TimeoutError:
+            await self.disconnect(session_id, code=1013)
+    
+    async def _deliver(self, session_id: str, message: str):
+        """Broker callback; never waits, so the listener is not stalled by one client"""
+        
+        connection = self.active_connections.get(session_id)
+        if connection is None:
+            return
+        
+        try:
+            connection.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            await self.disconnect(session_id, code=1013)
 
-manager = ConnectionManager()
+manager = ConnectionManager(create_session_broker())
 
 @router.post("/chat")
 async def chat(
     request: ChatRequest,
+    http_request: Request,
     db: Session = Depends(get_db)
 ) -> ChatResponse:
     """
@@ -43,24 +156,60 @@ async def chat(
     session_id = request.session_id or str(uuid.uuid4())
     
     try:
-        orchestrator = AgentOrchestrator(db)
-        response = await orchestrator.process_query(
-            user_query=request.message,
-            user_id=user_id,
-            session_id=session_id
-        )
-        return response
+        async with admission.admit(Priority.INTERACTIVE, user_id=client_key(http_request, "chat"), session_id=session_id):
+            orchestrator = AgentOrchestrator(db)
+            response = await orchestrator.process_query(
+                user_query=request.message,
+                user_id=user_id,
+                session_id=session_id
+            )
+        # Dumped straight to JSON by pydantic, skipping FastAPI's re-validation
+        return FastJSONResponse(response)
     
+    except AdmissionRejected as e:
+        raise e.http_error()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
 
+@router.get("/results/{result_id}")
+async def get_result_page(
+    result_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=20, ge=1, le=100)
+) -> ResultPageResponse:
+    """
+    Page through the full ranking of a previous search without re-running it
+    """
+    
+    try:
+        page = ranking_snapshots.page(result_id, cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if page is None:
+        raise HTTPException(status_code=404, detail="Result expired or not found, please search again")
+    
+    snapshot, offset, items, next_cursor = page
+    
+    return ResultPageResponse(
+        result_id=result_id,
+        properties=[
+            AgentOrchestrator.format_property(rec, position, snapshot.created_at)
+            for position, rec in enumerate(items, offset + 1)
+        ],
+        total=len(snapshot.items),
+        next_cursor=next_cursor
+    )
+
 @router.websocket("/ws/chat/{session_id}")
 async def websocket_chat(websocket: WebSocket, session_id: str, db: Session = Depends(get_db)):
     """
     WebSocket endpoint for real-time chat
     """
     
-    await manager.connect(session_id, websocket)
+    connection = await manager.connect(session_id, websocket)
+    # Shares the chat endpoint's per-client limit
+    rate_key = client_key(websocket, "chat")
     
     try:
         orchestrator = AgentOrchestrator(db)
@@ -68,31 +217,33 @@ async def websocket_chat(websocket: WebSocket, session_id: str, db: Session = De
         while True:
             data = await websocket.receive_text()
             
-            # Send processing status
-            await manager.send_personal(session_id, '{"type": "status", "message": "Processing your query..."}')
-            
-            # Process query
-            response = await orchestrator.process_query(
-                user_query=data,
-                user_id="websocket_user",
-                session_id=session_id
-            )
+            try:
+                async with admission.admit(Priority.INTERACTIVE, user_id=rate_key, session_id=session_id):
+                    # Send processing status
+                    await manager.send_personal(session_id, '{"type": "status", "message": "Processing your query..."}')
+                    
+                    # Process query
+                    response = await orchestrator.process_query(
+                        user_query=data,
+                        user_id="websocket_user",
+                        session_id=session_id
+                    )
+            except AdmissionRejected as e:
+                # Rejected messages keep the socket open; the client may retry
+                await manager.send_personal(
+                    session_id,
+                    dumps_text({"type": "error", "code": 429, "message": e.reason, "retry_after": e.retry_after})
+                )
+                continue
             
             # Send response
-            import json
-            await manager.send_personal(
-                session_id,
-                json.dumps({
-                    "type": "response",
-                    "data": response.model_dump()
-                })
-            )
+            await manager.send_personal(session_id, envelope("response", response))
     
     except WebSocketDisconnect:
-        manager.disconnect(session_id)
+        await manager.disconnect(session_id, connection=connection)
     except Exception as e:
-        await manager.send_personal(session_id, f'{{"type": "error", "message": "{str(e)}"}}')
-        manager.disconnect(session_id)
+        await manager.send_personal(session_id, dumps_text({"type": "error", "message": str(e)}))
+        await manager.disconnect(session_id, connection=connection)
 
 @router.get("/locations")
 async def get_locations() -> LocationResponse:
@@ -155,6 +306,7 @@ async def get_locations() -> LocationResponse:
 @router.post("/search-by-location")
 async def search_by_location(
     division: str,
+    request: Request,
     db: Session = Depends(get_db)
 ) -> ChatResponse:
     """
@@ -163,10 +315,15 @@ async def search_by_location(
     
     query = f"Show me available properties in {division} Bangalore"
     
-    orchestrator = AgentOrchestrator(db)
-    response = await orchestrator.process_query(
-        user_query=query,
-        user_id="map_selection"
-    )
+    try:
+        # Map clicks are anonymous, so they are limited per client address
+        async with admission.admit(Priority.MAP, user_id=client_key(request, "map")):
+            orchestrator = AgentOrchestrator(db)
+            response = await orchestrator.process_query(
+                user_query=query,
+                user_id="map_selection"
+            )
+    except AdmissionRejected as e:
+        raise e.http_error()
     
     return response
@@ -0,0 +1,124 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from app.config import SessionLocal, settings
+from app.models.property import SearchHistory
+from app.routes.admin import require_admin
+from app.utils.ranking_cache import ranking_snapshots
+from app.utils.serialization import dumps_text
+import csv
+import io
+
+router = APIRouter(prefix="/api/export", tags=["export"])
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return dumps_text(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _encode(rows: Iterable[Dict[str, Any]], fmt: str, columns: List[str]) -> Iterator[str]:
+    """
+    Encode rows as NDJSON lines or CSV, yielding chunks of export_chunk_rows rows
+    Nested values (JSON columns) are written as JSON strings in CSV
+    """
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    pending = 0
+
+    if writer:
+        writer.writerow(columns)
+
+    for row in rows:
+        if writer:
+            writer.writerow([_csv_value(row.get(c)) for c in columns])
+        else:
+            buffer.write(dumps_text(row))
+            buffer.write("\n")
+
+        pending += 1
+        if pending >= settings.export_chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _stream_table(statement, columns: List[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Stream rows with a server-side cursor, export_batch_size rows at a time
+    Runs in the threadpool via StreamingResponse and uses its own session,
+    since the response outlives the request's dependencies
+    """
+
+    db = SessionLocal()
+    try:
+        result = db.execute(statement.execution_options(yield_per=settings.export_batch_size))
+        for row in result:
+            mapping = row._mapping
+            yield {c: mapping[c] for c in columns}
+    finally:
+        db.close()
+
+def _response(chunks: Iterator[str], fmt: str, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
+
+# Every user's queries and workflow traces: admin only. Result exports stay
+# open, since a result id is only handed to the user who ran the search
+@router.get("/search-history", dependencies=[Depends(require_admin)])
+async def export_search_history(
+    format: str = Query(default="ndjson", pattern="^(ndjson|csv)$"),
+    user_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_trace: bool = True
+):
+    """
+    Stream search history as NDJSON or CSV with constant memory
+    """
+
+    table = SearchHistory.__table__
+    columns = [c.name for c in table.columns if include_trace or c.name != "workflow_trace"]
+
+    statement = select(*(table.c[c] for c in columns)).order_by(table.c.id)
+    if user_id:
+        statement = statement.where(table.c.user_id == user_id)
+    if since:
+        statement = statement.where(table.c.created_at >= since)
+    if until:
+        statement = statement.where(table.c.created_at < until)
+
+    return _response(_encode(_stream_table(statement, columns), format, columns), format, "search_history")
+
+@router.get("/results/{result_id}")
+async def export_results(
+    result_id: str,
+    format: str = Query(default="ndjson", pattern="^(ndjson|csv)$")
+):
+    """
+    Stream the full scored result set of a search from its ranking snapshot
+    """
+
+    snapshot = ranking_snapshots.get(result_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Result expired or not found, please search again")
+
+    rows = ({"rank": rank, **item} for rank, item in enumerate(snapshot.items, 1))
+    columns = ["rank"] + list(dict.fromkeys(key for item in snapshot.items for key in item))
+
+    return _response(_encode(rows, format, columns), format, f"results_{result_id}")
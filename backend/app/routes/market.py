@@ -0,0 +1,31 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from app.schemas import MarketStatsResponse
+from app.utils.market_stats import market_stats, DIVISION, LOCALITY
+
+router = APIRouter(prefix="/api", tags=["market"])
+
+@router.get("/market-stats")
+async def get_market_stats(
+    division: Optional[str] = None,
+    locality: Optional[str] = None
+) -> MarketStatsResponse:
+    """
+    Price per sqft distributions by division and locality
+    """
+    
+    if division or locality:
+        stats = [
+            summary
+            for summary in (
+                market_stats.summary(DIVISION, division) if division else None,
+                market_stats.summary(LOCALITY, locality) if locality else None
+            )
+            if summary is not None
+        ]
+        if not stats:
+            raise HTTPException(status_code=404, detail="No market data for the requested area")
+    else:
+        stats = market_stats.summaries()
+    
+    return MarketStatsResponse(stats=stats)
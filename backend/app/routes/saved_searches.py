@@ -0,0 +1,123 @@
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.config import get_db, settings
+from app.models.property import SavedSearch, SavedSearchNotification
+from app.schemas import SavedSearchCreate, SavedSearchResponse, SavedSearchNotificationResponse
+from app.agents.parser import LocationMatcher
+
+router = APIRouter(prefix="/api/saved-searches", tags=["saved-searches"])
+
+def _describe(request: SavedSearchCreate, locality: Optional[str]) -> str:
+    parts = [request.property_type or "Property", f"in {locality or request.division or 'Bangalore'}"]
+    if request.max_price:
+        parts.append(f"under ₹{request.max_price:,.0f}")
+    return " ".join(parts)
+
+@router.post("")
+async def create_saved_search(
+    request: SavedSearchCreate,
+    db: Session = Depends(get_db)
+) -> SavedSearchResponse:
+    """
+    Save criteria to be alerted when a matching approval or property is ingested
+    """
+
+    criteria = request.model_dump(exclude={"user_id", "name"})
+    if not any(criteria.values()):
+        raise HTTPException(status_code=400, detail="A saved search needs at least one criterion")
+
+    count = db.query(SavedSearch).filter(
+        SavedSearch.user_id == request.user_id,
+        SavedSearch.is_active.is_(True)
+    ).count()
+    if count >= settings.saved_searches_per_user:
+        raise HTTPException(status_code=400, detail=f"At most {settings.saved_searches_per_user} saved searches per user")
+
+    locality = LocationMatcher.canonical_name(request.location) if request.location else None
+    saved_search = SavedSearch(
+        user_id=request.user_id,
+        name=request.name or _describe(request, locality),
+        division=request.division,
+        locality=locality,
+        min_price=request.min_price,
+        max_price=request.max_price,
+        min_size=request.min_size,
+        max_size=request.max_size,
+        property_type=request.property_type
+    )
+    db.add(saved_search)
+    db.commit()
+    db.refresh(saved_search)
+
+    return saved_search
+
+@router.get("")
+async def list_saved_searches(user_id: str, db: Session = Depends(get_db)) -> List[SavedSearchResponse]:
+    """
+    A user's active saved searches
+    """
+
+    return db.query(SavedSearch).filter(
+        SavedSearch.user_id == user_id,
+        SavedSearch.is_active.is_(True)
+    ).order_by(SavedSearch.created_at.desc()).all()
+
+@router.delete("/{saved_search_id}")
+async def delete_saved_search(saved_search_id: int, user_id: str, db: Session = Depends(get_db)):
+    """
+    Delete a saved search and its notifications
+
+    The search is deactivated rather than removed, so other workers see
+    the change through the index refresher and stop matching it.
+    """
+
+    saved_search = db.get(SavedSearch, saved_search_id)
+    if saved_search is None or saved_search.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Saved search not found")
+
+    db.query(SavedSearchNotification).filter(
+        SavedSearchNotification.saved_search_id == saved_search_id
+    ).delete(synchronize_session=False)
+    saved_search.is_active = False
+    db.commit()
+
+    return {"deleted": saved_search_id}
+
+@router.get("/notifications")
+async def list_notifications(
+    user_id: str,
+    unread_only: bool = False,
+    limit: int = Query(default=50, ge=1, le=500),
+    db: Session = Depends(get_db)
+) -> List[SavedSearchNotificationResponse]:
+    """
+    New approvals and properties that matched a user's saved searches, newest first
+    """
+
+    query = db.query(SavedSearchNotification).filter(SavedSearchNotification.user_id == user_id)
+    if unread_only:
+        query = query.filter(SavedSearchNotification.read_at.is_(None))
+    return query.order_by(SavedSearchNotification.id.desc()).limit(limit).all()
+
+@router.post("/notifications/read")
+async def mark_notifications_read(
+    user_id: str,
+    ids: List[int] = Query(default=None),
+    db: Session = Depends(get_db)
+):
+    """
+    Mark notifications read; all of the user's unread ones when no ids are given
+    """
+
+    query = db.query(SavedSearchNotification).filter(
+        SavedSearchNotification.user_id == user_id,
+        SavedSearchNotification.read_at.is_(None)
+    )
+    if ids:
+        query = query.filter(SavedSearchNotification.id.in_(ids))
+    updated = query.update({SavedSearchNotification.read_at: datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+
+    return {"updated": updated}
@@ -0,0 +1,72 @@
+from typing import Any, Dict, Iterator, List
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from app.config import settings
+from app.schemas import ScoreRequest, WeightProfileResponse
+from app.agents.comparison import ComparisonAgent
+from app.agents.scoring import PROFILES, get_profile
+from app.utils.admission import admission, client_key, AdmissionRejected, Priority
+from app.utils.serialization import dumps_text
+import asyncio
+
+router = APIRouter(prefix="/api", tags=["score"])
+
+def _encode(scored: List[Dict[str, Any]], order: List[int]) -> Iterator[str]:
+    """NDJSON lines in chunks of export_chunk_rows"""
+    
+    lines = []
+    for rank, index in enumerate(order, 1):
+        item = scored[index]
+        lines.append(dumps_text({
+            "index": index,
+            "id": item.get("id"),
+            "rank": rank,
+            "total_score": item["total_score"],
+            "scores": item["scores"]
+        }))
+        if len(lines) >= settings.export_chunk_rows:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+@router.get("/score/profiles")
+async def list_weight_profiles() -> List[WeightProfileResponse]:
+    """
+    Named weight profiles available to /api/score
+    """
+    
+    return [profile.to_dict() for profile in PROFILES.values()]
+
+@router.post("/score")
+async def score_properties(request: ScoreRequest, http_request: Request):
+    """
+    Score a candidate list in one pass with a named weight profile
+    Results stream back as NDJSON, in input order or best first
+    """
+    
+    try:
+        profile = get_profile(request.profile)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    
+    if len(request.properties) > settings.score_max_candidates:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.score_max_candidates} properties can be scored per request"
+        )
+    
+    records = [candidate.model_dump() for candidate in request.properties]
+    
+    try:
+        async with admission.admit(Priority.BATCH, user_id=client_key(http_request, "score")):
+            # CPU bound; keep the event loop free for interactive traffic
+            scored = await asyncio.to_thread(ComparisonAgent().score_batch, records, profile)
+    except AdmissionRejected as e:
+        raise e.http_error()
+    
+    order = list(range(len(scored)))
+    if request.sort:
+        order.sort(key=lambda i: scored[i]["total_score"], reverse=True)
+    
+    return StreamingResponse(_encode(scored, order), media_type="application/x-ndjson")
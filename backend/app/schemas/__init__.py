@@ -2,16 +2,24 @@ from .property import (
     PropertyBase, PropertyCreate, PropertyUpdate, PropertyResponse,
     DeveloperBase, DeveloperCreate, DeveloperResponse,
     LayoutApprovalBase, LayoutApprovalCreate, LayoutApprovalResponse,
-    SearchCriteria, ChatMessage, ChatRequest, ChatResponse,
+    SearchCriteria, ChatMessage, ChatRequest, ChatResponse, ResultPageResponse,
     SearchHistoryResponse, AgentInteractionResponse,
-    MapDivision, LocationResponse
+    MapDivision, LocationResponse,
+    MarketStatsEntry, MarketStatsResponse,
+    SearchRollupEntry, StageLatencyEntry, SearchAnalyticsResponse, StageLatencyResponse,
+    ScoreCandidate, ScoreRequest, WeightProfileResponse,
+    SavedSearchCreate, SavedSearchResponse, SavedSearchNotificationResponse
 )
 
 __all__ = [
     "PropertyBase", "PropertyCreate", "PropertyUpdate", "PropertyResponse",
     "DeveloperBase", "DeveloperCreate", "DeveloperResponse",
     "LayoutApprovalBase", "LayoutApprovalCreate", "LayoutApprovalResponse",
-    "SearchCriteria", "ChatMessage", "ChatRequest", "ChatResponse",
+    "SearchCriteria", "ChatMessage", "ChatRequest", "ChatResponse", "ResultPageResponse",
     "SearchHistoryResponse", "AgentInteractionResponse",
-    "MapDivision", "LocationResponse"
+    "MapDivision", "LocationResponse",
+    "MarketStatsEntry", "MarketStatsResponse",
+    "SearchRollupEntry", "StageLatencyEntry", "SearchAnalyticsResponse", "StageLatencyResponse",
+    "ScoreCandidate", "ScoreRequest", "WeightProfileResponse",
+    "SavedSearchCreate", "SavedSearchResponse", "SavedSearchNotificationResponse"
 ]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 from datetime import datetime
 
 # Property Schemas
@@ -80,6 +80,7 @@ class LayoutApprovalCreate(LayoutApprovalBase):
 class LayoutApprovalResponse(LayoutApprovalBase):
     id: int
     is_active: bool
+    canonical_id: Optional[int] = None  # set on duplicates of another approval
     created_at: datetime
     updated_at: datetime
     last_scraped: Optional[datetime] = None
@@ -113,6 +114,14 @@ class ChatResponse(BaseModel):
     properties: Optional[List[PropertyResponse]] = None
     reasoning: Optional[str] = None
     workflow_trace: Optional[Dict[str, Any]] = None
+    result_id: Optional[str] = None
+    next_cursor: Optional[str] = None
+
+class ResultPageResponse(BaseModel):
+    result_id: str
+    properties: List[PropertyResponse]
+    total: int
+    next_cursor: Optional[str] = None
 
 class SearchHistoryResponse(BaseModel):
     id: int
@@ -148,3 +157,106 @@ class MapDivision(BaseModel):
 class LocationResponse(BaseModel):
     divisions: List[MapDivision]
     areas: Optional[List[str]] = None
+
+# Market Statistics Schemas
+class MarketStatsEntry(BaseModel):
+    scope: str  # division or locality
+    name: str
+    count: int
+    mean: Optional[float] = None
+    percentiles: Dict[str, float]
+
+class MarketStatsResponse(BaseModel):
+    stats: List[MarketStatsEntry]
+
+class SearchRollupEntry(BaseModel):
+    value: str
+    searches: int
+    results: int
+    bucket_start: Optional[datetime] = None  # set when grouped by bucket
+
+class StageLatencyEntry(BaseModel):
+    stage: str
+    count: int
+    mean: float  # seconds
+    percentiles: Dict[str, float]
+    max: float
+
+class SearchAnalyticsResponse(BaseModel):
+    dimension: str
+    granularity: str
+    since: datetime
+    until: Optional[datetime] = None
+    entries: List[SearchRollupEntry]
+
+class StageLatencyResponse(BaseModel):
+    granularity: str
+    since: datetime
+    until: Optional[datetime] = None
+    stages: List[StageLatencyEntry]
+
+class ScoreCandidate(BaseModel):
+    id: Optional[str] = None  # caller's reference, echoed back
+    name: Optional[str] = None
+    location: Optional[str] = None
+    division: Optional[str] = None
+    area: float
+    price: float
+    price_per_sqft: Optional[float] = None
+    rera_registered: bool = False
+    amenities: Optional[Union[List[str], Dict[str, Any]]] = None
+    developer: Optional[str] = None
+
+class ScoreRequest(BaseModel):
+    profile: str = "default"
+    user_id: Optional[str] = None
+    properties: List[ScoreCandidate]
+    sort: bool = False  # best first instead of input order
+
+class WeightProfileResponse(BaseModel):
+    name: str
+    description: str
+    weights: Dict[str, float]
+    optimal_area: float
+    relevance: float
+
+# Saved Search Schemas
+class SavedSearchCreate(BaseModel):
+    user_id: str
+    name: Optional[str] = None
+    location: Optional[str] = None
+    division: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    min_size: Optional[float] = Field(default=None, description="Minimum plot size in sq ft")
+    max_size: Optional[float] = None
+    property_type: Optional[str] = None
+
+class SavedSearchResponse(BaseModel):
+    id: int
+    user_id: str
+    name: str
+    division: Optional[str] = None
+    locality: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    min_size: Optional[float] = None
+    max_size: Optional[float] = None
+    property_type: Optional[str] = None
+    is_active: bool
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class SavedSearchNotificationResponse(BaseModel):
+    id: int
+    saved_search_id: int
+    record_type: str  # approval, property
+    record_id: int
+    summary: Dict[str, Any]
+    created_at: datetime
+    read_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
@@ -0,0 +1,366 @@
+"""
+Planning authorities, their jurisdictions and per-authority scraping
+
+Approvals are sharded by authority: each search is routed only to the
+authorities whose jurisdiction covers its division or locality, both in
+the local store (an (authority, division) index) and when scraping live.
+Approvals are written with the authority's registry code and the
+division's canonical spelling, so store queries are plain equality and
+IN lookups on that index. Authorities the registry does not know have
+no jurisdiction to route by; the store lookup includes them by name.
+Rows stored before writes were normalized are rewritten once with:
+
+    python -m app.scrapers.authorities normalize
+Routed authorities are scraped concurrently, each behind its own rate
+limit and timeout, so adding authorities neither lengthens the store
+query for unrelated areas nor makes a search wait on every site in turn.
+
+Live search results are cached briefly and concurrent identical searches
+share one fetch. A search never waits for an authority's rate limit: it
+is served from the cache or skips that authority. The crawl scheduler
+does wait, but leaves part of each authority's burst to searches.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+from app.config import settings, SessionLocal
+from app.models.property import LayoutApproval
+from app.utils.admission import TokenBucket
+from app.utils.market_stats import normalize_key
+
+DIVISIONS = ("North", "South", "East", "West")
+
+_DIVISIONS_BY_KEY = {normalize_key(division): division for division in DIVISIONS}
+
+def normalize_division(division: Optional[str]) -> Optional[str]:
+    """Stored spelling of a division ("north " -> "North"); anything else is only trimmed"""
+    if not division:
+        return division
+    return _DIVISIONS_BY_KEY.get(normalize_key(division), division.strip())
+
+# A search fetcher receives (division, location) and returns approval records
+SearchFetcher = Callable[[Optional[str], Optional[str]], Awaitable[List[Dict[str, Any]]]]
+
+@dataclass(frozen=True)
+class Authority:
+    code: str
+    name: str
+    divisions: Tuple[str, ...]
+    # Towns an outer planning authority is limited to; empty means the whole of its divisions
+    localities: Tuple[str, ...] = ()
+    aliases: Tuple[str, ...] = ()
+    requests_per_minute: Optional[float] = None  # defaults to one request per scraper_delay
+    burst: int = 5
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        """Every spelling stored in LayoutApproval.authority for this authority"""
+        return (self.code, self.name, *self.aliases)
+
+AUTHORITIES = (
+    Authority("BDA", "Bangalore Development Authority", DIVISIONS, aliases=("Bengaluru Development Authority",)),
+    Authority("BBMP", "Bruhat Bengaluru Mahanagara Palike", DIVISIONS),
+    Authority("BMRDA", "Bangalore Metropolitan Region Development Authority", DIVISIONS),
+    Authority(
+        "KPA", "Kanakapura Planning Authority", ("South",),
+        localities=("Kanakapura", "Harohalli", "Kaggalipura")
+    ),
+    Authority(
+        "APA", "Anekal Planning Authority", ("South",),
+        localities=("Anekal", "Attibele", "Chandapura", "Jigani", "Bommasandra")
+    ),
+    Authority(
+        "BIAAPA", "Bangalore International Airport Area Planning Authority", ("North",),
+        localities=("Devanahalli", "Bagalur")
+    ),
+    Authority("HPA", "Hoskote Planning Authority", ("East",), localities=("Hoskote", "Budigere")),
+    Authority("NPA", "Nelamangala Planning Authority", ("West",), localities=("Nelamangala", "Dobbspet", "Solur")),
+    Authority("MPA", "Magadi Planning Authority", ("West",), localities=("Magadi",)),
+    Authority("BMICAPA", "BMIC Area Planning Authority", ("West",), localities=("Bidadi", "Ramanagara")),
+)
+
+class AuthorityRegistry:
+    """
+    Authorities indexed by division and locality
+
+    Routing is a handful of dictionary lookups, independent of how many
+    authorities are registered.
+    """
+
+    def __init__(self, authorities: Tuple[Authority, ...] = AUTHORITIES):
+        self._authorities: Dict[str, Authority] = {}
+        self._codes_by_name: Dict[str, str] = {}
+        self._by_division: Dict[str, List[str]] = {}
+        self._wide_by_division: Dict[str, List[str]] = {}
+        self._by_locality: Dict[str, List[str]] = {}
+        self._unregistered: Set[str] = set()  # authority values in the store the registry does not know
+        self._fetchers: Dict[str, SearchFetcher] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._results: Dict[Tuple, Tuple[float, List[Dict[str, Any]]]] = {}
+        self._in_flight: Dict[Tuple, asyncio.Future] = {}
+
+        for authority in authorities:
+            self.register(authority)
+
+    def register(self, authority: Authority):
+        if authority.code in self._authorities:
+            raise ValueError(f"Authority {authority.code} is already registered")
+
+        self._authorities[authority.code] = authority
+        for name in authority.names:
+            self._codes_by_name[normalize_key(name)] = authority.code
+        for division in authority.divisions:
+            key = normalize_key(division)
+            self._by_division.setdefault(key, []).append(authority.code)
+            if not authority.localities:
+                self._wide_by_division.setdefault(key, []).append(authority.code)
+        for locality in authority.localities:
+            self._by_locality.setdefault(normalize_key(locality), []).append(authority.code)
+
+    def __len__(self):
+        return len(self._authorities)
+
+    def all(self) -> List[Authority]:
+        return list(self._authorities.values())
+
+    def get(self, code: str) -> Authority:
+        return self._authorities[code]
+
+    def resolve(self, name: Optional[str]) -> Optional[Authority]:
+        """Authority for a code, name or alias as it appears in scraped data"""
+        code = self._codes_by_name.get(normalize_key(name)) if name else None
+        return self._authorities.get(code) if code else None
+
+    def known(self, name: Optional[str]) -> bool:
+        return self.resolve(name) is not None
+
+    def code_for(self, name: str) -> str:
+        """Registry code for a stored authority value; unknown authorities are kept as given"""
+        authority = self.resolve(name)
+        return authority.code if authority else name
+
+    def observe(self, name: Optional[str]):
+        """Note an authority value written to the store, so an unknown one stays searchable"""
+        if name and not self.known(name):
+            self._unregistered.add(name)
+
+    def load_unregistered(self, db: Session) -> int:
+        """Unknown authority values already in the store; a scan of the authority index, once at warm-up"""
+        for name in db.scalars(select(LayoutApproval.authority).distinct()):
+            self.observe(name)
+        return len(self._unregistered)
+
+    def load_rows(self, db: Session, ids: Iterable[int]) -> int:
+        """Observe the authorities of approvals written elsewhere; used by the index refresher"""
+        names = db.scalars(select(LayoutApproval.authority).where(LayoutApproval.id.in_(list(ids))).distinct()).all()
+        for name in names:
+            self.observe(name)
+        return len(names)
+
+    def stored_names(self, authorities: List[Authority]) -> List[str]:
+        """
+        LayoutApproval.authority values to read for routed authorities
+
+        Unknown authorities have no jurisdiction to route by, so they are
+        their own shard and every search includes them.
+        """
+
+        names = [name for authority in authorities for name in authority.names]
+        return names + sorted(self._unregistered)
+
+    def route(self, division: Optional[str] = None, locality: Optional[str] = None) -> List[Authority]:
+        """
+        Authorities whose jurisdiction covers the search
+
+        A locality routes to the authority planning that town plus the
+        division-wide authorities; a division alone routes to every
+        authority in it; with neither, every authority is searched.
+        """
+
+        division_key = normalize_key(division)
+        locality_key = normalize_key(locality)
+
+        codes: List[str] = []
+        if locality_key and locality_key in self._by_locality:
+            codes.extend(self._by_locality[locality_key])
+            if division_key:
+                codes.extend(self._wide_by_division.get(division_key, []))
+            else:
+                codes.extend(code for code, a in self._authorities.items() if not a.localities)
+        elif division_key:
+            if locality_key:
+                # A town no outer authority plans is inside the city authorities' area
+                codes.extend(self._wide_by_division.get(division_key, []))
+            else:
+                codes.extend(self._by_division.get(division_key, []))
+        elif locality_key:
+            codes.extend(code for code, a in self._authorities.items() if not a.localities)
+        else:
+            codes.extend(self._authorities)
+
+        seen: Set[str] = set()
+        return [self._authorities[code] for code in codes if not (code in seen or seen.add(code))]
+
+    def register_search(self, code: str, fetcher: SearchFetcher):
+        """Register the live search fetcher for an authority's approval listings"""
+        self.get(code)
+        self._fetchers[code] = fetcher
+
+    def has_search(self, code: str) -> bool:
+        return code in self._fetchers
+
+    def _bucket(self, name: str) -> TokenBucket:
+        authority = self.resolve(name)
+        key = authority.code if authority else name
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            per_minute = (authority.requests_per_minute if authority else None) or 60 / settings.scraper_delay
+            bucket = self._buckets[key] = TokenBucket(per_minute / 60, authority.burst if authority else 5)
+        return bucket
+
+    async def throttle(self, name: str):
+        """
+        Wait for the authority's rate limit before a background fetch
+        Half of the burst is left for live searches, which never wait
+        """
+
+        bucket = self._bucket(name)
+        reserve = (bucket.capacity - 1) / 2
+        while True:
+            allowed, wait = bucket.take(reserve)
+            if allowed:
+                return
+            await asyncio.sleep(wait)
+
+    async def search(self, authority: Authority, division: Optional[str], location: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        One authority's listings for a search, from the short-lived cache or a
+        rate-limited, time-boxed fetch; an authority out of tokens is skipped
+        """
+
+        fetcher = self._fetchers.get(authority.code)
+        if fetcher is None:
+            return []
+
+        key = (authority.code, normalize_key(division), normalize_key(location))
+        cached = self._results.get(key)
+        if cached is not None and time.monotonic() - cached[0] < settings.authority_search_cache_seconds:
+            return [dict(record) for record in cached[1]]
+
+        shared = self._in_flight.get(key)
+        if shared is None:
+            allowed, _ = self._bucket(authority.code).take()
+            if not allowed:
+                # Searches fail fast rather than queue on the site's rate limit
+                return [dict(record) for record in cached[1]] if cached is not None else []
+
+            shared = self._in_flight[key] = asyncio.ensure_future(self._fetch(authority, fetcher, key, division, location))
+            shared.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        records = await asyncio.shield(shared)
+        return [dict(record) for record in records]
+
+    async def _fetch(self, authority: Authority, fetcher: SearchFetcher, key: Tuple, division: Optional[str], location: Optional[str]) -> List[Dict[str, Any]]:
+        records = await asyncio.wait_for(fetcher(division, location), timeout=settings.scraper_timeout)
+        for record in records:
+            record.setdefault("authority", authority.name)
+        self._results[key] = (time.monotonic(), records)
+        return records
+
+    async def search_many(
+        self,
+        authorities: List[Authority],
+        division: Optional[str],
+        location: Optional[str]
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Scrape the routed authorities concurrently
+        Returns the approvals and the names of the authorities that answered;
+        an authority that fails or times out is skipped
+        """
+
+        authorities = [a for a in authorities if a.code in self._fetchers]
+        results = await asyncio.gather(
+            *(self.search(authority, division, location) for authority in authorities),
+            return_exceptions=True
+        )
+
+        approvals: List[Dict[str, Any]] = []
+        answered: List[str] = []
+        for authority, result in zip(authorities, results):
+            if isinstance(result, BaseException):
+                print(f"Error scraping {authority.code}: {result!r}")
+                continue
+            approvals.extend(result)
+            if result:
+                answered.append(authority.name)
+        return approvals, answered
+
+authority_registry = AuthorityRegistry()
+
+def normalize_approval(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Approval column values with authority and division in their stored form"""
+
+    values = dict(values)
+    if values.get("authority"):
+        values["authority"] = authority_registry.code_for(values["authority"])
+        authority_registry.observe(values["authority"])
+    if values.get("division"):
+        values["division"] = normalize_division(values["division"])
+    return values
+
+@event.listens_for(LayoutApproval, "before_insert")
+@event.listens_for(LayoutApproval, "before_update")
+def _normalize_approval(mapper, connection, target):
+    # Stored as bulk imports and the crawler write them, so routing finds every spelling
+    if target.authority:
+        target.authority = authority_registry.code_for(target.authority)
+        authority_registry.observe(target.authority)
+    if target.division:
+        target.division = normalize_division(target.division)
+
+def normalize_stored(db: Session, batch_size: int = 1000) -> int:
+    """Rewrite approvals stored before authority and division were normalized on write"""
+
+    changed = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(LayoutApproval.id, LayoutApproval.authority, LayoutApproval.division)
+            .where(LayoutApproval.id > last_id)
+            .order_by(LayoutApproval.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return changed
+
+        for row in rows:
+            values = normalize_approval({"authority": row.authority, "division": row.division})
+            if (values["authority"], values["division"]) != (row.authority, row.division):
+                db.execute(update(LayoutApproval).where(LayoutApproval.id == row.id).values(**values))
+                changed += 1
+        db.commit()
+        last_id = rows[-1].id
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Maintain stored layout approvals")
+    parser.add_argument("command", choices=["normalize"])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        changed = normalize_stored(db, args.batch_size)
+    finally:
+        db.close()
+    print(f"Normalized authority or division of {changed:,} approvals", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
+
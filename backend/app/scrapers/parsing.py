@@ -0,0 +1,188 @@
+"""
+HTML parsing for scrapers, off the event loop
+
+Parsing large listings is CPU bound, so documents are handed to a
+process pool as bytes and only compact records come back:
+
+    records = await html_parser.parse("approval_listing", body, authority="BDA")
+
+Documents under parser_pool_min_bytes are parsed in a thread instead,
+where the process round trip would cost more than the parse. The
+BeautifulSoup backend is chosen with parser_backend ("html.parser", or
+"lxml" when installed).
+"""
+import asyncio
+import importlib.util
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from app.config import settings
+
+# Compact result passed back from a worker: column names once, then row tuples
+Rows = Tuple[Sequence[str], List[Tuple[Any, ...]]]
+
+APPROVAL_COLUMNS = (
+    "project_name",
+    "approval_number",
+    "approval_date",
+    "approved_area",
+    "location",
+    "division",
+    "document_url",
+)
+
+# Header text (normalized) -> record field, for planning authority listings
+APPROVAL_HEADERS = {
+    "project": "project_name",
+    "project name": "project_name",
+    "layout name": "project_name",
+    "name of the layout": "project_name",
+    "approval no": "approval_number",
+    "approval number": "approval_number",
+    "lp no": "approval_number",
+    "order no": "approval_number",
+    "date": "approval_date",
+    "approval date": "approval_date",
+    "date of approval": "approval_date",
+    "area": "approved_area",
+    "area acres": "approved_area",
+    "extent": "approved_area",
+    "extent acres": "approved_area",
+    "location": "location",
+    "village": "location",
+    "taluk": "location",
+    "division": "division",
+    "zone": "division",
+}
+
+DATE_FORMATS = ("%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d", "%d.%m.%Y", "%d %b %Y", "%d %B %Y")
+
+def available_backend(backend: str) -> str:
+    """The requested backend if it can be imported, else the stdlib parser"""
+    if backend == "lxml" and importlib.util.find_spec("lxml") is None:
+        return "html.parser"
+    return backend
+
+def _normalize_header(text: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9 ]+", " ", text.lower()).split())
+
+def _parse_date(text: str) -> Optional[str]:
+    text = text.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+def _parse_float(text: str) -> Optional[float]:
+    match = re.search(r"\d+(?:\.\d+)?", text.replace(",", ""))
+    return float(match.group()) if match else None
+
+def parse_approval_listing(content: bytes, backend: str) -> Rows:
+    """
+    Rows of every table whose header names a project and an approval number
+    Runs in a worker process; only plain values are returned
+    """
+
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    # Only table rows are built into the tree
+    soup = BeautifulSoup(content, backend, parse_only=SoupStrainer("tr"))
+
+    rows: List[Tuple[Any, ...]] = []
+    fields: Optional[List[Optional[str]]] = None
+
+    for tr in soup.find_all("tr"):
+        header_cells = tr.find_all("th")
+        if header_cells:
+            mapped = [APPROVAL_HEADERS.get(_normalize_header(th.get_text(" "))) for th in header_cells]
+            fields = mapped if {"project_name", "approval_number"} <= set(mapped) else None
+            continue
+        if fields is None:
+            continue
+
+        cells = tr.find_all("td")
+        if len(cells) < len(fields):
+            continue
+
+        record: Dict[str, Any] = {}
+        for field, cell in zip(fields, cells):
+            if field is None:
+                continue
+            text = cell.get_text(" ", strip=True)
+            if field == "approval_date":
+                record[field] = _parse_date(text)
+            elif field == "approved_area":
+                record[field] = _parse_float(text)
+            else:
+                record[field] = text or None
+
+        link = tr.find("a", href=True)
+        record["document_url"] = link["href"] if link else None
+
+        if record.get("project_name") and record.get("approval_number"):
+            rows.append(tuple(record.get(column) for column in APPROVAL_COLUMNS))
+
+    return APPROVAL_COLUMNS, rows
+
+PARSERS: Dict[str, Callable[[bytes, str], Rows]] = {
+    "approval_listing": parse_approval_listing,
+}
+
+def _run_parser(name: str, content: bytes, backend: str) -> Rows:
+    return PARSERS[name](content, backend)
+
+def _init_worker():
+    # Pay the bs4 (and lxml) import once per worker rather than per document
+    import bs4  # noqa: F401
+
+class HtmlParser:
+    def __init__(
+        self,
+        workers: int = settings.parser_workers,
+        backend: str = settings.parser_backend,
+        pool_min_bytes: int = settings.parser_pool_min_bytes
+    ):
+        self.workers = workers
+        self.backend = available_backend(backend)
+        self.pool_min_bytes = pool_min_bytes
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def start(self):
+        if self._pool is None and self.workers > 0:
+            # spawn, not fork: the API process has threads and an event loop
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker
+            )
+
+    def stop(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def parse(self, name: str, content: bytes, **extra: Any) -> List[Dict[str, Any]]:
+        """
+        Parse a document with a registered parser
+        extra fields (e.g. authority) are added to every record
+        """
+
+        if name not in PARSERS:
+            raise KeyError(f"Unknown parser: {name}")
+
+        if len(content) >= self.pool_min_bytes:
+            self.start()
+
+        if self._pool is not None and len(content) >= self.pool_min_bytes:
+            loop = asyncio.get_running_loop()
+            columns, rows = await loop.run_in_executor(self._pool, _run_parser, name, content, self.backend)
+        else:
+            columns, rows = await asyncio.to_thread(_run_parser, name, content, self.backend)
+
+        return [{**dict(zip(columns, row)), **extra} for row in rows]
+
+html_parser = HtmlParser()
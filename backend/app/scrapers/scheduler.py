@@ -0,0 +1,287 @@
+import asyncio
+import heapq
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import update
+from app.config import settings, SessionLocal
+from app.models.property import LayoutApproval, Property
+from app.scrapers.authorities import authority_registry, normalize_approval
+
+# A fetcher receives the stored record as a dict and returns the refreshed
+# field values, or None when the source could not be reached
+Fetcher = Callable[[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+
+APPROVAL = "approval"
+PROPERTY = "property"
+
+# Properties not linked to a layout approval are crawled from developer sites
+DEVELOPER_SOURCE = "developer"
+
+NEVER_SCRAPED = datetime.min
+
+# updated_at comes from each writer's clock and commits land out of order,
+# so each reload re-reads this far behind its mark (pushing a queued record is a no-op)
+RELOAD_OVERLAP = timedelta(seconds=5)
+
+@dataclass(order=True)
+class CrawlTask:
+    """A record waiting in the crawl queue, ordered by due time then likelihood of change"""
+
+    due_at: datetime
+    priority: float
+    kind: str = field(compare=False)
+    record_id: int = field(compare=False)
+    authority: str = field(compare=False)
+
+class CrawlScheduler:
+    """
+    Keeps layout approvals and properties fresh in the local store
+
+    Records are held in a priority queue keyed by when they are next due.
+    Records that changed recently are revisited sooner than records that
+    have been stable for a long time, and each authority gets its own
+    concurrency and rate limit so one slow site cannot starve the others.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self.min_interval = timedelta(hours=settings.crawl_min_interval_hours)
+        self.max_interval = timedelta(hours=settings.crawl_max_interval_hours)
+        self.batch_size = settings.crawl_batch_size
+        self.poll_seconds = settings.crawl_poll_seconds
+        self.concurrency = settings.crawl_concurrency_per_authority
+
+        self._fetchers: Dict[Tuple[str, str], Fetcher] = {}
+        self._queue: List[CrawlTask] = []
+        self._queued: set = set()
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._marks: Dict[str, Optional[datetime]] = {}  # latest updated_at loaded, per kind
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    def register_fetcher(self, authority: str, kind: str, fetcher: Fetcher):
+        """Register the fetcher used to refresh records of a kind from an authority"""
+        self._fetchers[(authority, kind)] = fetcher
+
+    def next_due(self, last_scraped: Optional[datetime], updated_at: Optional[datetime], is_active: bool = True) -> Tuple[datetime, float]:
+        """
+        Compute when a record is next due and how likely it is to have changed
+
+        Change likelihood decays with the time the record has gone unchanged
+        (last_scraped - updated_at); the revisit interval shrinks towards the
+        minimum for volatile records and grows towards the maximum for stable ones.
+        """
+
+        if last_scraped is None:
+            return NEVER_SCRAPED, 1.0
+
+        if not is_active:
+            return last_scraped + self.max_interval, 0.0
+
+        unchanged_for = max(timedelta(0), last_scraped - (updated_at or last_scraped))
+        likelihood = math.exp(-unchanged_for / self.max_interval)
+        interval = self.max_interval - (self.max_interval - self.min_interval) * likelihood
+
+        return last_scraped + interval, likelihood
+
+    def _push(self, kind: str, record_id: int, authority: str, last_scraped, updated_at, is_active: bool = True):
+        key = (kind, record_id)
+        if key in self._queued:
+            return
+        due_at, likelihood = self.next_due(last_scraped, updated_at, is_active)
+        heapq.heappush(self._queue, CrawlTask(due_at, -likelihood, kind, record_id, authority))
+        self._queued.add(key)
+
+    def _changed_since(self, kind: str, model, query):
+        mark = self._marks.get(kind)
+        if mark is not None:
+            query = query.filter(model.updated_at >= mark - RELOAD_OVERLAP)
+        return query
+
+    def _advance(self, kind: str, rows: List[Any]):
+        latest = max((row.updated_at for row in rows if row.updated_at is not None), default=None)
+        if latest is not None and (self._marks.get(kind) is None or latest > self._marks[kind]):
+            self._marks[kind] = latest
+
+    def _load_records(self) -> List[Tuple]:
+        """
+        Load the lightweight scheduling columns of records changed since the last load
+        The first load reads everything; later ones are a range scan on updated_at.
+        """
+
+        db = self.session_factory()
+        try:
+            approvals = self._changed_since(APPROVAL, LayoutApproval, db.query(
+                LayoutApproval.id,
+                LayoutApproval.authority,
+                LayoutApproval.last_scraped,
+                LayoutApproval.updated_at,
+                LayoutApproval.is_active
+            )).all()
+
+            properties = self._changed_since(PROPERTY, Property, db.query(
+                Property.id,
+                LayoutApproval.authority,
+                Property.last_scraped,
+                Property.updated_at
+            ).outerjoin(LayoutApproval, Property.layout_approval_id == LayoutApproval.id)).all()
+        finally:
+            db.close()
+
+        self._advance(APPROVAL, approvals)
+        self._advance(PROPERTY, properties)
+
+        records = [(APPROVAL, a.id, a.authority, a.last_scraped, a.updated_at, bool(a.is_active)) for a in approvals]
+        records.extend(
+            (PROPERTY, p.id, p.authority or DEVELOPER_SOURCE, p.last_scraped, p.updated_at, True)
+            for p in properties
+        )
+        return records
+
+    async def reload(self):
+        """Pick up records added or changed in the store since the last reload"""
+        records = await asyncio.to_thread(self._load_records)
+        for record in records:
+            self._push(*record)
+
+    def due_tasks(self, now: Optional[datetime] = None) -> List[CrawlTask]:
+        """Pop up to batch_size tasks that are due"""
+
+        now = now or datetime.utcnow()
+        due = []
+        while self._queue and len(due) < self.batch_size and self._queue[0].due_at <= now:
+            task = heapq.heappop(self._queue)
+            self._queued.discard((task.kind, task.record_id))
+            due.append(task)
+        return due
+
+    def seconds_until_next(self) -> float:
+        if not self._queue:
+            return self.poll_seconds
+        wait = (self._queue[0].due_at - datetime.utcnow()).total_seconds()
+        return max(0.0, min(wait, self.poll_seconds))
+
+    async def run_once(self) -> int:
+        """Refresh every record that is currently due; returns the number processed"""
+
+        tasks = self.due_tasks()
+        if tasks:
+            await asyncio.gather(*(self._run_limited(task) for task in tasks))
+        return len(tasks)
+
+    async def _run_limited(self, task: CrawlTask):
+        authority = authority_registry.code_for(task.authority)
+        semaphore = self._semaphores.setdefault(authority, asyncio.Semaphore(self.concurrency))
+        async with semaphore:
+            try:
+                await self._refresh(task)
+            except Exception as e:
+                print(f"Error refreshing {task.kind} {task.record_id} ({task.authority}): {e}")
+                # Retry no sooner than the minimum interval
+                due_at = datetime.utcnow() + self.min_interval
+                heapq.heappush(self._queue, CrawlTask(due_at, task.priority, task.kind, task.record_id, task.authority))
+                self._queued.add((task.kind, task.record_id))
+
+    async def _refresh(self, task: CrawlTask):
+        model = LayoutApproval if task.kind == APPROVAL else Property
+        fetcher = self._fetchers.get((task.authority, task.kind))
+
+        if fetcher is None:
+            # Nothing can refresh this record yet; look again after the longest interval
+            # without pretending it was scraped
+            due_at = datetime.utcnow() + self.max_interval
+            heapq.heappush(self._queue, CrawlTask(due_at, 0.0, task.kind, task.record_id, task.authority))
+            self._queued.add((task.kind, task.record_id))
+            return
+
+        record = await asyncio.to_thread(self._read_record, model, task.record_id)
+        if record is None:
+            return
+
+        # Only real fetches draw on the authority's rate limit, which it shares with live searches
+        await authority_registry.throttle(task.authority)
+        fresh = await fetcher(record)
+        if fresh is None:
+            raise RuntimeError("source returned no data")
+
+        written = await asyncio.to_thread(self._write_record, model, task.record_id, fresh)
+        if written is None:
+            return
+        last_scraped, updated_at, is_active = written
+        self._push(task.kind, task.record_id, task.authority, last_scraped, updated_at, is_active)
+
+    def _read_record(self, model, record_id: int) -> Optional[Dict[str, Any]]:
+        db = self.session_factory()
+        try:
+            row = db.get(model, record_id)
+            if row is None:
+                return None
+            return {c.name: getattr(row, c.name) for c in model.__table__.columns}
+        finally:
+            db.close()
+
+    def _write_record(self, model, record_id: int, fresh: Dict[str, Any]):
+        """
+        Apply fetched fields; updated_at only moves when something actually changed
+        Returns None when the record was deleted while it was being fetched
+        """
+
+        db = self.session_factory()
+        try:
+            row = db.get(model, record_id)
+            if row is None:
+                return None
+            now = datetime.utcnow()
+            columns = model.__table__.columns.keys()
+
+            if model is LayoutApproval:
+                fresh = normalize_approval(fresh)
+
+            changes = {
+                key: value for key, value in fresh.items()
+                if key in columns
+                and key not in ("id", "created_at", "updated_at", "last_scraped")
+                and getattr(row, key) != value
+            }
+
+            # Any UPDATE fires the column's onupdate unless updated_at is given
+            # explicitly, so an unchanged record keeps its previous value
+            values = dict(changes, last_scraped=now, updated_at=now if changes else row.updated_at)
+            db.execute(update(model).where(model.id == record_id).values(**values))
+            db.commit()
+
+            return values["last_scraped"], values["updated_at"], bool(values.get("is_active", getattr(row, "is_active", True)))
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def _loop(self):
+        while not self._stopping.is_set():
+            try:
+                await self.reload()
+                await self.run_once()
+            except Exception as e:
+                print(f"Crawl scheduler error: {e}")
+
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.seconds_until_next())
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Start the background crawl loop on the running event loop"""
+        if self._task is None or self._task.done():
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+crawl_scheduler = CrawlScheduler()
@@ -0,0 +1,207 @@
+import asyncio
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import List, Optional, Tuple
+from fastapi import HTTPException
+from starlette.requests import HTTPConnection
+from app.config import settings
+
+class Priority(IntEnum):
+    """Lower value is served first when pipelines are queued"""
+
+    INTERACTIVE = 0  # WebSocket and chat messages
+    MAP = 1  # map division clicks
+    BATCH = 2  # bulk scoring and other offline work
+
+def client_key(connection: HTTPConnection, scope: str) -> str:
+    """
+    Rate-limit key for the caller of a request or WebSocket
+
+    There are no accounts, so a user_id in the body is whatever the client
+    chose (the web app sends the same one for every browser); limits are
+    keyed on the client address instead.
+    """
+
+    host = connection.client.host if connection.client else "unknown"
+    return f"{scope}:{host}"
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; maps to HTTP 429"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    def http_error(self) -> HTTPException:
+        return HTTPException(
+            status_code=429,
+            detail=self.reason,
+            headers={"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+        )
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, reserve: float = 0) -> Tuple[bool, float]:
+        """
+        Take one token, leaving at least `reserve` tokens for other callers;
+        returns (allowed, seconds until a token is available)
+        """
+
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= 1 + reserve:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 + reserve - self.tokens) / self.rate if self.rate else 60.0
+
+class RateLimiter:
+    """Token bucket per key, keeping at most max_keys buckets (least recently used evicted)"""
+
+    def __init__(self, per_minute: float, burst: float, max_keys: int = 100000):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, key: str) -> Tuple[bool, float]:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.take()
+
+class AdmissionController:
+    """
+    Rate limits per user and session, plus a global cap on in-flight pipelines
+
+    Requests over the cap wait in a bounded priority queue. When the queue
+    is full, a newcomer displaces the lowest-priority waiter if it outranks
+    it, otherwise it is rejected immediately.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        max_queue: int,
+        queue_timeout: float,
+        user_limiter: RateLimiter,
+        session_limiter: RateLimiter
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.user_limiter = user_limiter
+        self.session_limiter = session_limiter
+        self.in_flight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    def check_rate(self, user_id: Optional[str], session_id: Optional[str]):
+        if user_id:
+            allowed, retry_after = self.user_limiter.check(user_id)
+            if not allowed:
+                raise AdmissionRejected("Rate limit exceeded for user", retry_after)
+        if session_id:
+            allowed, retry_after = self.session_limiter.check(session_id)
+            if not allowed:
+                raise AdmissionRejected("Rate limit exceeded for session", retry_after)
+
+    async def acquire(self, priority: Priority):
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self._displace(priority)
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (int(priority), next(self._sequence), future)
+        heapq.heappush(self._waiters, entry)
+
+        try:
+            # A slot is handed over by release() resolving the future
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # Slot arrived just as we gave up; pass it on
+                self.release()
+            else:
+                self._remove(entry)
+            raise AdmissionRejected("Server busy, please retry", self.queue_timeout)
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                self._remove(entry)
+            raise
+
+        if future.exception() is not None:
+            raise future.exception()
+
+    def _displace(self, priority: Priority):
+        lowest = max(self._waiters, key=lambda w: (w[0], w[1]))
+        if lowest[0] <= priority:
+            raise AdmissionRejected("Server busy, please retry", self.queue_timeout)
+        self._remove(lowest)
+        lowest[2].set_exception(AdmissionRejected("Displaced by higher priority work", self.queue_timeout))
+
+    def _remove(self, entry):
+        try:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+        except ValueError:
+            pass
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)  # slot transferred, in_flight unchanged
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def admit(self, priority: Priority, user_id: Optional[str] = None, session_id: Optional[str] = None):
+        """Check rate limits, then hold a pipeline slot for the duration of the block"""
+
+        self.check_rate(user_id, session_id)
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def status(self):
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queued": len(self._waiters),
+            "max_queue": self.max_queue
+        }
+
+admission = AdmissionController(
+    max_in_flight=settings.max_in_flight_pipelines,
+    max_queue=settings.pipeline_queue_size,
+    queue_timeout=settings.pipeline_queue_timeout,
+    user_limiter=RateLimiter(settings.rate_limit_user_per_minute, settings.rate_limit_user_burst),
+    session_limiter=RateLimiter(settings.rate_limit_session_per_minute, settings.rate_limit_session_burst)
+)
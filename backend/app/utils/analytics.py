@@ -0,0 +1,447 @@
+"""
+Pre-aggregated search analytics
+
+Every saved search adds to hourly and daily rollup rows (searches by
+division, locality, price band and status, and a latency sketch per
+pipeline stage), so the analytics endpoints never scan or parse
+search_history. Searches are aggregated in memory and flushed every
+analytics_flush_seconds, keeping rollup writes off the request path.
+
+Rollups for existing history can be rebuilt with
+
+    python -m app.utils.analytics rebuild
+"""
+import argparse
+import asyncio
+import sys
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.property import SearchHistory, SearchRollup, StageLatencyRollup
+from app.utils.market_stats import normalize_key
+from app.utils.sketch import QuantileSketch
+
+GRANULARITIES = ("hour", "day")
+DIMENSIONS = ("division", "locality", "price_band", "status")
+
+LATENCY_QUANTILES = (0.5, 0.95, 0.99)
+
+# Upper bound of each budget band, in rupees
+PRICE_BANDS = (
+    (2_500_000, "under_25l"),
+    (5_000_000, "25l_50l"),
+    (10_000_000, "50l_1cr"),
+    (20_000_000, "1cr_2cr"),
+)
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+def price_band(min_price: Optional[float], max_price: Optional[float]) -> str:
+    """Band of the search budget (the maximum, or the minimum when open-ended)"""
+
+    budget = max_price or min_price
+    if not budget:
+        return "any"
+    for limit, band in PRICE_BANDS:
+        if budget <= limit:
+            return band
+    return "2cr_plus"
+
+def search_dimensions(
+    division: Optional[str],
+    locality: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    status: Optional[str]
+) -> Dict[str, str]:
+    return {
+        "division": normalize_key(division) or "unknown",
+        "locality": normalize_key(locality) or "unknown",
+        "price_band": price_band(min_price, max_price),
+        "status": status or "unknown",
+    }
+
+def _buckets(created_at: datetime) -> Iterable[Tuple[str, datetime]]:
+    for granularity in GRANULARITIES:
+        yield granularity, bucket_start(created_at, granularity)
+
+class RollupBuffer:
+    """
+    Search rollups aggregated in memory and flushed periodically
+
+    Searches only touch this buffer; every analytics_flush_seconds one
+    short transaction adds the accumulated counts and latency sketches
+    to the rollup rows. Concurrent searches therefore never wait on the
+    same hot rows, and each row is written once per flush per worker
+    rather than once per search. Counts buffered at a crash are lost
+    until the next `rebuild`.
+    """
+
+    def __init__(self, interval_seconds: float = settings.analytics_flush_seconds):
+        self.interval_seconds = interval_seconds
+        self._searches: Dict[Tuple[str, datetime, str, str], List[int]] = {}
+        self._latencies: Dict[Tuple[str, datetime, str], Tuple[QuantileSketch, List[float]]] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    def record(self, created_at: datetime, dimensions: Dict[str, str], results: int, stage_timings: Dict[str, float]):
+        with self._lock:
+            for granularity, bucket in _buckets(created_at):
+                for dimension, value in dimensions.items():
+                    totals = self._searches.setdefault((granularity, bucket, dimension, value), [0, 0])
+                    totals[0] += 1
+                    totals[1] += results
+                for stage, seconds in stage_timings.items():
+                    sketch, summary = self._latencies.setdefault(
+                        (granularity, bucket, stage), (QuantileSketch(), [0.0])
+                    )
+                    sketch.add(seconds)
+                    summary[0] = max(summary[0], seconds)
+
+    def flush(self, session_factory=None) -> int:
+        """Write the buffered counts in one transaction; returns the rollup rows touched"""
+
+        from app.config import SessionLocal
+
+        with self._lock:
+            searches, self._searches = self._searches, {}
+            latencies, self._latencies = self._latencies, {}
+        if not searches and not latencies:
+            return 0
+
+        db = (session_factory or SessionLocal)()
+        try:
+            # Rows in a fixed order, so concurrent flushes from several workers cannot deadlock
+            for key in sorted(searches):
+                _increment_search(db, *key, *searches[key])
+            for key in sorted(latencies):
+                sketch, summary = latencies[key]
+                _merge_latency(db, *key, sketch, summary[0])
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Put the counts back for the next flush
+            with self._lock:
+                for key, (count, results) in searches.items():
+                    totals = self._searches.setdefault(key, [0, 0])
+                    totals[0] += count
+                    totals[1] += results
+                for key, (sketch, summary) in latencies.items():
+                    current, current_summary = self._latencies.setdefault(key, (QuantileSketch(), [0.0]))
+                    current.merge(sketch)
+                    current_summary[0] = max(current_summary[0], summary[0])
+            raise
+        finally:
+            db.close()
+        return len(searches) + len(latencies)
+
+    async def _loop(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                print(f"Analytics flush error: {e}")
+
+    def start(self):
+        """Start the background flush loop on the running event loop"""
+        if self._task is None or self._task.done():
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Stop the loop after a final flush"""
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+rollup_buffer = RollupBuffer()
+
+def record_search(
+    created_at: datetime,
+    dimensions: Dict[str, str],
+    results: int,
+    stage_timings: Dict[str, float]
+):
+    """Add one search to its hourly and daily rollups (buffered; see RollupBuffer)"""
+
+    rollup_buffer.record(created_at, dimensions, results, stage_timings)
+
+def _increment_search(
+    db: Session,
+    granularity: str,
+    bucket: datetime,
+    dimension: str,
+    value: str,
+    searches: int,
+    results: int
+):
+    key = (
+        SearchRollup.granularity == granularity,
+        SearchRollup.bucket_start == bucket,
+        SearchRollup.dimension == dimension,
+        SearchRollup.value == value,
+    )
+    increment = update(SearchRollup).where(*key).values(
+        searches=SearchRollup.searches + searches,
+        results=SearchRollup.results + results
+    )
+
+    if db.execute(increment).rowcount:
+        return
+
+    try:
+        with db.begin_nested():
+            db.add(SearchRollup(
+                granularity=granularity,
+                bucket_start=bucket,
+                dimension=dimension,
+                value=value,
+                searches=searches,
+                results=results
+            ))
+    except IntegrityError:
+        # Another writer created the row first
+        db.execute(increment)
+
+def _merge_latency(
+    db: Session,
+    granularity: str,
+    bucket: datetime,
+    stage: str,
+    sketch: QuantileSketch,
+    max_seconds: float
+):
+    def locked_row():
+        return db.execute(
+            select(StageLatencyRollup)
+            .where(
+                StageLatencyRollup.granularity == granularity,
+                StageLatencyRollup.bucket_start == bucket,
+                StageLatencyRollup.stage == stage
+            )
+            .with_for_update()
+        ).scalar_one_or_none()
+
+    row = locked_row()
+    if row is None:
+        try:
+            with db.begin_nested():
+                db.add(StageLatencyRollup(
+                    granularity=granularity,
+                    bucket_start=bucket,
+                    stage=stage,
+                    count=sketch.count,
+                    total_seconds=sketch.total,
+                    max_seconds=max_seconds,
+                    sketch=sketch.to_dict()
+                ))
+            return
+        except IntegrityError:
+            row = locked_row()
+
+    merged = QuantileSketch.from_dict(row.sketch)
+    merged.merge(sketch)
+    row.count += sketch.count
+    row.total_seconds += sketch.total
+    row.max_seconds = max(row.max_seconds, max_seconds)
+    row.sketch = merged.to_dict()
+
+def default_since(granularity: str, now: Optional[datetime] = None) -> datetime:
+    """Last 24 hours for hourly rollups, last 7 days for daily ones"""
+
+    now = now or datetime.utcnow()
+    span = timedelta(hours=24) if granularity == "hour" else timedelta(days=7)
+    return bucket_start(now - span, granularity)
+
+def top_values(
+    db: Session,
+    dimension: str,
+    granularity: str,
+    since: datetime,
+    until: Optional[datetime] = None,
+    limit: int = 20,
+    by_bucket: bool = False
+) -> List[Dict[str, Any]]:
+    """Search counts per value of a dimension, most searched first (or per bucket, in time order)"""
+
+    columns = [SearchRollup.value]
+    if by_bucket:
+        columns.append(SearchRollup.bucket_start)
+
+    statement = (
+        select(
+            *columns,
+            func.sum(SearchRollup.searches).label("searches"),
+            func.sum(SearchRollup.results).label("results")
+        )
+        .where(
+            SearchRollup.granularity == granularity,
+            SearchRollup.dimension == dimension,
+            SearchRollup.bucket_start >= since
+        )
+        .group_by(*columns)
+    )
+    if until:
+        statement = statement.where(SearchRollup.bucket_start < until)
+
+    if by_bucket:
+        statement = statement.order_by(SearchRollup.bucket_start, func.sum(SearchRollup.searches).desc())
+    else:
+        statement = statement.order_by(func.sum(SearchRollup.searches).desc()).limit(limit)
+
+    return [
+        {
+            "value": row.value,
+            "searches": row.searches,
+            "results": row.results,
+            "bucket_start": row.bucket_start if by_bucket else None
+        }
+        for row in db.execute(statement)
+    ]
+
+def stage_latency(
+    db: Session,
+    granularity: str,
+    since: datetime,
+    until: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """Latency per stage over the window, merging the bucket sketches"""
+
+    statement = select(StageLatencyRollup).where(
+        StageLatencyRollup.granularity == granularity,
+        StageLatencyRollup.bucket_start >= since
+    )
+    if until:
+        statement = statement.where(StageLatencyRollup.bucket_start < until)
+
+    merged: Dict[str, Dict[str, Any]] = {}
+    for row in db.execute(statement).scalars():
+        entry = merged.setdefault(row.stage, {"sketch": QuantileSketch(), "max": 0.0})
+        entry["sketch"].merge(QuantileSketch.from_dict(row.sketch))
+        entry["max"] = max(entry["max"], row.max_seconds)
+
+    stats = []
+    for stage, entry in sorted(merged.items()):
+        sketch = entry["sketch"]
+        stats.append({
+            "stage": stage,
+            "count": sketch.count,
+            "mean": round(sketch.mean, 4),
+            "percentiles": {f"p{int(q * 100)}": round(sketch.quantile(q), 4) for q in LATENCY_QUANTILES},
+            "max": round(entry["max"], 4)
+        })
+    return stats
+
+def rebuild(db: Session, batch_size: int = 1000) -> int:
+    """
+    Recompute every rollup from search_history in one pass
+
+    Stage timings are only available for searches saved with them in
+    their workflow trace.
+    """
+
+    from app.agents.parser import LocationMatcher
+
+    searches: Dict[Tuple[str, datetime, str, str], List[int]] = {}
+    latencies: Dict[Tuple[str, datetime, str], Tuple[QuantileSketch, List[float]]] = {}
+
+    rows = db.execute(
+        select(
+            SearchHistory.created_at,
+            SearchHistory.search_criteria,
+            SearchHistory.results_count,
+            SearchHistory.workflow_status,
+            SearchHistory.workflow_trace
+        ).execution_options(yield_per=batch_size)
+    )
+
+    replayed = 0
+    for row in rows:
+        if row.created_at is None:
+            continue
+        criteria = row.search_criteria or {}
+        price_range = criteria.get("price_range") or {}
+        location = criteria.get("location")
+        dimensions = search_dimensions(
+            criteria.get("division"),
+            # Live searches record the canonical locality; replay them the same way
+            LocationMatcher.canonical_name(location) if location else None,
+            price_range.get("min"),
+            price_range.get("max"),
+            row.workflow_status
+        )
+        timings = (row.workflow_trace or {}).get("stage_timings") or {}
+
+        for granularity, bucket in _buckets(row.created_at):
+            for dimension, value in dimensions.items():
+                totals = searches.setdefault((granularity, bucket, dimension, value), [0, 0])
+                totals[0] += 1
+                totals[1] += row.results_count or 0
+            for stage, seconds in timings.items():
+                sketch, summary = latencies.setdefault((granularity, bucket, stage), (QuantileSketch(), [0.0]))
+                sketch.add(seconds)
+                summary[0] = max(summary[0], seconds)
+        replayed += 1
+
+    db.execute(delete(SearchRollup))
+    db.execute(delete(StageLatencyRollup))
+    db.add_all(
+        SearchRollup(
+            granularity=granularity,
+            bucket_start=bucket,
+            dimension=dimension,
+            value=value,
+            searches=totals[0],
+            results=totals[1]
+        )
+        for (granularity, bucket, dimension, value), totals in searches.items()
+    )
+    db.add_all(
+        StageLatencyRollup(
+            granularity=granularity,
+            bucket_start=bucket,
+            stage=stage,
+            count=sketch.count,
+            total_seconds=sketch.total,
+            max_seconds=summary[0],
+            sketch=sketch.to_dict()
+        )
+        for (granularity, bucket, stage), (sketch, summary) in latencies.items()
+    )
+    db.commit()
+    return replayed
+
+def main(argv: Optional[List[str]] = None):
+    from app.config import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain search analytics rollups")
+    parser.add_argument("command", choices=["rebuild"])
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        replayed = rebuild(db)
+    finally:
+        db.close()
+
+    print(f"Rebuilt rollups from {replayed:,} searches", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.config import SessionLocal, settings
+from app.models.property import Brochure
+from app.utils.plot_index import plot_indexes
+
+@dataclass(frozen=True)
+class BrochureEntry:
+    project_name: str
+    developer_name: str
+    content: Dict[str, Any]
+    content_hash: str
+    version: int
+    fetched_at: datetime
+
+def content_hash(content: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+class BrochureStore:
+    """
+    Versioned brochures in the database, fronted by a bounded LRU
+
+    Lookups are served from memory after the first read. Storing a crawl
+    whose content hash differs bumps the version and invalidates the
+    cached entry (and the project's plot index); an identical crawl only
+    refreshes fetched_at.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_entries: int = settings.brochure_cache_size,
+        max_age_hours: float = settings.brochure_refresh_hours
+    ):
+        self.session_factory = session_factory
+        self.max_entries = max_entries
+        self.max_age = timedelta(hours=max_age_hours)
+        self._cache: "OrderedDict[str, BrochureEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._cache)
+
+    def _remember(self, entry: BrochureEntry):
+        with self._lock:
+            self._cache[entry.project_name] = entry
+            self._cache.move_to_end(entry.project_name)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def cached(self, project_name: str) -> Optional[BrochureEntry]:
+        """Memory-only lookup"""
+        with self._lock:
+            entry = self._cache.get(project_name)
+            if entry is not None:
+                self._cache.move_to_end(project_name)
+            return entry
+
+    def get(self, project_name: str) -> Optional[BrochureEntry]:
+        """Latest brochure of a project, from memory or the database"""
+
+        entry = self.cached(project_name)
+        if entry is not None:
+            return entry
+
+        db = self.session_factory()
+        try:
+            row = db.execute(
+                select(Brochure)
+                .where(Brochure.project_name == project_name)
+                .order_by(Brochure.fetched_at.desc())
+                .limit(1)
+            ).scalar_one_or_none()
+            if row is None:
+                return None
+            entry = self._entry(row)
+        finally:
+            db.close()
+
+        self._remember(entry)
+        return entry
+
+    def is_stale(self, entry: BrochureEntry, now: Optional[datetime] = None) -> bool:
+        return (now or datetime.utcnow()) - entry.fetched_at > self.max_age
+
+    def put(self, project_name: str, content: Dict[str, Any], fetched_at: Optional[datetime] = None) -> BrochureEntry:
+        """Store a crawled brochure; a new version only when its content changed"""
+
+        fetched_at = fetched_at or datetime.utcnow()
+        developer_name = content.get("developer") or ""
+        digest = content_hash(content)
+
+        db = self.session_factory()
+        try:
+            row = db.execute(
+                select(Brochure).where(
+                    Brochure.project_name == project_name,
+                    Brochure.developer_name == developer_name
+                )
+            ).scalar_one_or_none()
+
+            changed = row is None or row.content_hash != digest
+            if row is None:
+                row = Brochure(
+                    project_name=project_name,
+                    developer_name=developer_name,
+                    content=content,
+                    content_hash=digest,
+                    version=1,
+                    fetched_at=fetched_at
+                )
+                db.add(row)
+            elif changed:
+                row.content = content
+                row.content_hash = digest
+                row.version += 1
+            row.fetched_at = fetched_at
+            entry = BrochureEntry(project_name, developer_name, content, digest, row.version, fetched_at)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        cached = self.cached(project_name)
+        if changed or cached is None:
+            self.invalidate(project_name)
+            self._remember(entry)
+        else:
+            # Same content: keep the cached object so indexes built on it stay valid
+            self._remember(BrochureEntry(
+                cached.project_name,
+                cached.developer_name,
+                cached.content,
+                cached.content_hash,
+                cached.version,
+                fetched_at
+            ))
+        return self.cached(project_name) or entry
+
+    def invalidate(self, project_name: Optional[str] = None):
+        with self._lock:
+            if project_name is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(project_name, None)
+        plot_indexes.invalidate(project_name)
+
+    def load(self, db: Session, limit: Optional[int] = None) -> int:
+        """Preload the most recently fetched brochures into memory"""
+
+        rows = db.execute(
+            select(Brochure)
+            .order_by(Brochure.fetched_at.desc())
+            .limit(limit or self.max_entries)
+        ).scalars()
+
+        loaded = 0
+        for row in reversed(list(rows)):
+            self._remember(self._entry(row))
+            loaded += 1
+        return loaded
+
+    @staticmethod
+    def _entry(row: Brochure) -> BrochureEntry:
+        return BrochureEntry(
+            project_name=row.project_name,
+            developer_name=row.developer_name,
+            content=row.content,
+            content_hash=row.content_hash,
+            version=row.version,
+            fetched_at=row.fetched_at
+        )
+
+brochure_store = BrochureStore()
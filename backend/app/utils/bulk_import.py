@@ -0,0 +1,271 @@
+"""
+Streaming bulk import of approvals, developers and properties
+
+    python -m app.utils.bulk_import approvals approvals.csv
+    python -m app.utils.bulk_import developers developers.jsonl --batch-size 10000
+    python -m app.utils.bulk_import properties plots.jsonl --notify
+
+Rows are validated with the *Create schemas and upserted in batches
+(COPY into a staging table on PostgreSQL, executemany elsewhere), so
+memory stays flat however large the file is. A batch the database
+rejects is reported with its line range and skipped; the others are
+still written. New approvals are then checked for duplicate projects,
+and with --notify, new approvals or properties are matched against
+saved searches.
+
+Batches are written through Core, so running servers do not see them
+through Session events: their market statistics, developer reputation
+and requirement indexes pick up the new rows within
+INDEX_REFRESH_SECONDS (or on restart when the refresh is disabled).
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import Table, insert
+from app.config import engine
+from app.models.property import LayoutApproval, Developer, Property, PropertyStatus
+from app.schemas import LayoutApprovalCreate, DeveloperCreate, PropertyCreate
+from app.scrapers.authorities import normalize_approval
+
+@dataclass
+class ImportTarget:
+    table: Table
+    schema: Type[BaseModel]
+    conflict_key: Optional[str]  # unique column to upsert on; None means insert only
+    defaults: Dict[str, Any]  # written on insert only; an upsert keeps the stored value
+
+    def update_columns(self, columns: List[str]) -> List[str]:
+        """Columns an upsert overwrites on an existing row"""
+        kept = {self.conflict_key, "created_at", *self.defaults}
+        return [c for c in columns if c not in kept]
+
+TARGETS = {
+    "approvals": ImportTarget(
+        table=LayoutApproval.__table__,
+        schema=LayoutApprovalCreate,
+        conflict_key="approval_number",
+        defaults={"is_active": True}
+    ),
+    "developers": ImportTarget(
+        table=Developer.__table__,
+        schema=DeveloperCreate,
+        conflict_key="name",
+        defaults={"reputation_score": 0.0, "reviews_count": 0, "total_projects": 0}
+    ),
+    # Properties have no natural unique key, so they are appended
+    "properties": ImportTarget(
+        table=Property.__table__,
+        schema=PropertyCreate,
+        conflict_key=None,
+        defaults={"status": PropertyStatus.APPROVED.value}
+    ),
+}
+
+def read_rows(path: str, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """Yield (line number, raw row) without loading the file"""
+
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            for line_number, row in enumerate(csv.DictReader(f), start=2):
+                yield line_number, {k: (v if v != "" else None) for k, v in row.items()}
+        else:
+            # Decoded by the caller so a bad line is reported, not fatal
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    yield line_number, line
+
+def to_record(target: ImportTarget, raw: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """Validate a raw row and return the full column dict to write"""
+
+    if target.schema is PropertyCreate and isinstance(raw.get("amenities"), str):
+        raw = {**raw, "amenities": json.loads(raw["amenities"])}
+
+    record = target.schema.model_validate(raw).model_dump()
+    record = {k: v for k, v in record.items() if k in target.table.columns}
+
+    for column, value in target.defaults.items():
+        record.setdefault(column, value)
+    record["created_at"] = now
+    record["updated_at"] = now
+
+    if target.table is LayoutApproval.__table__:
+        # Stored as routing queries expect: registry code and canonical division
+        record = normalize_approval(record)
+
+    if target.table is Property.__table__:
+        record["price_per_sqft"] = record["price"] / record["area"] if record["area"] else None
+
+    return record
+
+class BatchWriter:
+    """Upserts batches with executemany; used for every dialect except PostgreSQL"""
+
+    def __init__(self, target: ImportTarget):
+        self.target = target
+
+    def statement(self, columns: List[str]):
+        table = self.target.table
+        key = self.target.conflict_key
+
+        if key and engine.dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+            stmt = sqlite_insert(table)
+            return stmt.on_conflict_do_update(
+                index_elements=[key],
+                set_={c: stmt.excluded[c] for c in self.target.update_columns(columns)}
+            )
+        return insert(table)
+
+    def write(self, records: List[Dict[str, Any]]):
+        with engine.begin() as connection:
+            connection.execute(self.statement(list(records[0])), records)
+
+class PostgresCopyWriter(BatchWriter):
+    """COPY each batch into a staging table, then upsert it with one INSERT ... SELECT"""
+
+    def write(self, records: List[Dict[str, Any]]):
+        table = self.target.table.name
+        staging = f"import_{table}"
+        columns = list(records[0])
+        column_list = ", ".join(columns)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for record in records:
+            writer.writerow([self._copy_value(record[c]) for c in columns])
+        buffer.seek(0)
+
+        upsert = f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging}"
+        key = self.target.conflict_key
+        if key:
+            updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in self.target.update_columns(columns))
+            upsert += f" ON CONFLICT ({key}) DO UPDATE SET {updates}"
+
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS {staging} AS SELECT {column_list} FROM {table} WITH NO DATA"
+            )
+            cursor.copy_expert(f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+            cursor.execute(upsert)
+            cursor.execute(f"TRUNCATE {staging}")
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _copy_value(value: Any) -> Any:
+        if value is None:
+            return ""  # unquoted empty field is NULL in CSV COPY
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value
+
+def run_import(
+    entity: str,
+    path: str,
+    fmt: Optional[str] = None,
+    batch_size: int = 5000,
+    max_errors_shown: int = 20,
+    out=sys.stderr
+) -> Dict[str, int]:
+    target = TARGETS[entity]
+    fmt = fmt or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+    writer = PostgresCopyWriter(target) if engine.dialect.name == "postgresql" else BatchWriter(target)
+
+    stats = {"read": 0, "written": 0, "invalid": 0, "failed": 0}
+    started = time.monotonic()
+    now = datetime.utcnow()
+    # Keyed on the conflict column so repeats within a batch collapse to the last row
+    batch: Dict[Any, Dict[str, Any]] = {}
+    span = [0, 0]  # first and last line of the batch
+
+    def flush():
+        if batch:
+            try:
+                writer.write(list(batch.values()))
+                stats["written"] += len(batch)
+            except Exception as e:
+                # Each batch is its own transaction: report this one and carry on
+                stats["failed"] += len(batch)
+                print(f"lines {span[0]}-{span[1]}: batch of {len(batch):,} rows failed: {e}".replace("\n", " "), file=out)
+            batch.clear()
+            elapsed = time.monotonic() - started
+            print(
+                f"{entity}: {stats['read']:,} read, {stats['written']:,} written, "
+                f"{stats['invalid']:,} invalid, {stats['failed']:,} failed ({stats['read'] / elapsed:,.0f} rows/s)",
+                file=out
+            )
+
+    for line_number, raw in read_rows(path, fmt):
+        stats["read"] += 1
+        try:
+            if isinstance(raw, str):
+                raw = json.loads(raw)
+            record = to_record(target, raw, now)
+        except (ValidationError, ValueError) as e:
+            stats["invalid"] += 1
+            if stats["invalid"] <= max_errors_shown:
+                print(f"line {line_number}: {e}".replace("\n", " "), file=out)
+            continue
+
+        key = record[target.conflict_key] if target.conflict_key else stats["read"]
+        if not batch:
+            span[0] = line_number
+        span[1] = line_number
+        batch[key] = record
+        if len(batch) >= batch_size:
+            flush()
+
+    flush()
+    return stats
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Bulk import approvals, developers or properties")
+    parser.add_argument("entity", choices=sorted(TARGETS))
+    parser.add_argument("path", help="CSV or JSONL file")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--notify", action="store_true", help="alert saved searches matching the new rows")
+    args = parser.parse_args(argv)
+
+    started = datetime.utcnow()
+    stats = run_import(args.entity, args.path, args.format, args.batch_size)
+    print(
+        f"Done: {stats['written']:,} of {stats['read']:,} rows written, "
+        f"{stats['invalid']:,} invalid, {stats['failed']:,} in failed batches",
+        file=sys.stderr
+    )
+
+    if args.entity == "approvals" or (args.notify and args.entity == "properties"):
+        from app.config import SessionLocal
+        from app.utils.entity_resolution import resolve_since
+        from app.utils.saved_searches import match_since
+
+        db = SessionLocal()
+        try:
+            # New rows carry the import's created_at; upserted ones keep theirs
+            if args.entity == "approvals":
+                print(f"Duplicate approvals linked: {resolve_since(db, started):,}", file=sys.stderr)
+            if args.notify:
+                print(f"Saved search matches: {match_since(db, started):,}", file=sys.stderr)
+        finally:
+            db.close()
+    return 1 if stats["invalid"] or stats["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
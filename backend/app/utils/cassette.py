@@ -0,0 +1,212 @@
+"""
+Record/replay cassettes for the pipeline's external I/O
+
+With CASSETTE_MODE=record every query writes a cassette to cassette_dir
+holding each LLM completion, scraper payload and developer brochure it
+used, next to the request that produced it (for the LLM, the prompt
+template and its variables) and the latency of each call. Replaying serves them back by their
+inputs (falling back to recording order) without touching the network,
+and with the original latencies preserved or zeroed, so production
+traffic can be re-run
+offline as a regression and performance corpus:
+
+    python -m app.utils.cassette replay cassettes/*.json
+    python -m app.utils.cassette replay cassettes/*.json --latency zero
+"""
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from app.config import settings
+
+RECORD = "record"
+REPLAY = "replay"
+
+class CassetteMiss(LookupError):
+    """A replayed call that the cassette has no recording for"""
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Cannot record {type(value).__name__}")
+
+def _decode(data: Dict[str, Any]) -> Any:
+    if "__datetime__" in data and len(data) == 1:
+        return datetime.fromisoformat(data["__datetime__"])
+    return data
+
+def call_key(*parts: Any) -> str:
+    """Stable key for a call from its inputs"""
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:24]
+
+def _plain(value: Any) -> Any:
+    # Requests are kept for reading, not replay, so anything unusual is stored as text
+    return json.loads(json.dumps(value, default=str))
+
+class Cassette:
+    def __init__(self, mode: str, meta: Optional[Dict[str, Any]] = None, latency: str = "preserve"):
+        self.mode = mode
+        self.meta = meta or {}
+        self.latency = latency
+        self.entries: List[Dict[str, Any]] = []
+        self.misses: List[Tuple[str, str]] = []
+        self.mismatches = 0  # calls served in order because their inputs changed
+        self._by_key: Dict[Tuple[str, str], Deque[int]] = {}
+        self._by_kind: Dict[str, Deque[int]] = {}
+        self._used = set()
+
+    @classmethod
+    def load(cls, path: str, latency: str = "preserve") -> "Cassette":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f, object_hook=_decode)
+        cassette = cls(REPLAY, data.get("meta"), latency)
+        cassette.entries = data.get("entries", [])
+        for position, entry in enumerate(cassette.entries):
+            cassette._by_key.setdefault((entry["kind"], entry["key"]), deque()).append(position)
+            cassette._by_kind.setdefault(entry["kind"], deque()).append(position)
+        return cassette
+
+    def _next(self, queue: Optional[Deque[int]]) -> Optional[int]:
+        while queue:
+            position = queue.popleft()
+            if position not in self._used:
+                self._used.add(position)
+                return position
+        return None
+
+    def save(self, directory: str) -> str:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{datetime.utcnow():%Y%m%dT%H%M%S}-{self.meta.get('id', uuid.uuid4().hex[:12])}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"meta": self.meta, "entries": self.entries}, f, default=_encode)
+        return path
+
+    async def call(
+        self,
+        kind: str,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        request: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        if self.mode == RECORD:
+            started = time.perf_counter()
+            payload = await fetch()
+            self.entries.append({
+                "kind": kind,
+                "key": key,
+                "request": _plain(request),
+                "latency": round(time.perf_counter() - started, 4),
+                "payload": payload
+            })
+            return payload
+
+        # Exact inputs first, then the next unused call of the same kind
+        position = self._next(self._by_key.get((kind, key)))
+        if position is None:
+            position = self._next(self._by_kind.get(kind))
+            if position is None:
+                self.misses.append((kind, key))
+                raise CassetteMiss(f"No recorded {kind} call for key {key}")
+            self.mismatches += 1
+
+        entry = self.entries[position]
+        if self.latency == "preserve" and entry["latency"]:
+            await asyncio.sleep(entry["latency"])
+        return entry["payload"]
+
+_active: ContextVar[Optional[Cassette]] = ContextVar("cassette", default=None)
+
+async def through_cassette(
+    kind: str,
+    key: str,
+    fetch: Callable[[], Awaitable[Any]],
+    request: Optional[Dict[str, Any]] = None
+) -> Any:
+    """
+    Run an external call, recording or replaying it when a cassette is active
+    Payloads must be JSON serializable (datetimes are allowed); request is
+    recorded next to the payload so a cassette shows what was asked
+    """
+
+    cassette = _active.get()
+    if cassette is None:
+        return await fetch()
+    return await cassette.call(kind, key, fetch, request)
+
+@contextmanager
+def use_cassette(cassette: Optional[Cassette]):
+    token = _active.set(cassette)
+    try:
+        yield cassette
+    finally:
+        _active.reset(token)
+
+def recording(**meta) -> Optional[Cassette]:
+    """A new cassette when recording is enabled and none is active (e.g. a replay), else None"""
+    if settings.cassette_mode != RECORD or _active.get() is not None:
+        return None
+    return Cassette(RECORD, {"id": uuid.uuid4().hex[:12], "recorded_at": datetime.utcnow().isoformat(), **meta})
+
+async def save_recording(cassette: Optional[Cassette], **meta):
+    if cassette is None or cassette.mode != RECORD:
+        return
+    cassette.meta.update(meta)
+    try:
+        await asyncio.to_thread(cassette.save, settings.cassette_dir)
+    except (OSError, TypeError) as e:
+        print(f"Error saving cassette: {e}")
+
+async def replay(path: str, latency: str = "preserve") -> Dict[str, Any]:
+    """Re-run a recorded query offline and compare its result with the recording"""
+
+    from app.agents.orchestrator import AgentOrchestrator
+
+    cassette = Cassette.load(path, latency)
+    started = time.perf_counter()
+    with use_cassette(cassette):
+        response = await AgentOrchestrator().process_query(cassette.meta.get("query", ""))
+    elapsed = time.perf_counter() - started
+
+    result = [[p.name, p.price] for p in response.properties or []]
+    return {
+        "path": path,
+        "seconds": round(elapsed, 4),
+        "recorded_seconds": cassette.meta.get("stage_timings", {}).get("total"),
+        "stage_timings": (response.workflow_trace or {}).get("stage_timings", {}),
+        "matches": result == cassette.meta.get("result"),
+        "misses": len(cassette.misses),
+        "mismatches": cassette.mismatches
+    }
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Replay recorded pipeline cassettes")
+    parser.add_argument("command", choices=["replay"])
+    parser.add_argument("paths", nargs="+", help="cassette files or glob patterns")
+    parser.add_argument("--latency", choices=["preserve", "zero"], default=settings.cassette_latency)
+    args = parser.parse_args(argv)
+
+    paths = sorted(p for pattern in args.paths for p in (glob.glob(pattern) or [pattern]))
+    failures = 0
+    for path in paths:
+        report = asyncio.run(replay(path, args.latency))
+        failures += 0 if report["matches"] and not report["misses"] else 1
+        print(json.dumps(report))
+
+    print(f"Replayed {len(paths)} cassettes, {failures} changed or incomplete", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    # Run from the imported module so the agents see the same context variable
+    from app.utils.cassette import main as module_main
+    sys.exit(module_main())
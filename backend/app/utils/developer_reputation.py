@@ -0,0 +1,125 @@
+import re
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from app.config import settings
+from app.models.property import Developer
+
+# Legal suffixes that vary between sources for the same developer
+_SUFFIXES = {"pvt", "private", "ltd", "limited", "llp", "inc", "co", "company"}
+
+def normalize_developer_name(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    words = re.sub(r"[^a-z0-9 ]+", " ", name.lower()).split()
+    while words and words[-1] in _SUFFIXES:
+        words.pop()
+    return " ".join(words) or None
+
+class DeveloperReputationMap:
+    """
+    In-memory map of developer reputation keyed by normalized name
+
+    Loaded once at startup and kept current from Developer commits, so
+    batch scoring never queries the database per property.
+    """
+
+    def __init__(self, prior_score: float, prior_reviews: int):
+        self.prior_score = prior_score
+        self.prior_reviews = prior_reviews
+        self._entries: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, db: Session) -> int:
+        rows = db.query(Developer.name, Developer.reputation_score, Developer.reviews_count).all()
+        entries = {}
+        for row in rows:
+            key = normalize_developer_name(row.name)
+            if key:
+                entries[key] = (row.reputation_score or 0.0, row.reviews_count or 0)
+
+        with self._lock:
+            self._entries = entries
+        return len(entries)
+
+    def load_rows(self, db: Session, ids: Iterable[int]) -> int:
+        """Re-read the given developers and apply their current scores; used by the index refresher"""
+
+        rows = db.query(Developer.name, Developer.reputation_score, Developer.reviews_count).filter(
+            Developer.id.in_(list(ids))
+        ).all()
+        for row in rows:
+            self.set(row.name, row.reputation_score, row.reviews_count)
+        return len(rows)
+
+    def set(self, name: str, reputation_score: Optional[float], reviews_count: Optional[int]):
+        key = normalize_developer_name(name)
+        if key:
+            with self._lock:
+                self._entries[key] = (reputation_score or 0.0, reviews_count or 0)
+
+    def discard(self, name: str):
+        key = normalize_developer_name(name)
+        if key:
+            with self._lock:
+                self._entries.pop(key, None)
+
+    def get(self, name: Optional[str]) -> Optional[Tuple[float, int]]:
+        key = normalize_developer_name(name)
+        return self._entries.get(key) if key else None
+
+    def score(self, name: Optional[str], max_points: float = 10) -> float:
+        """
+        Reputation scaled to 0-max_points
+
+        Ratings (0-5) are shrunk towards the prior in proportion to how
+        few reviews back them; unknown developers get the prior.
+        """
+
+        entry = self.get(name)
+        if entry is None:
+            rating = self.prior_score
+        else:
+            reputation_score, reviews_count = entry
+            rating = (
+                (reputation_score * reviews_count + self.prior_score * self.prior_reviews)
+                / (reviews_count + self.prior_reviews)
+            )
+        return max_points * rating / 5
+
+developer_reputation = DeveloperReputationMap(
+    prior_score=settings.developer_prior_score,
+    prior_reviews=settings.developer_prior_reviews
+)
+
+# Applied after commit so rolled-back edits never reach the map
+_PENDING_KEY = "developer_reputation_pending"
+
+@event.listens_for(Session, "after_flush")
+def _collect_developer_changes(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, [])
+
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Developer):
+            # A rename must drop the entry under the old name
+            for old_name in get_history(obj, "name").deleted:
+                pending.append((old_name, None))
+            pending.append((obj.name, (obj.reputation_score, obj.reviews_count)))
+
+    for obj in session.deleted:
+        if isinstance(obj, Developer):
+            pending.append((obj.name, None))
+
+@event.listens_for(Session, "after_commit")
+def _apply_developer_changes(session):
+    for name, values in session.info.pop(_PENDING_KEY, []):
+        if values is None:
+            developer_reputation.discard(name)
+        else:
+            developer_reputation.set(name, *values)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_developer_changes(session):
+    session.info.pop(_PENDING_KEY, None)
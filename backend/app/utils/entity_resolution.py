@@ -0,0 +1,420 @@
+"""
+Duplicate project detection across sources
+
+The same layout shows up under variant spellings ("Kanakapura Residency"
+vs "Kanakpura Residency") from different authorities and crawls. Each
+project is summarized by a MinHash signature of its name trigrams,
+developer trigrams and locality; locality-sensitive hashing over bands of
+the signature finds the few existing projects worth comparing, and only
+those are verified. Duplicates point at the first-seen project through
+LayoutApproval.canonical_id.
+
+The resolver is loaded at warm-up (or in the background when an approval
+is committed first). Approvals inserted through the ORM are resolved on
+commit; bulk imports of approvals are resolved afterwards, and the whole
+table can be redone:
+
+    python -m app.utils.entity_resolution resolve --all
+"""
+import argparse
+import random
+import re
+import sys
+import threading
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+from app.config import engine, settings, SessionLocal
+from app.models.property import Brochure, Developer, LayoutApproval, Property
+from app.utils.developer_reputation import normalize_developer_name
+from app.utils.locality_index import normalize_locality, trigrams
+from app.utils.saved_searches import canonical_locality
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+def _stable_hash(value: str) -> int:
+    # Python's hash() is salted per process; signatures must match across runs
+    return zlib.crc32(value.encode("utf-8"))
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+@dataclass(frozen=True)
+class ProjectKey:
+    """What a project is compared on"""
+
+    name: FrozenSet[str]  # name trigrams
+    numbers: Tuple[str, ...]  # "Phase 1" and "Phase 2" are different projects
+    developer: FrozenSet[str]  # developer name trigrams, empty when unknown
+    locality: Optional[str]
+
+    @classmethod
+    def of(cls, name: str, developer: Optional[str] = None, location: Optional[str] = None) -> "ProjectKey":
+        normalized = normalize_locality(name or "")
+        developer_name = normalize_developer_name(developer)
+        return cls(
+            name=frozenset(trigrams(normalized)) if normalized else frozenset(),
+            numbers=tuple(re.findall(r"\d+", normalized)),
+            developer=frozenset(trigrams(developer_name)) if developer_name else frozenset(),
+            locality=canonical_locality(location)
+        )
+
+    def shingles(self) -> Set[str]:
+        tokens = set(self.name)
+        tokens.update(f"dev:{gram}" for gram in self.developer)
+        if self.locality:
+            tokens.add(f"loc:{self.locality}")
+        return tokens
+
+class MinHasher:
+    def __init__(self, permutations: int, seed: int = 1):
+        rng = random.Random(seed)
+        self.params = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(permutations)]
+
+    def signature(self, shingles: Iterable[str]) -> Tuple[int, ...]:
+        hashes = [_stable_hash(shingle) for shingle in shingles]
+        if not hashes:
+            return tuple(_MAX_HASH for _ in self.params)
+        return tuple(
+            min((a * h + b) % _PRIME for h in hashes) & _MAX_HASH
+            for a, b in self.params
+        )
+
+class EntityResolver:
+    """
+    MinHash/LSH index of projects, assigning each new one a canonical id
+
+    With `bands` bands of `rows` rows, two projects land in a common
+    bucket with probability 1 - (1 - s**rows) ** bands for shingle
+    similarity s, about 0.95 at s = 0.6 with the defaults, while
+    dissimilar projects are almost never compared.
+    """
+
+    def __init__(
+        self,
+        bands: int = settings.dedupe_minhash_bands,
+        rows: int = settings.dedupe_minhash_rows,
+        name_threshold: float = settings.dedupe_name_threshold
+    ):
+        self.bands = bands
+        self.rows = rows
+        self.name_threshold = name_threshold
+        self.hasher = MinHasher(bands * rows)
+        self.loaded = False
+        self._keys: Dict[int, ProjectKey] = {}
+        self._canonical: Dict[int, int] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _band_keys(self, key: ProjectKey) -> List[Tuple[int, Tuple[int, ...]]]:
+        signature = self.hasher.signature(key.shingles())
+        return [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def is_duplicate(self, a: ProjectKey, b: ProjectKey) -> bool:
+        if a.numbers != b.numbers:
+            return False
+        if a.locality and b.locality and a.locality != b.locality:
+            return False
+        if a.developer and b.developer and _jaccard(a.developer, b.developer) < 0.3:
+            return False
+        # Without a locality on both sides, only near-identical names are trusted
+        threshold = self.name_threshold if a.locality and b.locality else max(self.name_threshold, 0.8)
+        return _jaccard(a.name, b.name) >= threshold
+
+    def _match(self, key: ProjectKey, bands: List[Tuple[int, Tuple[int, ...]]]) -> Optional[int]:
+        """Canonical id of the most similar verified duplicate among the LSH candidates"""
+
+        candidates: Set[int] = set()
+        for band in bands:
+            candidates.update(self._buckets.get(band, ()))
+
+        best, best_score = None, 0.0
+        for candidate in candidates:
+            other = self._keys[candidate]
+            if self.is_duplicate(key, other):
+                score = _jaccard(key.name, other.name)
+                if score > best_score or (score == best_score and candidate < best):
+                    best, best_score = candidate, score
+        return self._canonical[best] if best is not None else None
+
+    def add(self, record_id: int, name: str, developer: Optional[str] = None, location: Optional[str] = None) -> int:
+        """Index a project; returns its canonical id (its own id when it is new)"""
+
+        key = ProjectKey.of(name, developer, location)
+        bands = self._band_keys(key)
+        with self._lock:
+            if record_id in self._keys:
+                return self._canonical[record_id]
+            canonical = self._match(key, bands)
+            self._keys[record_id] = key
+            self._canonical[record_id] = canonical if canonical is not None else record_id
+            for band in bands:
+                self._buckets.setdefault(band, []).append(record_id)
+            return self._canonical[record_id]
+
+    def canonical_of(self, record_id: int) -> Optional[int]:
+        return self._canonical.get(record_id)
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+            self._canonical.clear()
+            self._buckets.clear()
+
+    def load(
+        self,
+        db: Session,
+        before: Optional[datetime] = None,
+        exclude: Iterable[int] = (),
+        batch_size: int = 5000
+    ) -> int:
+        """
+        Index stored approvals, oldest first, keeping their canonical ids
+        Approvals created at or after `before`, or in `exclude`, are left
+        for the caller to resolve
+        """
+
+        exclude = set(exclude)
+
+        self.clear()
+
+        statement = approval_rows()
+        if before is not None:
+            statement = statement.where(LayoutApproval.created_at < before)
+        rows = db.execute(statement.order_by(LayoutApproval.id)).yield_per(batch_size)
+
+        loaded = 0
+        for row in rows:
+            if row.id in exclude:
+                continue
+            key = ProjectKey.of(row.project_name, row.developer, row.location)
+            bands = self._band_keys(key)
+            with self._lock:
+                self._keys[row.id] = key
+                self._canonical[row.id] = row.canonical_id or row.id
+                for band in bands:
+                    self._buckets.setdefault(band, []).append(row.id)
+            loaded += 1
+
+        self.loaded = True
+        return loaded
+
+def approval_rows():
+    """
+    Approvals with what they are compared on
+
+    Approvals carry no developer of their own; it is taken from a linked
+    property's developer, else from the project's brochure.
+    """
+
+    property_developer = (
+        select(Property.layout_approval_id, func.min(Developer.name).label("developer"))
+        .join(Developer, Property.developer_id == Developer.id)
+        .where(Property.layout_approval_id.is_not(None))
+        .group_by(Property.layout_approval_id)
+        .subquery()
+    )
+    brochure_developer = (
+        select(Brochure.project_name, func.max(Brochure.developer_name).label("developer"))
+        .group_by(Brochure.project_name)
+        .subquery()
+    )
+    return (
+        select(
+            LayoutApproval.id,
+            LayoutApproval.project_name,
+            LayoutApproval.location,
+            LayoutApproval.canonical_id,
+            func.coalesce(property_developer.c.developer, brochure_developer.c.developer).label("developer")
+        )
+        .outerjoin(property_developer, property_developer.c.layout_approval_id == LayoutApproval.id)
+        .outerjoin(brochure_developer, brochure_developer.c.project_name == LayoutApproval.project_name)
+    )
+
+entity_resolver = EntityResolver()
+
+def _store_canonical_ids(assignments: List[Tuple[int, int]]):
+    """Persist canonical ids; the canonical record itself keeps NULL"""
+
+    duplicates = [(record_id, canonical) for record_id, canonical in assignments if canonical != record_id]
+    if not duplicates:
+        return
+    table = LayoutApproval.__table__
+    with engine.begin() as connection:
+        for record_id, canonical in duplicates:
+            connection.execute(update(table).where(table.c.id == record_id).values(canonical_id=canonical))
+
+def resolve_approvals(records: Iterable[Dict[str, Any]], resolver: EntityResolver = entity_resolver) -> int:
+    """Assign canonical ids to stored approvals; returns how many were duplicates"""
+
+    assignments = [
+        (record["id"], resolver.add(record["id"], record["project_name"], record.get("developer"), record.get("location")))
+        for record in records
+    ]
+    _store_canonical_ids(assignments)
+    return sum(1 for record_id, canonical in assignments if canonical != record_id)
+
+def resolve_since(db: Session, since: Optional[datetime] = None, batch_size: int = 1000) -> int:
+    """
+    Resolve approvals created since a time (e.g. by a bulk import), or all of them
+    Approvals that already have a canonical id are left as they are
+    """
+
+    if since is None:
+        # Start over: every approval is compared with those ingested before it
+        db.execute(update(LayoutApproval).values(canonical_id=None))
+        db.commit()
+        entity_resolver.clear()
+        entity_resolver.loaded = True
+        statement = approval_rows()
+    else:
+        if not entity_resolver.loaded:
+            entity_resolver.load(db, before=since)
+        statement = approval_rows().where(
+            LayoutApproval.created_at >= since,
+            LayoutApproval.canonical_id.is_(None)
+        )
+
+    duplicates = 0
+    batch = []
+    for row in db.execute(statement.order_by(LayoutApproval.id)).yield_per(batch_size):
+        batch.append({"id": row.id, "project_name": row.project_name, "developer": row.developer, "location": row.location})
+        if len(batch) >= batch_size:
+            duplicates += resolve_approvals(batch)
+            batch = []
+    duplicates += resolve_approvals(batch)
+    return duplicates
+
+def collapse_duplicates(approvals: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Keep the first of each project in a result list, in order
+
+    Stored approvals are grouped by canonical id; records scraped live
+    (without ids) are resolved against each other. The kept record lists
+    the approval numbers it stands for under "duplicates".
+    """
+
+    resolver = EntityResolver()
+    kept: List[Dict[str, Any]] = []
+    by_group: Dict[Any, Dict[str, Any]] = {}
+
+    for position, approval in enumerate(approvals):
+        if approval.get("id") is not None:
+            group = ("id", approval.get("canonical_id") or approval["id"])
+        else:
+            group = ("new", resolver.add(
+                position,
+                approval.get("project_name", ""),
+                approval.get("developer_contact"),
+                approval.get("location")
+            ))
+
+        first = by_group.get(group)
+        if first is None:
+            by_group[group] = approval
+            kept.append(approval)
+        else:
+            first.setdefault("duplicates", []).append(approval.get("approval_number"))
+
+    return kept, len(approvals) - len(kept)
+
+def load_resolver(session_factory=SessionLocal) -> int:
+    """
+    Load the resolver from the store, then resolve the approvals committed meanwhile
+
+    Run by warm-up, or in a background thread when an approval is
+    committed first; hashing every stored approval takes a while, so it
+    never runs on a committing thread.
+    """
+
+    with _load_lock:
+        if not entity_resolver.loaded:
+            started = datetime.utcnow()
+            with _backlog_lock:
+                waiting = [record["id"] for record in _backlog]
+            db = session_factory()
+            try:
+                # Approvals created from now on, and those waiting, go through resolve_approvals
+                entity_resolver.load(db, before=started, exclude=waiting)
+            finally:
+                db.close()
+
+    with _backlog_lock:
+        records = list(_backlog)
+        _backlog.clear()
+    resolve_approvals(records)
+    return len(entity_resolver)
+
+_load_lock = threading.Lock()
+_backlog: List[Dict[str, Any]] = []  # committed before the resolver was loaded
+_backlog_lock = threading.Lock()
+_loader: Optional[threading.Thread] = None
+
+def _load_in_background():
+    global _loader
+
+    if _loader is None or not _loader.is_alive():
+        _loader = threading.Thread(target=load_resolver, name="entity-resolver-load", daemon=True)
+        _loader.start()
+
+# Resolved after commit so rolled-back approvals are never indexed
+_PENDING_KEY = "entity_resolution_pending"
+
+@event.listens_for(Session, "after_flush")
+def _collect_new_approvals(session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, LayoutApproval) and obj.canonical_id is None:
+            developer = session.execute(
+                select(Brochure.developer_name).where(Brochure.project_name == obj.project_name).limit(1)
+            ).scalar()
+            session.info.setdefault(_PENDING_KEY, []).append(
+                {"id": obj.id, "project_name": obj.project_name, "developer": developer, "location": obj.location}
+            )
+
+@event.listens_for(Session, "after_commit")
+def _resolve_new_approvals(session):
+    records = session.info.pop(_PENDING_KEY, None)
+    if not records:
+        return
+
+    with _backlog_lock:
+        if not entity_resolver.loaded:
+            _backlog.extend(records)
+            _load_in_background()
+            return
+    try:
+        resolve_approvals(records)
+    except Exception as e:
+        print(f"Error resolving duplicate approvals: {e}")
+
+@event.listens_for(Session, "after_rollback")
+def _discard_new_approvals(session):
+    session.info.pop(_PENDING_KEY, None)
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Detect duplicate approvals and assign canonical ids")
+    parser.add_argument("command", choices=["resolve"])
+    scope = parser.add_mutually_exclusive_group(required=True)
+    scope.add_argument("--since", type=datetime.fromisoformat, help="ISO time; approvals created since then")
+    scope.add_argument("--all", action="store_true", help="recompute every canonical id")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        duplicates = resolve_since(db, None if args.all else args.since)
+        print(f"{duplicates:,} duplicate approvals linked to a canonical project", file=sys.stderr)
+    finally:
+        db.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
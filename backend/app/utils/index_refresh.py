@@ -0,0 +1,147 @@
+"""
+Periodic catch-up of in-memory indexes from the store
+
+The indexes are kept current from this process's own ORM commits. Rows
+written elsewhere (another worker, or a bulk import or crawl writing
+through Core, which bypasses Session events) only reach them here. Each
+index registers a loader per table it is built from; every
+index_refresh_seconds the refresher reads the rows whose updated_at
+passed that table's high-water mark (an indexed range scan) and hands
+their ids to the loaders, which re-read and apply just those rows.
+
+Loaders apply a row's current state, so seeing a row again (this
+worker's own commits, or the overlap window below) is harmless. Rows
+deleted elsewhere have no updated_at to find; they leave the indexes on
+the next restart.
+"""
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import Table, func, select
+from sqlalchemy.orm import Session
+from app.config import settings, SessionLocal
+from app.models.property import Brochure, Developer, LayoutApproval, Property, SavedSearch
+from app.scrapers.authorities import authority_registry
+from app.utils.developer_reputation import developer_reputation
+from app.utils.market_stats import market_stats
+from app.utils import saved_searches
+from app.utils.text_index import requirement_index
+
+# updated_at comes from each writer's clock and commits land out of order,
+# so every pass re-reads this far behind the mark (skipping rows it applied)
+OVERLAP = timedelta(seconds=5)
+
+@dataclass
+class RefreshTarget:
+    name: str
+    table: Table
+    load_rows: Callable[[Session, Iterable[int]], Any]
+
+@dataclass
+class _Watermark:
+    updated_at: Optional[datetime]
+    recent: Set[Tuple[int, datetime]]  # rows applied within OVERLAP of the mark
+
+class IndexRefresher:
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        interval_seconds: float = settings.index_refresh_seconds,
+        batch_size: int = 1000
+    ):
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._targets: List[RefreshTarget] = []
+        self._watermarks: Dict[str, _Watermark] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    def register(self, name: str, table: Table, load_rows: Callable[[Session, Iterable[int]], Any]):
+        self._targets.append(RefreshTarget(name, table, load_rows))
+
+    def refresh(self) -> Dict[str, int]:
+        """
+        Apply rows changed since the last call; returns rows applied per index
+        The first call only records the marks: warm-up has just loaded everything.
+        """
+
+        applied: Dict[str, int] = {}
+        db = self.session_factory()
+        try:
+            tables = {target.table.name: target.table for target in self._targets}
+            for name, table in tables.items():
+                mark = self._watermarks.get(name)
+                if mark is None:
+                    self._watermarks[name] = _Watermark(db.scalar(select(func.max(table.c.updated_at))), set())
+                    continue
+
+                targets = [target for target in self._targets if target.table is table]
+                for ids in self._changed(db, table, mark):
+                    for target in targets:
+                        target.load_rows(db, ids)
+                        applied[target.name] = applied.get(target.name, 0) + len(ids)
+            return applied
+        finally:
+            db.close()
+
+    def _changed(self, db: Session, table: Table, mark: _Watermark) -> Iterable[List[int]]:
+        """Batches of ids changed since the mark, advancing it as they are read"""
+
+        query = select(table.c.id, table.c.updated_at).order_by(table.c.updated_at)
+        if mark.updated_at is not None:
+            query = query.where(table.c.updated_at >= mark.updated_at - OVERLAP)
+
+        seen = mark.recent
+        batch: List[int] = []
+        for row_id, updated_at in db.execute(query).yield_per(self.batch_size):
+            if updated_at is None or (row_id, updated_at) in seen:
+                continue
+            batch.append(row_id)
+            mark.recent.add((row_id, updated_at))
+            if mark.updated_at is None or updated_at > mark.updated_at:
+                mark.updated_at = updated_at
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+        if mark.updated_at is not None:
+            mark.recent = {key for key in mark.recent if key[1] >= mark.updated_at - OVERLAP}
+
+    async def _loop(self):
+        while not self._stopping.is_set():
+            try:
+                applied = await asyncio.to_thread(self.refresh)
+                if applied:
+                    print("Refreshed indexes: " + ", ".join(f"{name} ({count:,} rows)" for name, count in applied.items()))
+            except Exception as e:
+                print(f"Index refresh error: {e}")
+
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Start the background refresh loop on the running event loop"""
+        if self.interval_seconds > 0 and (self._task is None or self._task.done()):
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+index_refresher = IndexRefresher()
+index_refresher.register("market_stats", Property.__table__, market_stats.load_rows)
+index_refresher.register("developer_reputation", Developer.__table__, developer_reputation.load_rows)
+index_refresher.register("requirement_index", Brochure.__table__, requirement_index.load_brochures)
+index_refresher.register("requirement_index", Property.__table__, requirement_index.load_properties)
+index_refresher.register("requirement_index", LayoutApproval.__table__, requirement_index.load_approvals)
+index_refresher.register("saved_searches", SavedSearch.__table__, saved_searches.load_rows)
+index_refresher.register("authorities", LayoutApproval.__table__, authority_registry.load_rows)
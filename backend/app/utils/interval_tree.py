@@ -0,0 +1,126 @@
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+INF = float("inf")
+
+# (low, high, id); open bounds are -inf/inf
+Interval = Tuple[float, float, int]
+
+class _Node:
+    __slots__ = ("center", "lows", "low_ids", "highs", "high_ids", "left", "right")
+
+    def __init__(self, center: float, intervals: List[Interval]):
+        self.center = center
+        by_low = sorted(intervals, key=lambda interval: interval[0])
+        by_high = sorted(intervals, key=lambda interval: interval[1])
+        self.lows = [interval[0] for interval in by_low]
+        self.low_ids = [interval[2] for interval in by_low]
+        self.highs = [interval[1] for interval in by_high]
+        self.high_ids = [interval[2] for interval in by_high]
+        self.left: Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+
+def _build(intervals: List[Interval]) -> Optional[_Node]:
+    if not intervals:
+        return None
+
+    endpoints = sorted(value for low, high, _ in intervals for value in (low, high))
+    center = endpoints[len(endpoints) // 2]
+
+    left, here, right = [], [], []
+    for interval in intervals:
+        if interval[1] < center:
+            left.append(interval)
+        elif interval[0] > center:
+            right.append(interval)
+        else:
+            here.append(interval)
+
+    # center is an endpoint of some interval, so each level keeps at least one
+    node = _Node(center, here)
+    node.left = _build(left)
+    node.right = _build(right)
+    return node
+
+class IntervalTree:
+    """
+    Centered interval tree over closed intervals, answering "which intervals contain x"
+
+    The tree itself is static; intervals added or removed since the last
+    build sit in a small overlay, and the tree is rebuilt once the
+    overlay outgrows rebuild_fraction of it. A stab costs
+    O(log n + matches + overlay).
+    """
+
+    def __init__(self, rebuild_fraction: float = 0.1, min_rebuild: int = 64):
+        self.rebuild_fraction = rebuild_fraction
+        self.min_rebuild = min_rebuild
+        self._intervals: Dict[int, Tuple[float, float]] = {}
+        self._root: Optional[_Node] = None
+        self._built: Set[int] = set()
+        self._added: Dict[int, Tuple[float, float]] = {}
+        self._removed: Set[int] = set()
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def __contains__(self, interval_id: int):
+        return interval_id in self._intervals
+
+    def add(self, interval_id: int, low: Optional[float], high: Optional[float]):
+        if interval_id in self._intervals:
+            self.remove(interval_id)
+        bounds = (-INF if low is None else low, INF if high is None else high)
+        self._intervals[interval_id] = bounds
+        self._added[interval_id] = bounds
+        self._maybe_rebuild()
+
+    def remove(self, interval_id: int):
+        if self._intervals.pop(interval_id, None) is None:
+            return
+        self._added.pop(interval_id, None)
+        if interval_id in self._built:
+            self._removed.add(interval_id)
+        self._maybe_rebuild()
+
+    def _maybe_rebuild(self):
+        overlay = len(self._added) + len(self._removed)
+        if overlay > max(self.min_rebuild, self.rebuild_fraction * len(self._built)):
+            self.rebuild()
+
+    def rebuild(self):
+        intervals = [(low, high, interval_id) for interval_id, (low, high) in self._intervals.items()]
+        self._root = _build(intervals)
+        self._built = set(self._intervals)
+        self._added.clear()
+        self._removed.clear()
+
+    def extend(self, intervals: Iterable[Tuple[int, Optional[float], Optional[float]]]):
+        """Add many intervals with a single rebuild"""
+
+        for interval_id, low, high in intervals:
+            self._intervals[interval_id] = (-INF if low is None else low, INF if high is None else high)
+        self.rebuild()
+
+    def stab(self, x: float) -> List[int]:
+        """Ids of the intervals containing x"""
+
+        found: List[int] = []
+        node = self._root
+        while node is not None:
+            if x < node.center:
+                found.extend(node.low_ids[:bisect_right(node.lows, x)])
+                node = node.left
+            elif x > node.center:
+                found.extend(node.high_ids[bisect_left(node.highs, x):])
+                node = node.right
+            else:
+                found.extend(node.low_ids)
+                break
+
+        if self._removed:
+            found = [interval_id for interval_id in found if interval_id not in self._removed]
+        for interval_id, (low, high) in self._added.items():
+            if low <= x <= high:
+                found.append(interval_id)
+        return found
@@ -0,0 +1,137 @@
+import csv
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_GAZETTEER = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "bangalore_localities.csv")
+
+# Words shared by many locality names; a query made only of these names no
+# particular locality and would otherwise fuzzy-match whichever is closest
+GENERIC_TOKENS = frozenset({
+    "road", "rd", "main", "cross", "layout", "nagar", "stage", "phase", "block", "sector",
+    "extension", "town", "city", "village", "halli", "palya", "pura", "bangalore", "bengaluru",
+    "north", "south", "east", "west"
+})
+
+@dataclass(frozen=True)
+class LocalityMatch:
+    name: str  # canonical locality name
+    division: str
+    matched: str  # the name or alias that matched
+    score: float  # 0-1, 1 for an exact match
+
+def normalize_locality(value: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9 ]+", " ", value.lower()).split())
+
+def is_generic(key: str) -> bool:
+    """True for a normalized name made only of generic words (and numbers)"""
+    return all(token in GENERIC_TOKENS or token.isdigit() for token in key.split())
+
+def trigrams(value: str) -> Set[str]:
+    padded = f"  {value} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class LocalityIndex:
+    """
+    Typo-tolerant gazetteer of localities and their aliases
+
+    Names are indexed by character trigram; a lookup scores only the
+    names sharing at least one trigram with the query (Dice coefficient),
+    so it stays well under a millisecond for thousands of entries.
+    """
+
+    def __init__(self, min_score: float = 0.5):
+        self.min_score = min_score
+        self._names: List[str] = []  # normalized name or alias
+        self._entries: List[Tuple[str, str]] = []  # (canonical name, division) per name
+        self._grams: List[int] = []  # trigram count per name
+        self._exact: Dict[str, int] = {}
+        self._postings: Dict[str, List[int]] = {}
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, name: str, division: str, aliases: Iterable[str] = ()):
+        for variant in (name, *aliases):
+            key = normalize_locality(variant)
+            if not key:
+                continue
+            if key in self._exact:
+                # Later entries override the division of an existing name
+                self._entries[self._exact[key]] = (name, division)
+                continue
+
+            position = len(self._names)
+            grams = trigrams(key)
+            self._names.append(key)
+            self._entries.append((name, division))
+            self._grams.append(len(grams))
+            self._exact[key] = position
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(position)
+
+    def set_division(self, name: str, division: str):
+        """Pin the division of a name, keeping the canonical name it belongs to"""
+
+        key = normalize_locality(name)
+        position = self._exact.get(key)
+        if position is None:
+            self.add(name.title(), division)
+        else:
+            canonical, _ = self._entries[position]
+            self._entries[position] = (canonical, division)
+
+    def load_csv(self, path: str = DEFAULT_GAZETTEER) -> int:
+        """Load `name,division,aliases` rows (aliases separated by ';')"""
+
+        loaded = 0
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                aliases = [a for a in (row.get("aliases") or "").split(";") if a.strip()]
+                self.add(row["name"].strip(), row["division"].strip(), aliases)
+                loaded += 1
+        return loaded
+
+    def search(self, query: str, limit: int = 5, min_score: Optional[float] = None) -> List[LocalityMatch]:
+        """Ranked matches for a free-text locality"""
+
+        key = normalize_locality(query or "")
+        if not key or is_generic(key):
+            return []
+
+        threshold = self.min_score if min_score is None else min_score
+
+        exact = self._exact.get(key)
+        if exact is not None and limit == 1:
+            name, division = self._entries[exact]
+            return [LocalityMatch(name, division, self._names[exact], 1.0)]
+
+        query_grams = trigrams(key)
+        shared: Dict[int, int] = {}
+        for gram in query_grams:
+            for position in self._postings.get(gram, ()):
+                shared[position] = shared.get(position, 0) + 1
+
+        scored = []
+        for position, count in shared.items():
+            score = 2 * count / (len(query_grams) + self._grams[position])
+            if score >= threshold:
+                scored.append((score, position))
+        scored.sort(reverse=True)
+
+        matches = []
+        seen = set()
+        for score, position in scored:
+            name, division = self._entries[position]
+            if name in seen:
+                continue
+            seen.add(name)
+            matches.append(LocalityMatch(name, division, self._names[position], round(score, 3)))
+            if len(matches) == limit:
+                break
+        return matches
+
+    def best(self, query: str) -> Optional[LocalityMatch]:
+        matches = self.search(query, limit=1)
+        return matches[0] if matches else None
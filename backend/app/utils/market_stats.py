@@ -0,0 +1,242 @@
+import threading
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.property import Property
+from app.utils.sketch import QuantileSketch
+
+DIVISION = "division"
+LOCALITY = "locality"
+
+SUMMARY_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+def normalize_key(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    return " ".join(value.lower().split())
+
+def price_per_sqft(price: Optional[float], area: Optional[float], stored: Optional[float] = None) -> Optional[float]:
+    if stored:
+        return stored
+    if price and area:
+        return price / area
+    return None
+
+Keys = Tuple[Tuple[str, str], ...]
+
+class _Contributions:
+    """
+    The value and keys each property currently counts under, indexed by id
+
+    Kept in two flat arrays (about 12 bytes per property) so a changed
+    or re-read row can be retracted exactly without holding the table.
+    """
+
+    def __init__(self):
+        self._values = array("d")
+        self._groups = array("i")  # index into _key_groups; -1 is "not counted"
+        self._key_groups: List[Keys] = []
+        self._group_ids: Dict[Keys, int] = {}
+
+    def get(self, prop_id: int) -> Optional[Tuple[Keys, float]]:
+        if prop_id >= len(self._groups) or self._groups[prop_id] < 0:
+            return None
+        return self._key_groups[self._groups[prop_id]], self._values[prop_id]
+
+    def set(self, prop_id: int, keys: Keys, value: float):
+        missing = prop_id + 1 - len(self._groups)
+        if missing > 0:
+            self._groups.extend(array("i", [-1]) * missing)
+            self._values.extend(array("d", [0.0]) * missing)
+
+        group = self._group_ids.get(keys)
+        if group is None:
+            group = self._group_ids[keys] = len(self._key_groups)
+            self._key_groups.append(keys)
+        self._groups[prop_id] = group
+        self._values[prop_id] = value
+
+    def pop(self, prop_id: int) -> Optional[Tuple[Keys, float]]:
+        current = self.get(prop_id)
+        if current is not None:
+            self._groups[prop_id] = -1
+        return current
+
+class MarketStats:
+    """
+    Per-division and per-locality price_per_sqft distributions
+
+    Maintained incrementally as properties are inserted, updated or
+    deleted, so scoring can place a price in its market with a lookup
+    instead of scanning the current result set. Each property's
+    contribution is remembered by id, so applying a row again (from a
+    commit and then from the index refresher) replaces it rather than
+    counting it twice.
+    """
+
+    def __init__(self, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._sketches: Dict[Tuple[str, str], QuantileSketch] = {}
+        self._contributions = _Contributions()
+        self._lock = threading.Lock()
+
+    def _keys(self, division: Optional[str], locality: Optional[str]) -> List[Tuple[str, str]]:
+        keys = []
+        if normalize_key(division):
+            keys.append((DIVISION, normalize_key(division)))
+        if normalize_key(locality):
+            keys.append((LOCALITY, normalize_key(locality)))
+        return keys
+
+    def upsert(self, prop_id: int, division: Optional[str], locality: Optional[str], value: Optional[float]):
+        """Count a property under its current division, locality and price, replacing what it counted before"""
+
+        keys = tuple(self._keys(division, locality)) if value is not None else ()
+        with self._lock:
+            self._retract(prop_id)
+            if keys:
+                for key in keys:
+                    self._sketches.setdefault(key, QuantileSketch()).add(value)
+                self._contributions.set(prop_id, keys, value)
+
+    def discard(self, prop_id: int):
+        with self._lock:
+            self._retract(prop_id)
+
+    def _retract(self, prop_id: int):
+        current = self._contributions.pop(prop_id)
+        if current is None:
+            return
+        keys, value = current
+        for key in keys:
+            sketch = self._sketches.get(key)
+            if sketch is not None:
+                sketch.remove(value)
+                if not sketch.count:
+                    del self._sketches[key]
+
+    def clear(self):
+        with self._lock:
+            self._sketches.clear()
+            self._contributions = _Contributions()
+
+    def _rows(self, db: Session):
+        return db.query(
+            Property.id,
+            Property.division,
+            Property.location,
+            Property.price,
+            Property.area,
+            Property.price_per_sqft
+        )
+
+    def load(self, db: Session, batch_size: int = 1000) -> int:
+        """Rebuild all distributions from the properties table"""
+
+        # Built aside and swapped in, so lookups during a reload see the old distributions
+        sketches: Dict[Tuple[str, str], QuantileSketch] = {}
+        contributions = _Contributions()
+        loaded = 0
+        for row in self._rows(db).yield_per(batch_size):
+            value = price_per_sqft(row.price, row.area, row.price_per_sqft)
+            keys = tuple(self._keys(row.division, row.location))
+            if value is not None and keys:
+                for key in keys:
+                    sketches.setdefault(key, QuantileSketch()).add(value)
+                contributions.set(row.id, keys, value)
+            loaded += 1
+
+        with self._lock:
+            self._sketches = sketches
+            self._contributions = contributions
+        return loaded
+
+    def load_rows(self, db: Session, ids: Iterable[int]) -> int:
+        """Re-read the given properties and apply their current values; used by the index refresher"""
+
+        rows = self._rows(db).filter(Property.id.in_(list(ids))).all()
+        for row in rows:
+            self.upsert(row.id, row.division, row.location, price_per_sqft(row.price, row.area, row.price_per_sqft))
+        return len(rows)
+
+    def price_rank(self, value: float, division: Optional[str], locality: Optional[str]) -> Optional[float]:
+        """
+        Fraction of the local market priced below `value` per sqft
+
+        Uses the locality when it has enough samples, then the division;
+        None when neither does.
+        """
+
+        with self._lock:
+            for key in reversed(self._keys(division, locality)):
+                sketch = self._sketches.get(key)
+                if sketch is not None and sketch.count >= self.min_samples:
+                    return sketch.rank(value)
+        return None
+
+    def summary(self, scope: str, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            sketch = self._sketches.get((scope, normalize_key(name)))
+            if sketch is None:
+                return None
+            return self._summarize(scope, name, sketch)
+
+    def summaries(self, scope: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                self._summarize(key_scope, key_name, sketch)
+                for (key_scope, key_name), sketch in sorted(self._sketches.items())
+                if scope is None or key_scope == scope
+            ]
+
+    @staticmethod
+    def _summarize(scope: str, name: str, sketch: QuantileSketch) -> Dict[str, Any]:
+        return {
+            "scope": scope,
+            "name": name,
+            "count": sketch.count,
+            "mean": round(sketch.mean, 2) if sketch.mean is not None else None,
+            "percentiles": {
+                f"p{int(q * 100)}": round(sketch.quantile(q), 2)
+                for q in SUMMARY_QUANTILES
+            }
+        }
+
+market_stats = MarketStats(min_samples=settings.market_stats_min_samples)
+
+# Changes are collected at flush and applied only once the transaction commits,
+# so rolled-back writes never reach the distributions
+_PENDING_KEY = "market_stats_pending"
+
+def _snapshot(prop: Property) -> Tuple:
+    return (prop.division, prop.location, price_per_sqft(prop.price, prop.area, prop.price_per_sqft))
+
+@event.listens_for(Session, "after_flush")
+def _collect_property_changes(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, [])
+
+    for obj in session.new:
+        if isinstance(obj, Property):
+            pending.append((obj.id, _snapshot(obj)))
+
+    for obj in session.dirty:
+        if isinstance(obj, Property) and session.is_modified(obj):
+            pending.append((obj.id, _snapshot(obj)))
+
+    for obj in session.deleted:
+        if isinstance(obj, Property):
+            pending.append((obj.id, None))
+
+@event.listens_for(Session, "after_commit")
+def _apply_property_changes(session):
+    for prop_id, snapshot in session.info.pop(_PENDING_KEY, []):
+        if snapshot is None:
+            market_stats.discard(prop_id)
+        else:
+            market_stats.upsert(prop_id, *snapshot)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_property_changes(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,102 @@
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+class PlotRangeIndex:
+    """
+    A project's plot inventory sorted by size and by price
+
+    A size/price range query bisects both orders, walks whichever slice
+    is shorter and checks the other bound on it, so it never touches
+    plots outside one of the two ranges.
+    """
+
+    def __init__(self, plots: Sequence[Dict[str, Any]]):
+        self.plots = list(plots)
+
+        by_size = sorted(range(len(self.plots)), key=lambda i: self._size(i))
+        by_price = sorted(range(len(self.plots)), key=lambda i: self._price(i))
+
+        self._size_order = by_size
+        self._sizes = [self._size(i) for i in by_size]
+        self._price_order = by_price
+        self._prices = [self._price(i) for i in by_price]
+
+    def __len__(self):
+        return len(self.plots)
+
+    def _size(self, position: int) -> float:
+        return self.plots[position].get("size_sqft", 0) or 0
+
+    def _price(self, position: int) -> float:
+        return self.plots[position].get("price", 0) or 0
+
+    @staticmethod
+    def _bounds(values: List[float], low: Optional[float], high: Optional[float]) -> Tuple[int, int]:
+        start = bisect_left(values, low) if low else 0
+        end = bisect_right(values, high) if high else len(values)
+        return start, max(start, end)
+
+    def query(
+        self,
+        min_size: Optional[float] = None,
+        max_size: Optional[float] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Plots within the inclusive ranges, in inventory order; falsy bounds are open"""
+
+        size_start, size_end = self._bounds(self._sizes, min_size, max_size)
+        price_start, price_end = self._bounds(self._prices, min_price, max_price)
+
+        if size_end - size_start <= price_end - price_start:
+            candidates = self._size_order[size_start:size_end]
+            low, high, value = min_price, max_price, self._price
+        else:
+            candidates = self._price_order[price_start:price_end]
+            low, high, value = min_size, max_size, self._size
+
+        matches = [
+            position for position in candidates
+            if (not low or value(position) >= low) and (not high or value(position) <= high)
+        ]
+        matches.sort()
+        return [self.plots[position] for position in matches]
+
+class PlotIndexCache:
+    """
+    Built indexes per project, reused while the project's inventory list is unchanged
+
+    Entries are tied to the identity of the inventory list, so a
+    brochure that is replaced (re-fetched or edited) gets a fresh index.
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Sequence[Dict[str, Any]], PlotRangeIndex]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, project: str, plots: Sequence[Dict[str, Any]]) -> PlotRangeIndex:
+        with self._lock:
+            entry = self._entries.get(project)
+            if entry is not None and entry[0] is plots:
+                self._entries.move_to_end(project)
+                return entry[1]
+
+        index = PlotRangeIndex(plots)
+        with self._lock:
+            self._entries[project] = (plots, index)
+            self._entries.move_to_end(project)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
+
+    def invalidate(self, project: Optional[str] = None):
+        with self._lock:
+            if project is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(project, None)
+
+plot_indexes = PlotIndexCache()
@@ -0,0 +1,161 @@
+import base64
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from app.config import settings
+from app.utils.serialization import dumps
+
+SNAPSHOT_KEY_PREFIX = "ranking:snapshot:"
+
+@dataclass
+class RankingSnapshot:
+    """Full scored result list of one pipeline run"""
+    
+    items: List[Dict[str, Any]]
+    created_at: datetime
+    expires_at: float
+
+class InvalidCursor(ValueError):
+    pass
+
+class RankingSnapshotStore:
+    """
+    Short-lived, size-bounded store of ranking snapshots keyed by result id
+    
+    Lets clients page past the top recommendations without re-running
+    the pipeline. Expired snapshots are dropped lazily on access.
+    """
+    
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._snapshots: "OrderedDict[str, RankingSnapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def put(self, items: List[Dict[str, Any]], created_at: Optional[datetime] = None) -> str:
+        """Store a scored list and return its result id"""
+        
+        result_id = uuid.uuid4().hex
+        snapshot = RankingSnapshot(
+            items=list(items),
+            created_at=created_at or datetime.utcnow(),
+            expires_at=time.monotonic() + self.ttl_seconds
+        )
+        
+        with self._lock:
+            self._snapshots[result_id] = snapshot
+            while len(self._snapshots) > self.max_entries:
+                self._snapshots.popitem(last=False)
+        
+        return result_id
+    
+    def get(self, result_id: str) -> Optional[RankingSnapshot]:
+        with self._lock:
+            snapshot = self._snapshots.get(result_id)
+            if snapshot is None:
+                return None
+            if snapshot.expires_at < time.monotonic():
+                del self._snapshots[result_id]
+                return None
+            return snapshot
+    
+    def page(
+        self,
+        result_id: str,
+        cursor: Optional[str],
+        limit: int
+    ) -> Optional[Tuple[RankingSnapshot, int, List[Dict[str, Any]], Optional[str]]]:
+        """
+        Return (snapshot, offset, items, next_cursor) for one page,
+        or None when the snapshot has expired
+        """
+        
+        snapshot = self.get(result_id)
+        if snapshot is None:
+            return None
+        
+        offset = decode_cursor(result_id, cursor) if cursor else 0
+        end = offset + limit
+        items = snapshot.items[offset:end]
+        next_cursor = encode_cursor(result_id, end) if end < len(snapshot.items) else None
+        
+        return snapshot, offset, items, next_cursor
+
+class RedisRankingSnapshotStore(RankingSnapshotStore):
+    """
+    Ranking snapshots shared by every worker through Redis
+
+    With several workers, the request paging a result rarely lands on the
+    worker that ran the search; Redis holds each snapshot under its result
+    id and expires it after the TTL, so max_entries is not enforced here.
+    Snapshots are stored as JSON, so datetimes in items come back as ISO strings.
+    """
+    
+    def __init__(self, redis_url: str, ttl_seconds: float, max_entries: int):
+        super().__init__(ttl_seconds, max_entries)
+        self.redis_url = redis_url
+        self._redis = None
+    
+    @property
+    def redis(self):
+        if self._redis is None:
+            import redis
+            
+            self._redis = redis.Redis.from_url(self.redis_url)
+        return self._redis
+    
+    def put(self, items: List[Dict[str, Any]], created_at: Optional[datetime] = None) -> str:
+        result_id = uuid.uuid4().hex
+        payload = dumps({"items": items, "created_at": created_at or datetime.utcnow()})
+        self.redis.set(SNAPSHOT_KEY_PREFIX + result_id, payload, ex=max(1, int(self.ttl_seconds)))
+        return result_id
+    
+    def get(self, result_id: str) -> Optional[RankingSnapshot]:
+        payload = self.redis.get(SNAPSHOT_KEY_PREFIX + result_id)
+        if payload is None:
+            return None
+        data = json.loads(payload)
+        return RankingSnapshot(
+            items=data["items"],
+            created_at=datetime.fromisoformat(data["created_at"]),
+            expires_at=time.monotonic() + self.ttl_seconds
+        )
+
+def create_ranking_snapshot_store() -> RankingSnapshotStore:
+    """In-process store for a single worker; Redis when WebSocket sessions already span workers"""
+    
+    if settings.session_broker == "redis":
+        return RedisRankingSnapshotStore(
+            settings.redis_url,
+            ttl_seconds=settings.ranking_snapshot_ttl_seconds,
+            max_entries=settings.ranking_snapshot_max_entries
+        )
+    return RankingSnapshotStore(
+        ttl_seconds=settings.ranking_snapshot_ttl_seconds,
+        max_entries=settings.ranking_snapshot_max_entries
+    )
+
+def encode_cursor(result_id: str, offset: int) -> str:
+    """Opaque cursor pointing at an offset within one snapshot"""
+    raw = f"{result_id}:{offset}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(result_id: str, cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        owner, offset = base64.urlsafe_b64decode(padded).decode().rsplit(":", 1)
+        offset = int(offset)
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+    
+    if owner != result_id or offset < 0:
+        raise InvalidCursor("Cursor does not belong to this result")
+    
+    return offset
+
+ranking_snapshots = create_ranking_snapshot_store()
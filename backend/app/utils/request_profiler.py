@@ -0,0 +1,170 @@
+import asyncio
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from app.config import settings
+
+PROFILE_ID = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+class RequestProfiler:
+    """
+    Opt-in cProfile capture of single requests
+
+    A request is profiled when it carries the profile header or falls in
+    the sample; everything else pays one header lookup and one random
+    draw. Profiles run on the event loop thread, so work handed to the
+    threadpool is not included, and concurrent coroutines on the same
+    loop may show up in the profile. Only one request is profiled at a
+    time.
+    """
+
+    def __init__(
+        self,
+        directory: str = settings.profile_dir,
+        sample_rate: float = settings.profile_sample_rate,
+        header: str = settings.profile_header,
+        max_files: int = settings.profile_max_files,
+        token: str = settings.admin_token
+    ):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.header = header.lower().encode("latin-1")
+        self.max_files = max_files
+        self.token = token
+        self._busy = threading.Lock()
+
+    def wanted(self, headers: List[Tuple[bytes, bytes]]) -> bool:
+        """Decide from raw ASGI headers whether to profile a request"""
+
+        for name, value in headers:
+            if name == self.header:
+                # Only admin token holders can force a profile; nobody can without a token
+                return bool(self.token) and hmac.compare_digest(value, self.token.encode("latin-1"))
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    @asynccontextmanager
+    async def capture(self, request_id: str, method: str, path: str):
+        """Profile the block; yields the profile id, or None if another capture is running"""
+
+        if not self._busy.acquire(blocking=False):
+            yield None
+            return
+
+        if not PROFILE_ID.match(request_id):
+            request_id = new_request_id()
+        profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{request_id}"
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                yield profile_id
+            finally:
+                profiler.disable()
+            # Dumping and pruning touch the disk; keep them off the event loop
+            await asyncio.to_thread(self._write, profile_id, profiler, {
+                "id": profile_id,
+                "request_id": request_id,
+                "method": method,
+                "path": path,
+                "duration_seconds": round(time.perf_counter() - started, 4),
+                "created_at": datetime.utcnow().isoformat()
+            })
+        finally:
+            self._busy.release()
+
+    def _write(self, profile_id: str, profiler: cProfile.Profile, meta: Dict[str, Any]):
+        os.makedirs(self.directory, exist_ok=True)
+        profiler.dump_stats(os.path.join(self.directory, f"{profile_id}.prof"))
+        with open(os.path.join(self.directory, f"{profile_id}.json"), "w") as f:
+            json.dump(meta, f)
+        self._prune()
+
+    def _prune(self):
+        profiles = self.list()
+        for meta in profiles[self.max_files:]:
+            for suffix in (".prof", ".json"):
+                try:
+                    os.remove(os.path.join(self.directory, meta["id"] + suffix))
+                except OSError:
+                    pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Captured profiles, newest first"""
+
+        if not os.path.isdir(self.directory):
+            return []
+
+        profiles = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        profiles.sort(key=lambda meta: meta.get("created_at", ""), reverse=True)
+        return profiles
+
+    def path(self, profile_id: str) -> Optional[str]:
+        if not PROFILE_ID.match(profile_id):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.prof")
+        return path if os.path.isfile(path) else None
+
+    def summary(self, profile_id: str, sort: str = "cumulative", limit: int = 40) -> Optional[str]:
+        """pstats listing of the top functions"""
+
+        path = self.path(profile_id)
+        if path is None:
+            return None
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+request_profiler = RequestProfiler()
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling the requests the profiler selects
+
+    Plain ASGI rather than BaseHTTPMiddleware, so unprofiled requests
+    pass straight through. Profiled responses carry X-Profile-Id.
+    """
+
+    def __init__(self, app, profiler: RequestProfiler = request_profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.wanted(scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = next(
+            (value.decode("latin-1") for name, value in scope["headers"] if name == b"x-request-id"),
+            None
+        ) or new_request_id()
+
+        async with self.profiler.capture(request_id, scope["method"], scope["path"]) as profile_id:
+            async def send_with_id(message):
+                if profile_id and message["type"] == "http.response.start":
+                    message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+                await send(message)
+
+            await self.app(scope, receive, send_with_id)
@@ -0,0 +1,222 @@
+"""
+Retention for search_history and agent_interactions
+
+Rows older than their retention window are written to gzip-compressed
+JSONL files under archive_dir, then deleted in short batches (one
+transaction each), so the purge never holds long locks.
+
+    python -m app.utils.retention            # archive and purge
+    python -m app.utils.retention --dry-run  # count what would be purged
+
+With retention_enabled the same job also runs in the background every
+retention_interval_hours. On PostgreSQL a run holds an advisory lock, so
+with several workers (or a worker and the CLI) only one archives and
+purges at a time; the others skip that run.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import Table, delete, func, select
+from sqlalchemy.orm import Session
+from app.config import SessionLocal, settings
+from app.models.property import SearchHistory, AgentInteraction
+
+# pg_try_advisory_lock key shared by every process running retention
+RETENTION_LOCK_ID = 0x72657465
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+class ArchiveWriter:
+    """Appends batches to one gzip JSONL file per table and run"""
+
+    def __init__(self, directory: str, table: str, run_at: datetime):
+        self.path = os.path.join(directory, table, f"{table}-{run_at:%Y%m%dT%H%M%S}.jsonl.gz")
+        self.rows = 0
+
+    def write(self, rows: List[Dict[str, Any]]):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Each batch is its own gzip member; readers see one continuous stream
+        with gzip.open(self.path, "at", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, default=_json_default))
+                f.write("\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.rows += len(rows)
+
+class RetentionJob:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        archive_dir: str = settings.archive_dir,
+        history_days: int = settings.search_history_retention_days,
+        interaction_days: int = settings.agent_interaction_retention_days,
+        batch_size: int = settings.retention_batch_size
+    ):
+        self.session_factory = session_factory
+        self.archive_dir = archive_dir
+        self.history_days = history_days
+        self.interaction_days = interaction_days
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    def cutoffs(self, now: Optional[datetime] = None) -> Dict[str, datetime]:
+        now = now or datetime.utcnow()
+        return {
+            "agent_interactions": now - timedelta(days=self.interaction_days),
+            "search_history": now - timedelta(days=self.history_days),
+        }
+
+    def count_expired(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        cutoffs = self.cutoffs(now)
+        db = self.session_factory()
+        try:
+            return {
+                "agent_interactions": db.scalar(
+                    select(func.count()).select_from(AgentInteraction)
+                    .where(AgentInteraction.created_at < cutoffs["agent_interactions"])
+                ),
+                "search_history": db.scalar(
+                    select(func.count()).select_from(SearchHistory)
+                    .where(SearchHistory.created_at < cutoffs["search_history"])
+                ),
+            }
+        finally:
+            db.close()
+
+    @contextmanager
+    def _exclusive(self):
+        """Yields whether this process may run; only PostgreSQL is coordinated"""
+
+        db = self.session_factory()
+        bind = db.get_bind()
+        db.close()
+        if bind.dialect.name != "postgresql":
+            yield True
+            return
+
+        # A session-level lock on a connection held for the whole run
+        with bind.connect() as connection:
+            acquired = connection.scalar(select(func.pg_try_advisory_lock(RETENTION_LOCK_ID)))
+            connection.commit()
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    connection.scalar(select(func.pg_advisory_unlock(RETENTION_LOCK_ID)))
+                    connection.commit()
+
+    def run(self, now: Optional[datetime] = None) -> Optional[Dict[str, int]]:
+        """
+        Archive and purge expired rows; returns rows purged per table
+        Returns None when another process is already running retention.
+        """
+
+        with self._exclusive() as acquired:
+            if not acquired:
+                return None
+            return self._run(now)
+
+    def _run(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        now = now or datetime.utcnow()
+        cutoffs = self.cutoffs(now)
+        interactions = AgentInteraction.__table__
+        history = SearchHistory.__table__
+
+        interaction_archive = ArchiveWriter(self.archive_dir, interactions.name, now)
+        history_archive = ArchiveWriter(self.archive_dir, history.name, now)
+
+        # Interactions first: their own window, then any still attached to expiring history
+        self._purge(interactions, interactions.c.created_at < cutoffs["agent_interactions"], interaction_archive)
+        expiring_history = select(history.c.id).where(history.c.created_at < cutoffs["search_history"])
+        self._purge(interactions, interactions.c.search_history_id.in_(expiring_history), interaction_archive)
+        self._purge(history, history.c.created_at < cutoffs["search_history"], history_archive)
+
+        return {
+            "agent_interactions": interaction_archive.rows,
+            "search_history": history_archive.rows,
+        }
+
+    def _purge(self, table: Table, condition, archive: ArchiveWriter):
+        while True:
+            db = self.session_factory()
+            try:
+                # Walking the primary key keeps each batch an index range scan
+                rows = db.execute(
+                    select(table).where(condition).order_by(table.c.id).limit(self.batch_size)
+                ).mappings().all()
+                if not rows:
+                    return
+
+                # The archive is on disk before the rows are deleted
+                archive.write([dict(row) for row in rows])
+                db.execute(delete(table).where(table.c.id.in_([row["id"] for row in rows])))
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+            if len(rows) < self.batch_size:
+                return
+
+    async def _loop(self, interval_seconds: float):
+        while not self._stopping.is_set():
+            try:
+                purged = await asyncio.to_thread(self.run)
+                if purged and any(purged.values()):
+                    print(f"Retention purged {purged}")
+            except Exception as e:
+                print(f"Retention job error: {e}")
+
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, interval_hours: float = settings.retention_interval_hours):
+        """Run the job periodically on the running event loop"""
+        if self._task is None or self._task.done():
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._loop(interval_hours * 3600))
+
+    async def stop(self):
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+retention_job = RetentionJob()
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Archive and purge old search history")
+    parser.add_argument("--dry-run", action="store_true", help="only count expired rows")
+    args = parser.parse_args(argv)
+
+    if args.dry_run:
+        counts = retention_job.count_expired()
+        print(f"Expired: {counts['search_history']:,} search_history, "
+              f"{counts['agent_interactions']:,} agent_interactions", file=sys.stderr)
+        return 0
+
+    purged = retention_job.run()
+    if purged is None:
+        print("Another process is running retention; nothing done", file=sys.stderr)
+        return 1
+    print(f"Archived and purged {purged['search_history']:,} search_history and "
+          f"{purged['agent_interactions']:,} agent_interactions rows to {retention_job.archive_dir}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,426 @@
+"""
+Saved searches and alerts for newly ingested approvals and plots
+
+Saved searches live in a reverse index: hashed on (division, locality),
+with interval trees on price and size inside each bucket. A new
+LayoutApproval or Property probes at most four buckets (exact, any
+locality, any division, anywhere) and stabs one tree per bucket, so
+matching costs the number of matches rather than the number of saved
+searches. Matches are stored as SavedSearchNotification rows.
+
+Records inserted through the ORM are matched when their transaction
+commits. Each worker's index follows its own commits and picks up
+searches saved or deactivated on other workers from the index refresher. Bulk
+imports bypass the ORM and are matched afterwards:
+
+    python -m app.utils.bulk_import approvals approvals.csv --notify
+    python -m app.utils.saved_searches match --since 2024-06-01T00:00:00
+"""
+import argparse
+import sys
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import event, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.config import engine, settings, SessionLocal
+from app.models.property import LayoutApproval, Property, PropertyType, SavedSearch, SavedSearchNotification
+from app.utils.interval_tree import IntervalTree
+from app.utils.market_stats import normalize_key
+
+APPROVAL = "approval"
+PROPERTY = "property"
+
+BucketKey = Tuple[Optional[str], Optional[str]]  # (division, locality); None is "any"
+
+@lru_cache(maxsize=4096)
+def canonical_locality(location: Optional[str]) -> Optional[str]:
+    """Normalized gazetteer name of a location, so spellings meet in one bucket"""
+    from app.agents.parser import LocationMatcher
+
+    if not location:
+        return None
+    return normalize_key(LocationMatcher.canonical_name(location))
+
+def _bound(value: Optional[float]) -> Optional[float]:
+    # 0 is the schema default for minimums and means "no bound"
+    return value or None
+
+@dataclass(frozen=True)
+class SavedSearchSpec:
+    id: int
+    user_id: str
+    division: Optional[str]
+    locality: Optional[str]
+    min_price: Optional[float]
+    max_price: Optional[float]
+    min_size: Optional[float]
+    max_size: Optional[float]
+    property_type: Optional[str]
+
+    @classmethod
+    def from_row(cls, row: SavedSearch) -> "SavedSearchSpec":
+        return cls(
+            id=row.id,
+            user_id=row.user_id,
+            division=normalize_key(row.division),
+            locality=canonical_locality(row.locality),
+            min_price=_bound(row.min_price),
+            max_price=_bound(row.max_price),
+            min_size=_bound(row.min_size),
+            max_size=_bound(row.max_size),
+            property_type=normalize_key(row.property_type)
+        )
+
+    @property
+    def key(self) -> BucketKey:
+        return (self.division, self.locality)
+
+    def in_range(self, dimension: str, value: Optional[float]) -> bool:
+        low, high = (self.min_price, self.max_price) if dimension == "price" else (self.min_size, self.max_size)
+        if value is None:
+            return low is None and high is None
+        return (low is None or value >= low) and (high is None or value <= high)
+
+    def accepts(self, price: Optional[float], area: Optional[float]) -> bool:
+        """
+        Whether a record's price and area satisfy the search
+
+        A record with neither (an approval) is news for any budget. A
+        record missing just one cannot be shown to meet a bound on it, so
+        it matches only searches without bounds on that dimension.
+        """
+
+        if price is None and area is None:
+            return True
+        return self.in_range("price", price) and self.in_range("size", area)
+
+    def accepts_type(self, property_type: Optional[str]) -> bool:
+        return self.property_type is None or self.property_type == normalize_key(property_type)
+
+class _Bucket:
+    """Saved searches sharing a (division, locality) key"""
+
+    def __init__(self):
+        self.ids: Set[int] = set()
+        self.price = IntervalTree()
+        self.size = IntervalTree()
+        # Searches with no bound on a dimension match every value; the
+        # tree with fewer of them returns fewer candidates
+        self.open_price = 0
+        self.open_size = 0
+
+    def add(self, spec: SavedSearchSpec):
+        self.ids.add(spec.id)
+        self.price.add(spec.id, spec.min_price, spec.max_price)
+        self.size.add(spec.id, spec.min_size, spec.max_size)
+        self.open_price += spec.min_price is None and spec.max_price is None
+        self.open_size += spec.min_size is None and spec.max_size is None
+
+    def remove(self, spec: SavedSearchSpec):
+        self.ids.discard(spec.id)
+        self.price.remove(spec.id)
+        self.size.remove(spec.id)
+        self.open_price -= spec.min_price is None and spec.max_price is None
+        self.open_size -= spec.min_size is None and spec.max_size is None
+
+class SavedSearchIndex:
+    """
+    Reverse index from a new record to the saved searches it satisfies
+
+    Loaded at startup, kept current from this worker's SavedSearch
+    commits and from the index refresher for other workers'. Until
+    it is loaded, ORM inserts are not matched (a worker that skipped
+    warm-up must not report "no matches").
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self._specs: Dict[int, SavedSearchSpec] = {}
+        self._buckets: Dict[BucketKey, _Bucket] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._specs)
+
+    def load(self, db: Session, batch_size: int = 5000) -> int:
+        rows = db.query(SavedSearch).filter(SavedSearch.is_active.is_(True)).yield_per(batch_size)
+        specs = [SavedSearchSpec.from_row(row) for row in rows]
+
+        buckets: Dict[BucketKey, _Bucket] = {}
+        grouped: Dict[BucketKey, List[SavedSearchSpec]] = {}
+        for spec in specs:
+            grouped.setdefault(spec.key, []).append(spec)
+        for key, members in grouped.items():
+            bucket = buckets[key] = _Bucket()
+            bucket.ids = {spec.id for spec in members}
+            bucket.price.extend((spec.id, spec.min_price, spec.max_price) for spec in members)
+            bucket.size.extend((spec.id, spec.min_size, spec.max_size) for spec in members)
+            bucket.open_price = sum(spec.min_price is None and spec.max_price is None for spec in members)
+            bucket.open_size = sum(spec.min_size is None and spec.max_size is None for spec in members)
+
+        with self._lock:
+            self._specs = {spec.id: spec for spec in specs}
+            self._buckets = buckets
+            self.loaded = True
+        return len(specs)
+
+    def ids(self) -> Set[int]:
+        with self._lock:
+            return set(self._specs)
+
+    def add(self, spec: SavedSearchSpec):
+        with self._lock:
+            self._remove(spec.id)
+            self._specs[spec.id] = spec
+            self._buckets.setdefault(spec.key, _Bucket()).add(spec)
+
+    def remove(self, search_id: int):
+        with self._lock:
+            self._remove(search_id)
+
+    def _remove(self, search_id: int):
+        spec = self._specs.pop(search_id, None)
+        if spec is None:
+            return
+        bucket = self._buckets[spec.key]
+        bucket.remove(spec)
+        if not bucket.ids:
+            del self._buckets[spec.key]
+
+    def match(
+        self,
+        division: Optional[str],
+        location: Optional[str],
+        price: Optional[float] = None,
+        area: Optional[float] = None,
+        property_type: Optional[str] = None
+    ) -> List[SavedSearchSpec]:
+        """
+        Saved searches a record satisfies
+
+        Approvals pass no price or area: only their location and type
+        are matched, since a new layout is news for any budget there.
+        """
+
+        division = normalize_key(division)
+        locality = canonical_locality(location)
+        keys = {(division, locality), (division, None), (None, locality), (None, None)}
+
+        matches: List[SavedSearchSpec] = []
+        with self._lock:
+            for key in keys:
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    matches.extend(self._match_bucket(bucket, price, area))
+        return [spec for spec in matches if spec.accepts_type(property_type)]
+
+    def _match_bucket(self, bucket: _Bucket, price: Optional[float], area: Optional[float]) -> List[SavedSearchSpec]:
+        if price is None and area is None:
+            return [self._specs[search_id] for search_id in bucket.ids]
+
+        # Stab one tree for candidates; SavedSearchSpec.accepts has the final say
+        if price is not None and (area is None or bucket.open_price <= bucket.open_size):
+            candidates = bucket.price.stab(price)
+        else:
+            candidates = bucket.size.stab(area)
+
+        specs = (self._specs[search_id] for search_id in candidates)
+        return [spec for spec in specs if spec.accepts(price, area)]
+
+    def match_record(self, record_type: str, record: Dict[str, Any]) -> List[SavedSearchSpec]:
+        if record_type == APPROVAL:
+            # Layout approvals are plotted developments
+            return self.match(record.get("division"), record.get("location"), property_type=PropertyType.PLOT.value)
+        return self.match(
+            record.get("division"),
+            record.get("location"),
+            record.get("price"),
+            record.get("area"),
+            record.get("property_type")
+        )
+
+saved_search_index = SavedSearchIndex()
+
+def approval_record(approval: LayoutApproval) -> Dict[str, Any]:
+    return {
+        "id": approval.id,
+        "name": approval.project_name,
+        "location": approval.location,
+        "division": approval.division,
+        "approval_number": approval.approval_number,
+        "authority": approval.authority,
+        "approved_area": approval.approved_area
+    }
+
+def property_record(prop: Property) -> Dict[str, Any]:
+    return {
+        "id": prop.id,
+        "name": prop.name,
+        "location": prop.location,
+        "division": prop.division,
+        "price": prop.price,
+        "area": prop.area,
+        "property_type": prop.property_type
+    }
+
+def _insert_ignoring_duplicates(connection, rows: List[Dict[str, Any]]):
+    table = SavedSearchNotification.__table__
+    if engine.dialect.name in ("postgresql", "sqlite"):
+        if engine.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        connection.execute(dialect_insert(table).on_conflict_do_nothing(), rows)
+        return
+
+    for row in rows:
+        try:
+            with connection.begin_nested():
+                connection.execute(insert(table), row)
+        except IntegrityError:
+            pass
+
+def notify(records: Iterable[Tuple[str, Dict[str, Any]]], index: SavedSearchIndex = saved_search_index) -> int:
+    """
+    Store a notification for every saved search each (record_type, record) matches
+    Returns the number of matches; a record already notified to a search is
+    skipped, so re-runs are harmless
+    """
+
+    now = datetime.utcnow()
+    rows = []
+    for record_type, record in records:
+        for spec in index.match_record(record_type, record):
+            rows.append({
+                "saved_search_id": spec.id,
+                "user_id": spec.user_id,
+                "record_type": record_type,
+                "record_id": record["id"],
+                "summary": {k: v for k, v in record.items() if k != "id"},
+                "created_at": now
+            })
+
+    if rows:
+        with engine.begin() as connection:
+            _insert_ignoring_duplicates(connection, rows)
+    return len(rows)
+
+def _notify_since(db: Session, since: datetime, index: SavedSearchIndex, batch_size: int) -> int:
+    matched = 0
+    for model, record_type, to_record in (
+        (LayoutApproval, APPROVAL, approval_record),
+        (Property, PROPERTY, property_record)
+    ):
+        batch = []
+        for row in db.query(model).filter(model.created_at >= since).yield_per(batch_size):
+            batch.append((record_type, to_record(row)))
+            if len(batch) >= batch_size:
+                matched += notify(batch, index=index)
+                batch = []
+        matched += notify(batch, index=index)
+    return matched
+
+def match_since(db: Session, since: datetime, batch_size: int = 1000) -> int:
+    """Match approvals and properties created since a time, e.g. after a bulk import"""
+
+    if not saved_search_index.loaded:
+        saved_search_index.load(db)
+    return _notify_since(db, since, saved_search_index, batch_size)
+
+def load_rows(db: Session, ids: Iterable[int], batch_size: int = 1000) -> int:
+    """
+    Apply saved searches created, edited or deactivated on other workers
+
+    Called by the index refresher with the ids changed since its last
+    pass. Records this worker stored before now were matched without
+    the searches it had not seen, so each newly seen search is caught up
+    on the approvals and properties created since it was saved
+    (notifications already stored by another worker are skipped).
+    """
+
+    if not saved_search_index.loaded:
+        return 0
+
+    known = saved_search_index.ids()
+    rows = db.query(SavedSearch).filter(SavedSearch.id.in_(list(ids))).all()
+    new_searches = []
+    for row in rows:
+        if row.is_active is False:
+            saved_search_index.remove(row.id)
+            continue
+        saved_search_index.add(SavedSearchSpec.from_row(row))
+        if row.id not in known:
+            new_searches.append(row)
+
+    if not new_searches or not settings.saved_search_alerts_enabled:
+        return len(rows)
+
+    catch_up = SavedSearchIndex()
+    for row in new_searches:
+        catch_up.add(SavedSearchSpec.from_row(row))
+    _notify_since(db, min(row.created_at for row in new_searches), catch_up, batch_size)
+    return len(rows)
+
+# Applied after commit so rolled-back rows never reach the index or notify
+_PENDING_KEY = "saved_search_pending"
+
+@event.listens_for(Session, "after_flush")
+def _collect_saved_search_changes(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, {"searches": [], "records": []})
+
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, SavedSearch):
+            pending["searches"].append((obj.id, SavedSearchSpec.from_row(obj) if obj.is_active is not False else None))
+
+    for obj in session.deleted:
+        if isinstance(obj, SavedSearch):
+            pending["searches"].append((obj.id, None))
+
+    for obj in session.new:
+        if isinstance(obj, LayoutApproval):
+            pending["records"].append((APPROVAL, approval_record(obj)))
+        elif isinstance(obj, Property):
+            pending["records"].append((PROPERTY, property_record(obj)))
+
+@event.listens_for(Session, "after_commit")
+def _apply_saved_search_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+
+    for search_id, spec in pending["searches"]:
+        if spec is None:
+            saved_search_index.remove(search_id)
+        else:
+            saved_search_index.add(spec)
+
+    if pending["records"] and settings.saved_search_alerts_enabled and saved_search_index.loaded:
+        try:
+            notify(pending["records"])
+        except Exception as e:
+            print(f"Error storing saved search notifications: {e}")
+
+@event.listens_for(Session, "after_rollback")
+def _discard_saved_search_changes(session):
+    session.info.pop(_PENDING_KEY, None)
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Match new approvals and properties against saved searches")
+    parser.add_argument("command", choices=["match"])
+    parser.add_argument("--since", required=True, type=datetime.fromisoformat, help="ISO time; records created since then are matched")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        print(f"Loaded {saved_search_index.load(db):,} saved searches", file=sys.stderr)
+        print(f"{match_since(db, args.since):,} saved search matches (already notified ones are skipped)", file=sys.stderr)
+    finally:
+        db.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
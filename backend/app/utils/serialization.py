@@ -0,0 +1,60 @@
+"""
+One JSON serialization path for HTTP and WebSocket responses
+
+Pydantic models are dumped straight to JSON by pydantic-core, and
+everything else goes through orjson (stdlib json when orjson is not
+installed). Nothing is converted to intermediate dicts on the way.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if orjson is None and isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(value: Any) -> bytes:
+    """Encode a model or plain value as UTF-8 JSON"""
+
+    if isinstance(value, BaseModel):
+        return value.model_dump_json().encode("utf-8")
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def dumps_text(value: Any) -> str:
+    return dumps(value).decode("utf-8")
+
+def envelope(kind: str, data: Any) -> str:
+    """
+    WebSocket message {"type": kind, "data": data}
+    The payload is serialized once and spliced in rather than re-encoded
+    """
+
+    return f'{{"type":{dumps_text(kind)},"data":{dumps_text(data)}}}'
+
+class FastJSONResponse(JSONResponse):
+    """
+    Default response class of the app
+
+    Endpoints may also return FastJSONResponse(model) directly, which
+    skips FastAPI's own response serialization.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,117 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, Optional
+from app.config import settings
+
+# Called by the broker for every message addressed to a session held by this worker
+Deliver = Callable[[str, str], Awaitable[None]]
+
+CHANNEL_PREFIX = "ws:session:"
+
+class SessionBroker(ABC):
+    """
+    Routes messages to WebSocket sessions regardless of which worker holds them
+
+    Workers subscribe to the sessions they hold; publishing to a session
+    reaches whichever worker has it.
+    """
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+
+    async def stop(self):
+        self._deliver = None
+
+    async def subscribe(self, session_id: str):
+        pass
+
+    async def unsubscribe(self, session_id: str):
+        pass
+
+    @abstractmethod
+    async def publish(self, session_id: str, message: str):
+        ...
+
+class InProcessBroker(SessionBroker):
+    """Single-process stand-in for tests and single-worker deployments"""
+
+    async def publish(self, session_id: str, message: str):
+        if self._deliver is not None:
+            await self._deliver(session_id, message)
+
+class RedisSessionBroker(SessionBroker):
+    """
+    Redis pub/sub broker with one channel per session
+
+    Each worker only subscribes to the channels of its own sessions, so
+    messages are not fanned out to workers that cannot deliver them.
+    """
+
+    def __init__(self, redis_url: str):
+        super().__init__()
+        self.redis_url = redis_url
+        self._redis = None
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Deliver):
+        import redis.asyncio as aioredis
+
+        await super().start(deliver)
+        self._redis = aioredis.from_url(self.redis_url, decode_responses=True)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.close()
+            self._pubsub = None
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+        await super().stop()
+
+    async def subscribe(self, session_id: str):
+        await self._pubsub.subscribe(CHANNEL_PREFIX + session_id)
+
+    async def unsubscribe(self, session_id: str):
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(CHANNEL_PREFIX + session_id)
+
+    async def publish(self, session_id: str, message: str):
+        await self._redis.publish(CHANNEL_PREFIX + session_id, message)
+
+    async def _listen(self):
+        while True:
+            try:
+                # get_message returns immediately until the first subscription exists
+                if not self._pubsub.subscribed:
+                    await asyncio.sleep(0.1)
+                    continue
+
+                message = await self._pubsub.get_message(timeout=1.0)
+                if message and message["type"] == "message":
+                    session_id = message["channel"][len(CHANNEL_PREFIX):]
+                    await self._deliver(session_id, message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Session broker listener error: {e}")
+                await asyncio.sleep(1.0)
+
+def create_session_broker() -> SessionBroker:
+    """Build the broker selected by settings.session_broker"""
+
+    if settings.session_broker == "redis":
+        return RedisSessionBroker(settings.redis_url)
+    return InProcessBroker()
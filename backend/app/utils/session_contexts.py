@@ -0,0 +1,47 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+from app.config import settings
+
+class SessionContextStore:
+    """
+    Last SearchContext of each chat session, for incremental refinements
+    
+    Size-bounded (least recently used sessions are evicted first) and
+    entries expire after a period of inactivity.
+    """
+    
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._contexts: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, session_id: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._contexts.get(session_id)
+            if entry is None:
+                return None
+            expires_at, context = entry
+            if expires_at < time.monotonic():
+                del self._contexts[session_id]
+                return None
+            self._contexts.move_to_end(session_id)
+            return context
+    
+    def put(self, session_id: str, context: Any):
+        with self._lock:
+            self._contexts[session_id] = (time.monotonic() + self.ttl_seconds, context)
+            self._contexts.move_to_end(session_id)
+            while len(self._contexts) > self.max_entries:
+                self._contexts.popitem(last=False)
+    
+    def discard(self, session_id: str):
+        with self._lock:
+            self._contexts.pop(session_id, None)
+
+session_contexts = SessionContextStore(
+    ttl_seconds=settings.session_context_ttl_seconds,
+    max_entries=settings.session_context_max_entries
+)
@@ -0,0 +1,119 @@
+import math
+from typing import Dict, Optional
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with bounded relative error
+
+    Values are counted in logarithmic buckets (the DDSketch layout), so
+    memory depends on the value range rather than the number of values,
+    and values can be removed as well as added.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, index: int) -> float:
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1):
+        if value <= 0:
+            self.zero_count += count
+        else:
+            index = self._index(value)
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+
+    def remove(self, value: float, count: int = 1):
+        """Remove a previously added value"""
+
+        if value <= 0:
+            removed = min(count, self.zero_count)
+            self.zero_count -= removed
+        else:
+            index = self._index(value)
+            current = self.buckets.get(index, 0)
+            removed = min(count, current)
+            if current - removed > 0:
+                self.buckets[index] = current - removed
+            else:
+                self.buckets.pop(index, None)
+
+        self.count -= removed
+        self.total -= value * removed
+        if self.count == 0:
+            self.total = 0.0
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                return self._value(index)
+
+        return self._value(max(self.buckets))
+
+    def rank(self, value: float) -> Optional[float]:
+        """Fraction of values below `value` (ties count half), 0-1"""
+
+        if not self.count:
+            return None
+        if value <= 0:
+            return self.zero_count / 2 / self.count
+
+        target = self._index(value)
+        below = self.zero_count
+        tied = 0
+        for index, bucket_count in self.buckets.items():
+            if index < target:
+                below += bucket_count
+            elif index == target:
+                tied = bucket_count
+
+        return (below + tied / 2) / self.count
+
+    def merge(self, other: "QuantileSketch"):
+        for index, bucket_count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + bucket_count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+
+    def to_dict(self) -> Dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "buckets": {str(k): v for k, v in self.buckets.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "total": self.total
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "QuantileSketch":
+        sketch = cls(data.get("relative_accuracy", 0.01))
+        sketch.buckets = {int(k): v for k, v in data.get("buckets", {}).items()}
+        sketch.zero_count = data.get("zero_count", 0)
+        sketch.count = data.get("count", 0)
+        sketch.total = data.get("total", 0.0)
+        return sketch
@@ -0,0 +1,85 @@
+import sys
+import time
+from contextlib import contextmanager
+from importlib.abc import MetaPathFinder
+from typing import Dict, List, Tuple
+
+# Imported by run.py before anything else, so this module must stay
+# dependency-free (no app.config, no third-party packages)
+
+class ImportProfile:
+    """Cumulative and self time spent executing each module imported while active"""
+
+    def __init__(self):
+        self.cumulative: Dict[str, float] = {}
+        self.self_time: Dict[str, float] = {}
+        self.total = 0.0
+
+    def top(self, limit: int = 20) -> List[Tuple[str, float, float]]:
+        ranked = sorted(self.cumulative.items(), key=lambda item: item[1], reverse=True)
+        return [(name, cumulative, self.self_time.get(name, 0.0)) for name, cumulative in ranked[:limit]]
+
+    def report(self, limit: int = 20) -> str:
+        lines = [f"Import profile: {len(self.cumulative)} modules in {self.total * 1000:.0f} ms"]
+        lines.append(f"{'cumulative ms':>14} {'self ms':>9}  module")
+        for name, cumulative, own in self.top(limit):
+            lines.append(f"{cumulative * 1000:>14.1f} {own * 1000:>9.1f}  {name}")
+        return "\n".join(lines)
+
+class _TimingFinder(MetaPathFinder):
+    """Wraps the loaders found by the other finders to time module execution"""
+
+    def __init__(self, profile: ImportProfile):
+        self.profile = profile
+        self._stack: List[float] = []
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimingLoader(spec.loader, self)
+                return spec
+        return None
+
+class _TimingLoader:
+    def __init__(self, loader, finder: _TimingFinder):
+        self._loader = loader
+        self._finder = finder
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        stack = self._finder._stack
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - started
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            profile = self._finder.profile
+            profile.cumulative[module.__name__] = elapsed
+            profile.self_time[module.__name__] = elapsed - children
+
+@contextmanager
+def profile_imports():
+    """Time every module first imported inside the block"""
+
+    profile = ImportProfile()
+    finder = _TimingFinder(profile)
+    sys.meta_path.insert(0, finder)
+    started = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        profile.total = time.perf_counter() - started
+        sys.meta_path.remove(finder)
@@ -0,0 +1,278 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+from app.models.property import Brochure, LayoutApproval, Property
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have",
+    "i", "in", "is", "it", "looking", "me", "my", "near", "of", "on", "only", "or",
+    "should", "the", "to", "want", "with", "would", "need", "needs", "ones", "some",
+}
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", (text or "").lower()):
+        if word in _STOPWORDS or len(word) < 2:
+            continue
+        # Light plural folding so "parks" matches "park"
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+def document_text(*parts: Any) -> str:
+    """Flatten strings, lists and dicts (e.g. amenities) into indexable text"""
+
+    pieces = []
+    for part in parts:
+        if not part:
+            continue
+        if isinstance(part, str):
+            pieces.append(part)
+        elif isinstance(part, dict):
+            for key, value in part.items():
+                pieces.append(str(key))
+                pieces.append(document_text(value))
+        elif isinstance(part, (list, tuple, set)):
+            pieces.extend(document_text(item) for item in part)
+        else:
+            pieces.append(str(part))
+    return " ".join(p for p in pieces if p)
+
+def brochure_text(content: Dict[str, Any]) -> str:
+    """Searchable text of a brochure for requirement matching"""
+    return document_text(
+        content.get("amenities"),
+        content.get("description"),
+        content.get("brochure_text"),
+        "RERA registered" if content.get("rera_registered") else None
+    )
+
+def property_text(prop: Property) -> str:
+    return document_text(prop.name, prop.description, prop.amenities)
+
+class BM25Index:
+    """
+    Local inverted index with Okapi BM25 ranking
+
+    Documents can be added or replaced at any time; statistics are kept
+    incrementally so queries only touch the postings of their own terms.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._doc_terms: Dict[str, List[str]] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def __contains__(self, doc_id: str):
+        return doc_id in self._lengths
+
+    def add(self, doc_id: str, text: str):
+        """Index a document, replacing any previous version"""
+
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self._remove(doc_id)
+            for term, frequency in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = frequency
+            length = sum(terms.values())
+            self._lengths[doc_id] = length
+            self._doc_terms[doc_id] = list(terms)
+            self._total_length += length
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: str):
+        length = self._lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self._total_length -= length
+        for term in self._doc_terms.pop(doc_id, ()):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def score(self, query: str, doc_ids: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """BM25 score of every matching document, optionally restricted to doc_ids"""
+
+        allowed = set(doc_ids) if doc_ids is not None else None
+        scores: Dict[str, float] = {}
+
+        with self._lock:
+            count = len(self._lengths)
+            if not count:
+                return scores
+            average_length = self._total_length / count or 1
+
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    if allowed is not None and doc_id not in allowed:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        return scores
+
+BROCHURE = "brochure"
+
+class ProjectTextIndex(BM25Index):
+    """
+    BM25 index with one document per project
+
+    A project's document is the text of its sources (its brochure and
+    each stored property), so a new or changed source re-indexes the
+    project without dropping the others. A property source moves with
+    its property when it is linked to another project.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        super().__init__(k1, b)
+        self._sources: Dict[str, Dict[str, str]] = {}
+        self._property_projects: Dict[str, str] = {}  # property source -> project it is under
+        self._sources_lock = threading.Lock()
+
+    def set_source(self, project: str, source: str, text: str):
+        with self._sources_lock:
+            previous = self._property_projects.get(source)
+            if previous is not None and previous != project:
+                self._remove_source(previous, source)
+            if source != BROCHURE:
+                self._property_projects[source] = project
+
+            sources = self._sources.setdefault(project, {})
+            if sources.get(source) == text:
+                return
+            sources[source] = text
+            self.add(project, " ".join(sources.values()))
+
+    def remove_source(self, project: str, source: str):
+        with self._sources_lock:
+            self._remove_source(self._property_projects.pop(source, project), source)
+
+    def _remove_source(self, project: str, source: str):
+        sources = self._sources.get(project)
+        if sources is None or sources.pop(source, None) is None:
+            return
+        if sources:
+            self.add(project, " ".join(sources.values()))
+        else:
+            del self._sources[project]
+            self.remove(project)
+
+    def load(self, db: Session, batch_size: int = 1000) -> int:
+        """Rebuild from every stored brochure and property; returns the number of projects"""
+
+        sources: Dict[str, Dict[str, str]] = {}
+        property_projects: Dict[str, str] = {}
+        for row in db.execute(select(Brochure.project_name, Brochure.content)).yield_per(batch_size):
+            sources.setdefault(row.project_name, {})[BROCHURE] = brochure_text(row.content or {})
+
+        for project, prop in _property_rows(db).yield_per(batch_size):
+            source = _property_source(prop)
+            sources.setdefault(project, {})[source] = property_text(prop)
+            property_projects[source] = project
+
+        # Built aside and swapped in, so queries during a reload see the old index
+        fresh = BM25Index(self.k1, self.b)
+        for project, texts in sources.items():
+            fresh.add(project, " ".join(texts.values()))
+
+        with self._sources_lock, self._lock:
+            self._sources = sources
+            self._property_projects = property_projects
+            self._postings = fresh._postings
+            self._lengths = fresh._lengths
+            self._doc_terms = fresh._doc_terms
+            self._total_length = fresh._total_length
+        return len(sources)
+
+    # Used by the index refresher to apply rows changed since its last pass
+    def load_brochures(self, db: Session, ids: Iterable[int]) -> int:
+        rows = db.execute(select(Brochure.project_name, Brochure.content).where(Brochure.id.in_(list(ids)))).all()
+        for row in rows:
+            self.set_source(row.project_name, BROCHURE, brochure_text(row.content or {}))
+        return len(rows)
+
+    def load_properties(self, db: Session, ids: Iterable[int]) -> int:
+        rows = _property_rows(db, Property.id.in_(list(ids))).all()
+        for project, prop in rows:
+            self.set_source(project, _property_source(prop), property_text(prop))
+        return len(rows)
+
+    def load_approvals(self, db: Session, ids: Iterable[int]) -> int:
+        """Re-file the properties of changed approvals, whose project name may have changed"""
+        rows = _property_rows(db, Property.layout_approval_id.in_(list(ids))).all()
+        for project, prop in rows:
+            self.set_source(project, _property_source(prop), property_text(prop))
+        return len(rows)
+
+def _property_source(prop: Property) -> str:
+    return f"property:{prop.id}"
+
+def _property_rows(db: Session, *criteria):
+    """(project, property) rows; a property is filed under its approval's project, else its own name"""
+    return db.execute(
+        select(func.coalesce(LayoutApproval.project_name, Property.name), Property)
+        .outerjoin(LayoutApproval, Property.layout_approval_id == LayoutApproval.id)
+        .where(*criteria)
+    )
+
+# Brochure amenities and stored property descriptions per project, loaded at
+# warm-up and kept current as brochures and properties are committed
+requirement_index = ProjectTextIndex()
+
+# Changes are collected at flush and applied only once the transaction commits
+_PENDING_KEY = "requirement_index_pending"
+
+def _project_of(session: Session, prop: Property) -> str:
+    if prop.layout_approval_id is not None:
+        approval = session.get(LayoutApproval, prop.layout_approval_id)
+        if approval is not None:
+            return approval.project_name
+    return prop.name
+
+@event.listens_for(Session, "after_flush")
+def _collect_text_changes(session, flush_context):
+    pending: List[Tuple[str, str, Optional[str]]] = session.info.setdefault(_PENDING_KEY, [])
+
+    changed = list(session.new) + [obj for obj in session.dirty if session.is_modified(obj)]
+    for obj in changed:
+        if isinstance(obj, Brochure):
+            pending.append((obj.project_name, BROCHURE, brochure_text(obj.content or {})))
+        elif isinstance(obj, Property):
+            pending.append((_project_of(session, obj), _property_source(obj), property_text(obj)))
+
+    for obj in session.deleted:
+        if isinstance(obj, Property):
+            pending.append((_project_of(session, obj), _property_source(obj), None))
+
+@event.listens_for(Session, "after_commit")
+def _apply_text_changes(session):
+    for project, source, text in session.info.pop(_PENDING_KEY, []):
+        if text is None:
+            requirement_index.remove_source(project, source)
+        else:
+            requirement_index.set_source(project, source, text)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_text_changes(session):
+    session.info.pop(_PENDING_KEY, None)
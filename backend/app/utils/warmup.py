@@ -0,0 +1,172 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from sqlalchemy import text
+from app.config import settings, engine, SessionLocal
+from app.utils.market_stats import market_stats
+from app.utils.developer_reputation import developer_reputation
+from app.utils.brochure_store import brochure_store
+from app.utils.saved_searches import saved_search_index
+from app.utils.text_index import requirement_index
+from app.utils.entity_resolution import load_resolver
+from app.scrapers.authorities import authority_registry
+
+DIVISIONS = ["North", "South", "East", "West"]
+
+@dataclass
+class WarmupStep:
+    name: str
+    required: bool
+    status: str = "pending"  # pending, running, done, failed
+    duration: Optional[float] = None
+    error: Optional[str] = None
+    details: Optional[Dict[str, Any]] = None
+
+class Warmup:
+    """
+    Startup warm-up run before a replica reports ready
+
+    Opens DB and LLM connections, loads the in-memory indexes and primes
+    common division queries, so the first real request does not pay for
+    any of it. A failed optional step is recorded but does not block
+    readiness.
+    """
+
+    def __init__(self):
+        self.steps: List[WarmupStep] = []
+        self._actions: Dict[str, Callable[[], Awaitable[Optional[Dict[str, Any]]]]] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.add_step("database", self._open_db_pool, required=True)
+        self.add_step("indexes", self._load_indexes, required=True)
+        self.add_step("entity_resolver", self._load_entity_resolver, required=False)
+        self.add_step("llm", self._open_llm_clients, required=False)
+        self.add_step("division_queries", self._prime_divisions, required=False)
+
+    def add_step(self, name: str, action: Callable[[], Awaitable[Optional[Dict[str, Any]]]], required: bool = False):
+        self.steps.append(WarmupStep(name=name, required=required))
+        self._actions[name] = action
+
+    @property
+    def finished(self) -> bool:
+        return all(step.status in ("done", "failed") for step in self.steps)
+
+    @property
+    def ready(self) -> bool:
+        return self.finished and not any(step.required and step.status == "failed" for step in self.steps)
+
+    def status(self) -> Dict[str, Any]:
+        completed = sum(1 for step in self.steps if step.status in ("done", "failed"))
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = round((self.finished_at or time.monotonic()) - self.started_at, 3)
+
+        return {
+            "ready": self.ready,
+            "progress": round(completed / len(self.steps), 2) if self.steps else 1.0,
+            "elapsed_seconds": elapsed,
+            "steps": [
+                {
+                    "name": step.name,
+                    "status": step.status,
+                    "required": step.required,
+                    "duration": round(step.duration, 3) if step.duration is not None else None,
+                    "error": step.error,
+                    "details": step.details
+                }
+                for step in self.steps
+            ]
+        }
+
+    async def run(self):
+        self.started_at = time.monotonic()
+        for step in self.steps:
+            step.status = "running"
+            started = time.monotonic()
+            try:
+                step.details = await self._actions[step.name]()
+                step.status = "done"
+            except Exception as e:
+                step.status = "failed"
+                step.error = str(e)
+                print(f"Warm-up step {step.name} failed: {e}")
+            step.duration = time.monotonic() - started
+        self.finished_at = time.monotonic()
+
+    def start(self):
+        """Run the warm-up in the background so /health and /ready answer meanwhile"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def _open_db_pool(self) -> Dict[str, Any]:
+        def open_connections():
+            # Check out several connections at once so the pool really grows,
+            # staying within the pool so the checkout cannot block
+            pool_size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+            count = max(1, min(settings.warmup_db_connections, pool_size))
+            connections = [engine.connect() for _ in range(count)]
+            try:
+                for connection in connections:
+                    connection.execute(text("SELECT 1"))
+            finally:
+                for connection in connections:
+                    connection.close()
+            return len(connections)
+
+        opened = await asyncio.to_thread(open_connections)
+        return {"connections": opened}
+
+    async def _load_indexes(self) -> Dict[str, Any]:
+        from app.agents.parser import LocationMatcher
+
+        def load():
+            db = SessionLocal()
+            try:
+                return {
+                    "market_stats_rows": market_stats.load(db),
+                    "developers": developer_reputation.load(db),
+                    "localities": len(LocationMatcher.index()),
+                    "brochures": brochure_store.load(db),
+                    "saved_searches": saved_search_index.load(db),
+                    "requirement_documents": requirement_index.load(db),
+                    "unregistered_authorities": authority_registry.load_unregistered(db)
+                }
+            finally:
+                db.close()
+
+        return await asyncio.to_thread(load)
+
+    async def _load_entity_resolver(self) -> Dict[str, Any]:
+        # Hashes every stored approval, so it is kept out of the required index step
+        return {"approvals": await asyncio.to_thread(load_resolver)}
+
+    async def _open_llm_clients(self) -> Dict[str, Any]:
+        from app.agents.llm import get_llm
+
+        # One client per temperature the agents use; importing langchain is
+        # the bulk of the cost
+        temperatures = (0, 0.3, 0.5)
+        await asyncio.to_thread(lambda: [get_llm(t) for t in temperatures])
+        return {"clients": len(temperatures)}
+
+    async def _prime_divisions(self) -> Dict[str, Any]:
+        from app.agents import ScraperAgent, FilterSortAgent, SearchContext
+
+        primed = {}
+        db = SessionLocal()
+        try:
+            scraper = ScraperAgent(db)
+            filter_sort = FilterSortAgent()
+            for division in DIVISIONS:
+                context = SearchContext(original_query=f"warm-up {division}", division=division)
+                context = await scraper.scrape(context)
+                context = await filter_sort.filter_and_sort(context)
+                primed[division] = len(context.filtered_approvals)
+        finally:
+            db.close()
+        return {"approvals": primed}
+
+warmup = Warmup()
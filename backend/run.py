@@ -1,10 +1,13 @@
 #!/usr/bin/env python
 import os
 import sys
-from app.main import create_app
+from app.utils.startup_profile import profile_imports
 import uvicorn
 
 if __name__ == "__main__":
+    with profile_imports() as import_profile:
+        from app.main import create_app
+    
     app = create_app()
     
     # Get configuration from environment
@@ -12,6 +15,9 @@ if __name__ == "__main__":
     port = int(os.getenv("API_PORT", "8000"))
     debug = os.getenv("DEBUG", "False").lower() == "true"
     
+    if os.getenv("IMPORT_PROFILE", "False").lower() == "true":
+        print(import_profile.report())
+    
     uvicorn.run(
         "app.main:create_app",
         host=host,
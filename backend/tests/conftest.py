@@ -0,0 +1,25 @@
+import os
+import sys
+
+# The app builds its engine at import; point it at SQLite before anything imports app.config
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+@pytest.fixture
+def engine():
+    """A fresh in-memory database with every table; one connection shared across threads"""
+    from app.config import Base
+    import app.models  # noqa: F401 - registers models on Base.metadata
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
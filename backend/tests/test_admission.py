@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+from starlette.requests import Request
+from app.utils import admission
+from app.utils.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    Priority,
+    RateLimiter,
+    TokenBucket,
+    client_key,
+)
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    return clock
+
+def test_bucket_allows_a_burst_then_refills(clock):
+    bucket = TokenBucket(rate_per_second=0.5, capacity=3)
+    assert [bucket.take()[0] for _ in range(4)] == [True, True, True, False]
+    assert bucket.take() == (False, 2.0)
+
+    clock.now += 2
+    assert bucket.take() == (True, 0.0)
+    assert bucket.take()[0] is False
+
+def test_bucket_reserve_leaves_tokens_for_others(clock):
+    bucket = TokenBucket(rate_per_second=1, capacity=5)
+    assert [bucket.take(reserve=2)[0] for _ in range(4)] == [True, True, True, False]
+    # What was held back is still there for a caller without a reserve
+    assert [bucket.take()[0] for _ in range(3)] == [True, True, False]
+
+def test_limiter_keys_are_independent_and_evicted_least_recent_first(clock):
+    limiter = RateLimiter(per_minute=60, burst=1, max_keys=2)
+    assert limiter.check("a")[0] and limiter.check("b")[0]
+    assert limiter.check("a")[0] is False
+
+    limiter.check("c")  # evicts "b", the least recently used
+    assert limiter.check("b")[0] is True
+    assert limiter.check("c")[0] is False
+
+def _request(host: str) -> Request:
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": [], "client": (host, 5000)})
+
+def test_client_key_ignores_the_claimed_user():
+    assert client_key(_request("10.0.0.1"), "chat") == "chat:10.0.0.1"
+    assert client_key(_request("10.0.0.1"), "chat") != client_key(_request("10.0.0.2"), "chat")
+
+def _controller(max_in_flight=1, max_queue=1, burst=2):
+    return AdmissionController(
+        max_in_flight=max_in_flight,
+        max_queue=max_queue,
+        queue_timeout=1.0,
+        user_limiter=RateLimiter(per_minute=60, burst=burst),
+        session_limiter=RateLimiter(per_minute=60, burst=burst)
+    )
+
+def test_rate_limit_rejects_with_retry_after(clock):
+    controller = _controller(burst=2)
+    controller.check_rate("chat:10.0.0.1", None)
+    controller.check_rate("chat:10.0.0.1", None)
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.check_rate("chat:10.0.0.1", None)
+    assert rejected.value.http_error().headers["Retry-After"] == "1"
+
+def test_full_queue_displaces_lower_priority_waiters():
+    async def scenario():
+        controller = _controller(max_in_flight=1, max_queue=1)
+        await controller.acquire(Priority.INTERACTIVE)
+
+        batch = asyncio.ensure_future(controller.acquire(Priority.BATCH))
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(controller.acquire(Priority.INTERACTIVE))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected):
+            await batch
+        # A newcomer that does not outrank the queue is turned away
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire(Priority.MAP)
+
+        controller.release()
+        await interactive
+        assert controller.status()["in_flight"] == 1
+        controller.release()
+        assert controller.status() == {"in_flight": 0, "max_in_flight": 1, "queued": 0, "max_queue": 1}
+
+    asyncio.run(scenario())
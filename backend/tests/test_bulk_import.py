@@ -0,0 +1,65 @@
+import io
+from datetime import datetime
+import pytest
+from app.models.property import Developer, LayoutApproval
+from app.utils import bulk_import
+
+@pytest.fixture
+def import_engine(engine, monkeypatch):
+    monkeypatch.setattr(bulk_import, "engine", engine)
+    return engine
+
+def _write(tmp_path, name: str, text: str) -> str:
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+def test_upsert_keeps_developer_scores(import_engine, session_factory, tmp_path):
+    db = session_factory()
+    db.add(Developer(name="Prestige", website="old.example", reputation_score=4.8, reviews_count=200, total_projects=12))
+    db.commit()
+    db.close()
+
+    path = _write(tmp_path, "developers.csv", "name,website\nPrestige,new.example\nSobha,sobha.example\n")
+    stats = bulk_import.run_import("developers", path, out=io.StringIO())
+
+    db = session_factory()
+    prestige = db.query(Developer).filter_by(name="Prestige").one()
+    sobha = db.query(Developer).filter_by(name="Sobha").one()
+    db.close()
+    assert stats["written"] == 2
+    assert prestige.website == "new.example"
+    assert (prestige.reputation_score, prestige.reviews_count, prestige.total_projects) == (4.8, 200, 12)
+    assert (sobha.reputation_score, sobha.reviews_count, sobha.total_projects) == (0.0, 0, 0)
+
+def test_upsert_keeps_approval_inactive(import_engine, session_factory, tmp_path):
+    db = session_factory()
+    db.add(LayoutApproval(
+        project_name="Kanakapura Residency",
+        approval_number="BDA/2019/001",
+        approval_date=datetime(2019, 6, 1),
+        approved_area=4.5,
+        location="Kanakapura",
+        division="South",
+        authority="BDA",
+        is_active=False
+    ))
+    db.commit()
+    db.close()
+
+    path = _write(
+        tmp_path,
+        "approvals.csv",
+        "project_name,approval_number,location,division,approved_area,authority,approval_date\n"
+        "Kanakapura Residency,BDA/2019/001,Kanakapura,South,5.0,BDA,2019-06-01T00:00:00\n"
+        "Hebbal Greens,BDA/2020/002,Hebbal,North,3.0,BDA,2020-02-01T00:00:00\n"
+    )
+    bulk_import.run_import("approvals", path, out=io.StringIO())
+
+    db = session_factory()
+    existing = db.query(LayoutApproval).filter_by(approval_number="BDA/2019/001").one()
+    added = db.query(LayoutApproval).filter_by(approval_number="BDA/2020/002").one()
+    db.close()
+    assert existing.approved_area == 5.0
+    assert existing.is_active is False
+    assert added.is_active is True
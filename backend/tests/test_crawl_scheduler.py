@@ -0,0 +1,88 @@
+from datetime import datetime
+import pytest
+from app.models.property import LayoutApproval
+from app.scrapers.scheduler import CrawlScheduler
+
+STALE = datetime(2020, 1, 1)
+
+@pytest.fixture
+def seeded(session_factory):
+    db = session_factory()
+    db.add(LayoutApproval(
+        project_name="Kanakapura Residency",
+        approval_number="KPA/2019/001",
+        approval_date=datetime(2019, 6, 1),
+        approved_area=4.5,
+        location="Kanakapura",
+        division="South",
+        authority="KPA",
+        updated_at=STALE
+    ))
+    db.commit()
+    db.close()
+    return session_factory
+
+def _stored(factory) -> LayoutApproval:
+    db = factory()
+    try:
+        return db.query(LayoutApproval).one()
+    finally:
+        db.close()
+
+def test_unchanged_fetch_keeps_updated_at(seeded):
+    scheduler = CrawlScheduler(seeded)
+    row = _stored(seeded)
+
+    last_scraped, updated_at, _ = scheduler._write_record(
+        LayoutApproval, row.id, {"project_name": row.project_name, "approved_area": row.approved_area}
+    )
+
+    stored = _stored(seeded)
+    assert updated_at == STALE
+    assert stored.updated_at == STALE
+    assert stored.last_scraped == last_scraped
+
+def test_changed_fetch_moves_updated_at(seeded):
+    scheduler = CrawlScheduler(seeded)
+    row = _stored(seeded)
+
+    scheduler._write_record(LayoutApproval, row.id, {"approved_area": 5.0})
+
+    stored = _stored(seeded)
+    assert stored.approved_area == 5.0
+    assert stored.updated_at > STALE
+    assert stored.updated_at == stored.last_scraped
+
+def test_reload_reads_only_records_changed_since_the_last(seeded):
+    scheduler = CrawlScheduler(seeded)
+    seeded_id = _stored(seeded).id
+    assert [record[1] for record in scheduler._load_records()] == [seeded_id]
+
+    db = seeded()
+    db.add(LayoutApproval(
+        project_name="Hebbal Greens",
+        approval_number="BDA/2020/002",
+        approval_date=datetime(2020, 2, 1),
+        approved_area=3.0,
+        location="Hebbal",
+        division="North",
+        authority="BDA"
+    ))
+    db.commit()
+    added = db.query(LayoutApproval).filter_by(approval_number="BDA/2020/002").one().id
+    db.close()
+
+    assert added in [record[1] for record in scheduler._load_records()]
+    # The seeded row is far behind the mark now
+    assert [record[1] for record in scheduler._load_records()] == [added]
+
+def test_write_skips_a_deleted_record(seeded):
+    scheduler = CrawlScheduler(seeded)
+    db = seeded()
+    row = db.query(LayoutApproval).one()
+    record_id = row.id
+    db.delete(row)
+    db.commit()
+    db.close()
+
+    assert scheduler._write_record(LayoutApproval, record_id, {"approved_area": 5.0}) is None
@@ -0,0 +1,74 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import insert
+from app.models.property import LayoutApproval
+from app.utils import entity_resolution
+from app.utils.entity_resolution import EntityResolver, collapse_duplicates, resolve_approvals
+
+def test_variant_spelling_resolves_to_first_seen_project():
+    resolver = EntityResolver()
+    assert resolver.add(1, "Kanakapura Residency", location="Kanakapura") == 1
+    assert resolver.add(2, "Kanakpura Residency", location="Kanakapura") == 1
+    assert resolver.add(3, "KANAKAPURA  RESIDENCY", location="Kanakapura") == 1
+
+def test_numbered_phases_and_other_localities_stay_separate():
+    resolver = EntityResolver()
+    assert resolver.add(1, "Kanakapura Residency Phase 1", location="Kanakapura") == 1
+    assert resolver.add(2, "Kanakapura Residency Phase 2", location="Kanakapura") == 2
+    assert resolver.add(3, "Kanakapura Residency Phase 1", location="Hebbal") == 3
+
+def test_different_developers_stay_separate():
+    resolver = EntityResolver()
+    assert resolver.add(1, "Green Meadows", "Prestige Estates", "Whitefield") == 1
+    assert resolver.add(2, "Green Meadows", "Sobha Limited", "Whitefield") == 2
+    assert resolver.add(3, "Green Meadow", "Prestige Estates Pvt Ltd", "Whitefield") == 1
+
+def test_collapse_keeps_the_first_of_each_live_project():
+    approvals = [
+        {"project_name": "Kanakapura Residency", "location": "Kanakapura", "approval_number": "A1"},
+        {"project_name": "Kanakpura Residency", "location": "Kanakapura", "approval_number": "A2"},
+        {"project_name": "Kanakapura Residency Phase 2", "location": "Kanakapura", "approval_number": "A3"},
+    ]
+    kept, collapsed = collapse_duplicates(approvals)
+    assert [a["approval_number"] for a in kept] == ["A1", "A3"]
+    assert kept[0]["duplicates"] == ["A2"]
+    assert collapsed == 1
+
+@pytest.fixture
+def stored(engine, session_factory, monkeypatch):
+    monkeypatch.setattr(entity_resolution, "engine", engine)
+    db = session_factory()
+    db.add(LayoutApproval(
+        project_name="Kanakapura Residency",
+        approval_number="KPA/2019/001",
+        approval_date=datetime(2019, 6, 1),
+        approved_area=4.5,
+        location="Kanakapura",
+        division="South",
+        authority="KPA"
+    ))
+    db.commit()
+    yield db
+    db.close()
+
+def test_new_approval_links_to_a_stored_one(engine, stored):
+    resolver = EntityResolver()
+    assert resolver.load(stored) == 1
+    first = stored.query(LayoutApproval).one()
+
+    # A bulk-imported variant: written through Core, then resolved
+    with engine.begin() as connection:
+        variant = connection.execute(insert(LayoutApproval.__table__).values(
+            project_name="Kanakpura Residency",
+            approval_number="BDA/2021/017",
+            approval_date=datetime(2021, 3, 1),
+            approved_area=4.5,
+            location="Kanakapura",
+            division="South",
+            authority="BDA"
+        )).inserted_primary_key[0]
+
+    assert resolve_approvals([{"id": variant, "project_name": "Kanakpura Residency", "location": "Kanakapura"}], resolver) == 1
+    stored.expire_all()
+    assert stored.get(LayoutApproval, variant).canonical_id == first.id
+    assert stored.get(LayoutApproval, first.id).canonical_id is None
@@ -0,0 +1,49 @@
+from sqlalchemy import insert, update
+from app.models.property import Property
+from app.utils.index_refresh import IndexRefresher
+from app.utils.market_stats import DIVISION, market_stats
+from app.utils.text_index import requirement_index
+
+def _property(name: str, price: float, **extra):
+    return {
+        "name": name,
+        "location": "Whitefield",
+        "division": "East",
+        "area": 1000.0,
+        "price": price,
+        "property_type": "plot",
+        **extra
+    }
+
+def test_refresh_applies_only_changed_rows_once(engine, session_factory):
+    db = session_factory()
+    market_stats.load(db)
+    requirement_index.load(db)
+    refresher = IndexRefresher(session_factory, interval_seconds=0)
+    refresher.register("market_stats", Property.__table__, market_stats.load_rows)
+    refresher.register("requirement_index", Property.__table__, requirement_index.load_properties)
+    refresher.refresh()
+
+    # One row through the ORM (applied at commit), one through Core (seen only by the refresher)
+    db.add(Property(**_property("Orchid Plots", 5_000_000)))
+    db.commit()
+    with engine.begin() as connection:
+        connection.execute(insert(Property.__table__), _property("Lotus Layout", 7_000_000, description="near a lake"))
+    assert market_stats.summary(DIVISION, "East")["count"] == 1
+
+    assert refresher.refresh() == {"market_stats": 2, "requirement_index": 2}
+    assert market_stats.summary(DIVISION, "East")["count"] == 2
+    assert "Lotus Layout" in requirement_index
+
+    # Nothing moved: nothing is re-applied
+    assert refresher.refresh() == {}
+
+    with engine.begin() as connection:
+        connection.execute(
+            update(Property.__table__).where(Property.name == "Lotus Layout").values(price=9_000_000, price_per_sqft=9000.0)
+        )
+    assert refresher.refresh() == {"market_stats": 1, "requirement_index": 1}
+    summary = market_stats.summary(DIVISION, "East")
+    assert summary["count"] == 2
+    assert summary["mean"] == 7000.0
+    db.close()
@@ -0,0 +1,103 @@
+import random
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import insert
+from app.config import settings
+from app.models.property import Property, SavedSearch, SavedSearchNotification
+from app.utils import saved_searches
+from app.utils.saved_searches import SavedSearchIndex, SavedSearchSpec, saved_search_index
+
+DIVISIONS = ("north", "south", None)
+
+def _bounds(rng):
+    low = rng.choice([None, rng.uniform(0, 50)])
+    high = rng.choice([None, rng.uniform(50, 100)])
+    return low, high
+
+def _specs(rng, count):
+    specs = []
+    for search_id in range(1, count + 1):
+        min_price, max_price = _bounds(rng)
+        min_size, max_size = _bounds(rng)
+        specs.append(SavedSearchSpec(
+            id=search_id,
+            user_id=f"user-{search_id}",
+            division=rng.choice(DIVISIONS),
+            locality=None,
+            min_price=min_price,
+            max_price=max_price,
+            min_size=min_size,
+            max_size=max_size,
+            property_type=rng.choice([None, "plot"])
+        ))
+    return specs
+
+def test_index_agrees_with_brute_force():
+    rng = random.Random(7)
+    specs = _specs(rng, 300)
+    index = SavedSearchIndex()
+    for spec in specs:
+        index.add(spec)
+
+    for _ in range(1000):
+        division = rng.choice(["North", "South"])
+        price = rng.choice([None, rng.uniform(-10, 110)])
+        area = rng.choice([None, rng.uniform(-10, 110)])
+        property_type = rng.choice([None, "plot", "villa"])
+
+        expected = {
+            spec.id for spec in specs
+            if spec.division in (division.lower(), None)
+            and spec.accepts(price, area)
+            and spec.accepts_type(property_type)
+        }
+        found = {spec.id for spec in index.match(division, None, price, area, property_type)}
+        assert found == expected, (division, price, area, property_type)
+
+def test_missing_dimension_matches_only_searches_unbounded_on_it():
+    index = SavedSearchIndex()
+    index.add(SavedSearchSpec(1, "a", None, None, None, 100.0, None, None, None))
+    index.add(SavedSearchSpec(2, "b", None, None, None, 100.0, 10.0, None, None))
+
+    assert {spec.id for spec in index.match(None, None, price=50.0)} == {1}
+    assert {spec.id for spec in index.match(None, None, area=20.0)} == set()
+    # Approvals carry neither and are news for any budget
+    assert {spec.id for spec in index.match(None, None)} == {1, 2}
+
+@pytest.fixture
+def alerts(engine, session_factory, monkeypatch):
+    monkeypatch.setattr(saved_searches, "engine", engine)
+    monkeypatch.setattr(settings, "saved_search_alerts_enabled", True)
+    db = session_factory()
+    saved_search_index.load(db)
+    yield db
+    db.close()
+
+def test_load_rows_catches_up_a_search_saved_elsewhere(engine, alerts):
+    saved_at = datetime.utcnow() - timedelta(minutes=5)
+    with engine.begin() as connection:
+        # Written by another worker: this worker's commit hooks never saw either row
+        search_id = connection.execute(insert(SavedSearch.__table__).values(
+            user_id="u1", name="East plots", division="East", max_price=6_000_000,
+            is_active=True, created_at=saved_at, updated_at=saved_at
+        )).inserted_primary_key[0]
+        connection.execute(insert(Property.__table__), [
+            {"name": "Before", "location": "Whitefield", "division": "East", "area": 1200.0, "price": 5_000_000,
+             "property_type": "plot", "created_at": saved_at - timedelta(minutes=1)},
+            {"name": "After", "location": "Whitefield", "division": "East", "area": 1200.0, "price": 5_000_000,
+             "property_type": "plot", "created_at": saved_at + timedelta(minutes=1)},
+            {"name": "Too dear", "location": "Whitefield", "division": "East", "area": 1200.0, "price": 9_000_000,
+             "property_type": "plot", "created_at": saved_at + timedelta(minutes=1)},
+        ])
+
+    saved_searches.load_rows(alerts, [search_id], batch_size=1)
+
+    assert search_id in saved_search_index.ids()
+    notified = [row.summary["name"] for row in alerts.query(SavedSearchNotification).all()]
+    assert notified == ["After"]
+
+    # Deactivated on another worker: dropped, and nothing is caught up again
+    alerts.query(SavedSearch).filter_by(id=search_id).update({"is_active": False})
+    alerts.commit()
+    saved_searches.load_rows(alerts, [search_id])
+    assert search_id not in saved_search_index.ids()